@@ -18,12 +18,14 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import uuid
+import numpy
 
-from pycam.Geometry import number, INFINITE, epsilon
+from pycam.Geometry import number, INFINITE, epsilon, get_fingerprint
 from pycam.Geometry import IDGenerator
+from pycam.Geometry.batch_intersection import pdot as pdot_arrays
 from pycam.Geometry.intersection import intersect_cylinder_point, intersect_cylinder_line
 from pycam.Geometry.PointUtils import padd, pdot, psub
+from pycam.Geometry.PushIntervals import get_push_intervals
 
 
 class BaseCutter(IDGenerator):
@@ -46,8 +48,6 @@ class BaseCutter(IDGenerator):
         self.shape = {}
         self.location = location
         self.moveto(self.location)
-        self.uuid = None
-        self.update_uuid()
 
     def get_minx(self, start=None):
         if start is None:
@@ -69,8 +69,17 @@ class BaseCutter(IDGenerator):
             start = self.location
         return start[1] + self.distance_radius
 
-    def update_uuid(self):
-        self.uuid = uuid.uuid4()
+    def get_shape_parameters(self):
+        """ return the values describing the shape and size of the cutter (not its location)
+
+        Subclasses with additional shape parameters should extend this tuple.
+        """
+        return (self.radius, self.height, self.required_distance)
+
+    @property
+    def fingerprint(self):
+        """ hash value of the shape - cutters of the same type and size share it """
+        return get_fingerprint(self.__class__.__name__, self.get_shape_parameters())
 
     def __repr__(self):
         return "BaseCutter"
@@ -88,14 +97,26 @@ class BaseCutter(IDGenerator):
             self.required_distance = number(value)
             self.distance_radius = self.radius + self.get_required_distance()
             self.distance_radiussq = self.distance_radius * self.distance_radius
-            self.update_uuid()
 
     def get_required_distance(self):
         return self.required_distance
 
+    def get_center(self, location):
+        """ return the reference point of the shape for a tool at the given location
+
+        Subclasses with a shape that is not based on the tip of the tool should override this.
+        """
+        return tuple(location[:3])
+
     def moveto(self, location):
-        # "moveto" is used for collision detection calculation.
+        """ move the tool to a location (used for visualization)
+
+        The collision calculations do not depend on this location if their "start" position is
+        given.  Thus a cutter can be shared by concurrent threads as long as they use "drop_at"
+        and "push_at" (or "drop" and "intersect" with an explicit "start" position).
+        """
         self.location = location
+        self.center = self.get_center(location)
         for shape, set_pos_func in self.shape.values():
             set_pos_func(location[0], location[1], location[2])
 
@@ -103,9 +124,25 @@ class BaseCutter(IDGenerator):
         raise NotImplementedError("Inherited class of BaseCutter does not implement the required "
                                   "function 'intersect'.")
 
+    def push_at(self, direction, triangle, start):
+        """ move the tool from "start" along the direction until it hits the triangle
+
+        This does not change the state of the cutter.
+        @returns: tuple of the tool location at the collision, the distance and the contact point
+            (None, INFINITE, None) without a collision
+        """
+        return self.intersect(direction, triangle, start=start)
+
     def drop(self, triangle, start=None):
         if start is None:
             start = self.location
+        return self.drop_at(triangle, start)
+
+    def drop_at(self, triangle, start):
+        """ return the location of the tool dropped from "start" onto the triangle (or None)
+
+        This does not change the state of the cutter.
+        """
         # check bounding box collision
         if self.get_minx(start) > triangle.maxx + epsilon:
             return None
@@ -125,6 +162,120 @@ class BaseCutter(IDGenerator):
 
         return self.intersect(BaseCutter.vertical, triangle, start=start)[0]
 
+    def get_drop_heights(self, triangles, starts):
+        """ calculate the result of "drop" for many pairs of triangles and start positions at once
+
+        @param triangles: TriangleArrays with one row for each pair
+        @param starts: array of shape (n, 3) or a single start position used for all pairs
+        @returns: array with the height of the tool (the z value of the result of "drop") for
+            each pair - nan if the tool does not touch the triangle
+        """
+        starts = numpy.broadcast_to(numpy.asarray(starts, dtype=numpy.float64),
+                                    (len(triangles), 3))
+        heights = numpy.full(len(triangles), numpy.nan)
+        with numpy.errstate(all="ignore"):
+            # check bounding box collision
+            lower = triangles.lower
+            upper = triangles.upper
+            candidates = triangles.valid.copy()
+            candidates &= ~(starts[:, 0] - self.distance_radius > upper[:, 0] + epsilon)
+            candidates &= ~(starts[:, 0] + self.distance_radius < lower[:, 0] - epsilon)
+            candidates &= ~(starts[:, 1] - self.distance_radius > upper[:, 1] + epsilon)
+            candidates &= ~(starts[:, 1] + self.distance_radius < lower[:, 1] - epsilon)
+            # check bounding circle collision
+            c = triangles.middle
+            candidates &= ~(numpy.float_power(c[:, 0] - starts[:, 0], 2.0)
+                            + numpy.float_power(c[:, 1] - starts[:, 1], 2.0)
+                            > (self.distance_radiussq
+                               + 2 * self.distance_radius * triangles.radius
+                               + triangles.radiussq) + epsilon)
+            rows = numpy.nonzero(candidates)[0]
+            if len(rows) > 0:
+                heights[rows] = self._get_drop_heights(triangles.take(rows), starts[rows])
+        return heights
+
+    def _get_drop_heights(self, triangles, starts):
+        """ calculate the heights for the pairs passing the checks of "get_drop_heights"
+
+        This is a slow fallback based on "intersect".  Subclasses should override it.
+        """
+        heights = numpy.full(len(triangles), numpy.nan)
+        for row, start in enumerate(starts.tolist()):
+            cl = self.intersect(BaseCutter.vertical, triangles.get_triangle(row),
+                                start=tuple(start))[0]
+            if cl:
+                heights[row] = cl[2]
+        return heights
+
+    def _get_drop_offset(self, starts):
+        """ return the positions of the center (see "get_center") for the given start positions
+        """
+        return starts + numpy.asarray(self.get_center((0, 0, 0)), dtype=numpy.float64)
+
+    def get_profile_heights(self, distances):
+        """ return the height of the lowest point of the tool at the given distances from its axis
+
+        This shape of the tool is used for calculating the offset surface of a height field.
+        @param distances: array of horizontal distances
+        @returns: array of heights relative to the location of the tool (including the "required
+            distance") - nan for distances beyond the reach of the tool
+        """
+        raise NotImplementedError("Inherited class of BaseCutter does not implement the required "
+                                  "function 'get_profile_heights'.")
+
+    def get_push_shape(self):
+        """ describe the shape of the tool for "get_push_intervals"
+
+        The shape consists of all points within the distance "rounding" of a vertical cylinder
+        with the given radius.  The cylinder is open to the top and its lower end is located at
+        "height" above the tool location (see "PushIntervals.get_push_intervals").
+        @returns: tuple of radius, rounding and height (including the "required distance") or
+            None if the shape cannot be described this way
+        """
+        return None
+
+    def get_push_intervals(self, triangles, start, end):
+        """ calculate the locations along the line from "start" to "end" colliding with triangles
+
+        Contacts with the lower end of the tool are ignored within a small tolerance - like a tool
+        resting on a flat surface at the height of the line.  Without a shape (see
+        "get_push_shape") or for non-horizontal lines, a slow fallback based on "push_at" is used.
+        @param triangles: TriangleArrays
+        @returns: arrays of the lowest and the highest colliding location for each triangle as
+            distances from "start" (inf / -inf without a collision)
+        """
+        start = numpy.asarray(start[:3], dtype=numpy.float64)
+        end = numpy.asarray(end[:3], dtype=numpy.float64)
+        length = numpy.sqrt(pdot_arrays(end - start, end - start))
+        direction = (end - start) / length
+        shape = self.get_push_shape()
+        if (shape is not None) and (start[2] == end[2]):
+            radius, rounding, height = shape
+            return get_push_intervals(triangles, start, direction, radius, rounding,
+                                      height + epsilon)
+        lower = numpy.full(len(triangles), numpy.inf)
+        upper = numpy.full(len(triangles), -numpy.inf)
+        forward = tuple(direction.tolist())
+        backward = tuple((-direction).tolist())
+        for row in range(len(triangles)):
+            triangle = triangles.get_triangle(row)
+            forward_hit, forward_distance = self.push_at(forward, triangle,
+                                                         tuple(start.tolist()))[:2]
+            backward_hit, backward_distance = self.push_at(backward, triangle,
+                                                           tuple(end.tolist()))[:2]
+            if forward_hit or backward_hit:
+                lower[row] = forward_distance if forward_hit else 0
+                upper[row] = length - backward_distance if backward_hit else length
+        return lower, upper
+
+    @staticmethod
+    def _get_edge_mask(cp, edge):
+        """ check if the contact points are between the endpoints (see "intersect_circle_edge")
+        """
+        p1, p2, direction, length = edge
+        m = pdot_arrays(cp - p1, direction)
+        return ~((m < -epsilon) | (m > length + epsilon))
+
     def intersect_circle_triangle(self, direction, triangle, start=None):
         (cl, ccp, cp, d) = self.intersect_circle_plane(direction, triangle, start=start)
         if cp and triangle.is_point_inside(cp):
@@ -147,7 +298,7 @@ class BaseCutter(IDGenerator):
     def intersect_cylinder_point(self, direction, point, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_cylinder_point(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_cylinder_point(self.get_center(start),
                                                 self.axis, self.distance_radius,
                                                 self.distance_radiussq, direction, point)
         # offset intersection
@@ -160,14 +311,14 @@ class BaseCutter(IDGenerator):
         if start is None:
             start = self.location
         (cl, ccp, cp, l) = self.intersect_cylinder_point(direction, point, start=start)
-        if ccp and ccp[2] < padd(psub(start, self.location), self.center)[2]:
+        if ccp and ccp[2] < self.get_center(start)[2]:
             return (None, INFINITE, None)
         return (cl, l, cp)
 
     def intersect_cylinder_line(self, direction, edge, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_cylinder_line(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_cylinder_line(self.get_center(start),
                                                self.axis, self.distance_radius,
                                                self.distance_radiussq, direction, edge)
         # offset intersection
@@ -185,6 +336,6 @@ class BaseCutter(IDGenerator):
         m = pdot(psub(cp, edge.p1), edge.dir)
         if (m < -epsilon) or (m > edge.len + epsilon):
             return (None, INFINITE, None)
-        if ccp[2] < padd(psub(start, self.location), self.center)[2]:
+        if ccp[2] < self.get_center(start)[2]:
             return (None, INFINITE, None)
         return (cl, l, cp)
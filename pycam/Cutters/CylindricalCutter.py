@@ -18,8 +18,11 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import numpy
+
 from pycam.Geometry import INFINITE
 from pycam.Cutters.BaseCutter import BaseCutter
+from pycam.Geometry import batch_intersection
 from pycam.Geometry.intersection import intersect_circle_plane, intersect_circle_point, \
         intersect_circle_line
 from pycam.Geometry.PointUtils import padd, psub
@@ -55,14 +58,13 @@ class CylindricalCutter(BaseCutter):
         GLU.gluDisk(self._disk, 0, self.radius, 10, 10)
         GL.glPopMatrix()
 
-    def moveto(self, location, **kwargs):
-        BaseCutter.moveto(self, location, **kwargs)
-        self.center = (location[0], location[1], location[2] - self.get_required_distance())
+    def get_center(self, location):
+        return (location[0], location[1], location[2] - self.get_required_distance())
 
     def intersect_circle_plane(self, direction, triangle, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, d) = intersect_circle_plane(padd(psub(start, self.location), self.center),
+        (ccp, cp, d) = intersect_circle_plane(self.get_center(start),
                                               self.distance_radius, direction, triangle)
         if ccp and cp:
             cl = padd(cp, psub(start, ccp))
@@ -72,7 +74,7 @@ class CylindricalCutter(BaseCutter):
     def intersect_circle_point(self, direction, point, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_circle_point(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_circle_point(self.get_center(start),
                                               self.axis, self.distance_radius,
                                               self.distance_radiussq, direction, point)
         if ccp:
@@ -83,7 +85,7 @@ class CylindricalCutter(BaseCutter):
     def intersect_circle_line(self, direction, edge, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_circle_line(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_circle_line(self.get_center(start),
                                              self.axis, self.distance_radius,
                                              self.distance_radiussq, direction, edge)
         if ccp:
@@ -91,6 +93,39 @@ class CylindricalCutter(BaseCutter):
             return (cl, ccp, cp, l)
         return (None, None, None, INFINITE)
 
+    def _get_drop_heights(self, triangles, starts):
+        # see "intersect": the same steps for many triangles at once
+        center = self._get_drop_offset(starts)
+        contacts = batch_intersection.ContactSelection(len(triangles))
+        ccp, cp, d, valid = batch_intersection.intersect_circle_plane(
+            center, self.distance_radius, triangles)
+        valid &= triangles.is_point_inside(cp)
+        contacts.add(d, cp[:, 2] + (starts[:, 2] - ccp[:, 2]), valid)
+        contacts.finish_contacts()
+        rows = contacts.get_pending()
+        pending = triangles.take(rows)
+        for edge in pending.edges:
+            ccp, cp, l_len, valid = batch_intersection.intersect_circle_line(
+                center[rows], self.distance_radius, self.distance_radiussq, edge)
+            valid &= self._get_edge_mask(cp, edge)
+            contacts.add(l_len, cp[:, 2] + (starts[rows, 2] - ccp[:, 2]), valid, rows)
+        contacts.finish_contacts()
+        rows = contacts.get_pending()
+        pending = triangles.take(rows)
+        for point in (pending.p1, pending.p2, pending.p3):
+            ccp, cp, l_len, valid = batch_intersection.intersect_circle_point(
+                center[rows], self.distance_radiussq, point)
+            contacts.add(l_len, cp[:, 2] + (starts[rows, 2] - ccp[:, 2]), valid, rows)
+        return contacts.heights
+
+    def get_profile_heights(self, distances):
+        distances = numpy.asarray(distances, dtype=numpy.float64)
+        return numpy.where(distances <= self.distance_radius, -self.get_required_distance(),
+                           numpy.nan)
+
+    def get_push_shape(self):
+        return (self.distance_radius, 0, -self.get_required_distance())
+
     def intersect(self, direction, triangle, start=None):
         (cl_t, d_t, cp_t) = self.intersect_circle_triangle(direction, triangle, start=start)
         d = INFINITE
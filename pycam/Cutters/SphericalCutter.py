@@ -18,8 +18,11 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import numpy
+
 from pycam.Geometry import INFINITE, epsilon
 from pycam.Cutters.BaseCutter import BaseCutter
+from pycam.Geometry import batch_intersection
 from pycam.Geometry.intersection import intersect_sphere_plane, intersect_sphere_point, \
         intersect_sphere_line
 from pycam.Geometry.PointUtils import padd, pdot, pmul, pnormsq, psub
@@ -55,14 +58,13 @@ class SphericalCutter(BaseCutter):
         GLU.gluCylinder(self._cylinder, self.radius, self.radius, self.height, 10, 10)
         GL.glPopMatrix()
 
-    def moveto(self, location, **kwargs):
-        BaseCutter.moveto(self, location, **kwargs)
-        self.center = (location[0], location[1], location[2] + self.radius)
+    def get_center(self, location):
+        return (location[0], location[1], location[2] + self.radius)
 
     def intersect_sphere_plane(self, direction, triangle, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, d) = intersect_sphere_plane(padd(psub(start, self.location), self.center),
+        (ccp, cp, d) = intersect_sphere_plane(self.get_center(start),
                                               self.distance_radius, direction, triangle)
         # offset intersection
         if ccp:
@@ -79,7 +81,7 @@ class SphericalCutter(BaseCutter):
     def intersect_sphere_point(self, direction, point, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_sphere_point(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_sphere_point(self.get_center(start),
                                               self.distance_radius, self.distance_radiussq,
                                               direction, point)
         # offset intersection
@@ -95,7 +97,7 @@ class SphericalCutter(BaseCutter):
     def intersect_sphere_line(self, direction, edge, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_sphere_line(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_sphere_line(self.get_center(start),
                                              self.distance_radius, self.distance_radiussq,
                                              direction, edge)
         # offset intersection
@@ -118,6 +120,40 @@ class SphericalCutter(BaseCutter):
         # TODO: probably obsolete?
         return self.intersect_sphere_point(direction, point, start=start)
 
+    def _get_drop_heights(self, triangles, starts):
+        # see "intersect": the same steps for many triangles at once
+        center = self._get_drop_offset(starts)
+        contacts = batch_intersection.ContactSelection(len(triangles))
+        ccp, cp, d, valid = batch_intersection.intersect_sphere_plane(
+            center, self.distance_radius, triangles)
+        valid &= triangles.is_point_inside(cp)
+        contacts.add(d, cp[:, 2] + (starts[:, 2] - ccp[:, 2]), valid)
+        contacts.finish_contacts()
+        rows = contacts.get_pending()
+        pending = triangles.take(rows)
+        for p1, p2, direction, length in pending.edges:
+            ccp, cp, l_len, valid = batch_intersection.intersect_sphere_line(
+                center[rows], self.distance_radius, self.distance_radiussq, (p1, p2, direction))
+            # check if the contact point is between the endpoints
+            d = p2 - p1
+            m = batch_intersection.pdot(cp - p1, d)
+            valid &= ~((m < -epsilon) | (m > batch_intersection.pdot(d, d) + epsilon))
+            contacts.add(l_len, cp[:, 2] - (ccp[:, 2] - starts[rows, 2]), valid, rows)
+        for point in (pending.p1, pending.p2, pending.p3):
+            ccp, cp, dist, valid = batch_intersection.intersect_sphere_point(
+                center[rows], self.distance_radiussq, point)
+            contacts.add(dist, starts[rows, 2] + -1.0 * dist, valid, rows)
+        return contacts.heights
+
+    def get_profile_heights(self, distances):
+        distances = numpy.asarray(distances, dtype=numpy.float64)
+        with numpy.errstate(invalid="ignore"):
+            heights = self.radius - numpy.sqrt(self.distance_radiussq - distances ** 2)
+        return numpy.where(distances <= self.distance_radius, heights, numpy.nan)
+
+    def get_push_shape(self):
+        return (0, self.distance_radius, self.radius)
+
     def intersect(self, direction, triangle, start=None):
         (cl_t, d_t, cp_t) = self.intersect_sphere_triangle(direction, triangle, start=start)
         d = INFINITE
@@ -18,11 +18,14 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import numpy
+
 from pycam.Geometry import INFINITE, number, epsilon
 from pycam.Cutters.BaseCutter import BaseCutter
+from pycam.Geometry import batch_intersection
 from pycam.Geometry.intersection import intersect_torus_plane, intersect_torus_point, \
-        intersect_circle_plane, intersect_circle_point, intersect_cylinder_point, \
-        intersect_cylinder_line, intersect_circle_line
+        intersect_torus_points, intersect_circle_plane, intersect_circle_point, \
+        intersect_cylinder_point, intersect_cylinder_line, intersect_circle_line
 from pycam.Geometry.PointUtils import padd, pdot, pmul, psub
 
 
@@ -60,6 +63,9 @@ class ToroidalCutter(BaseCutter):
             self.distance_majorradiussq = self.distance_majorradius ** 2
             self.distance_minorradiussq = self.distance_minorradius ** 2
 
+    def get_shape_parameters(self):
+        return BaseCutter.get_shape_parameters(self) + (self.minorradius, )
+
     def __repr__(self):
         return "ToroidalCutter<%s,%f,R=%f,r=%f>" % (self.location, self.radius, self.majorradius,
                                                     self.minorradius)
@@ -86,14 +92,13 @@ class ToroidalCutter(BaseCutter):
         GLU.gluDisk(self._disk, 0, self.majorradius, 20, 10)
         GL.glPopMatrix()
 
-    def moveto(self, location, **kwargs):
-        BaseCutter.moveto(self, location, **kwargs)
-        self.center = (location[0], location[1], location[2]+self.minorradius)
+    def get_center(self, location):
+        return (location[0], location[1], location[2] + self.minorradius)
 
     def intersect_torus_plane(self, direction, triangle, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_torus_plane(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_torus_plane(self.get_center(start),
                                              self.axis, self.distance_majorradius,
                                              self.distance_minorradius, direction, triangle)
         if cp:
@@ -110,7 +115,7 @@ class ToroidalCutter(BaseCutter):
     def intersect_torus_point(self, direction, point, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_torus_point(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_torus_point(self.get_center(start),
                                              self.axis,
                                              self.distance_majorradius,
                                              self.distance_minorradius,
@@ -123,6 +128,17 @@ class ToroidalCutter(BaseCutter):
             return (cl, ccp, point, l)
         return (None, None, None, INFINITE)
 
+    def intersect_torus_points(self, direction, points, start=None):
+        """ calculate "intersect_torus_point" for many points at once """
+        if start is None:
+            start = self.location
+        results = intersect_torus_points(self.get_center(start),
+                                         self.axis, self.distance_majorradius,
+                                         self.distance_minorradius, self.distance_majorradiussq,
+                                         self.distance_minorradiussq, direction, points)
+        return [(padd(point, psub(start, ccp)), ccp, point, l) if ccp
+                else (None, None, None, INFINITE) for (ccp, cp, l), point in zip(results, points)]
+
     def intersect_torus_vertex(self, direction, point, start=None):
         (cl, ccp, cp, l) = self.intersect_torus_point(direction, point, start=start)
         return (cl, l, cp)
@@ -136,10 +152,10 @@ class ToroidalCutter(BaseCutter):
         min_cl = None
         scale = int(edge.len / self.distance_minorradius * 2)
         scale = max(3, scale)
-        for i in range(scale + 1):
-            m = float(i) / scale
-            p = edge.point_with_length_multiply(m)
-            (cl, ccp, cp, l) = self.intersect_torus_point(direction, p, start=start)
+        factors = [float(i) / scale for i in range(scale + 1)]
+        points = [edge.point_with_length_multiply(m) for m in factors]
+        contacts = self.intersect_torus_points(direction, points, start=start)
+        for m, (cl, ccp, cp, l) in zip(factors, contacts):
             if not cl:
                 continue
             if l < min_l:
@@ -150,12 +166,10 @@ class ToroidalCutter(BaseCutter):
         if min_l == INFINITE:
             return (None, INFINITE, None)
         scale2 = 10
-        for i in range(1, scale2 + 1):
-            m = min_m + ((float(i) / (scale2)) * 2 - 1)/scale
-            if (m < -epsilon) or (m > 1 + epsilon):
-                continue
-            p = edge.point_with_length_multiply(m)
-            (cl, ccp, cp, l) = self.intersect_torus_point(direction, p, start=start)
+        factors = [min_m + ((float(i) / (scale2)) * 2 - 1)/scale for i in range(1, scale2 + 1)]
+        points = [edge.point_with_length_multiply(m) for m in factors
+                  if not ((m < -epsilon) or (m > 1 + epsilon))]
+        for (cl, ccp, cp, l) in self.intersect_torus_points(direction, points, start=start):
             if not cl:
                 continue
             if l < min_l:
@@ -164,10 +178,118 @@ class ToroidalCutter(BaseCutter):
                 min_cp = cp
         return (min_cl, min_l, min_cp)
 
+    def _get_torus_edge_drop(self, center, starts, edge, max_samples=2 ** 18):
+        """ array variant of "intersect_torus_edge" for a vertical drop
+
+        @returns: tuple of the distances, the heights and the mask of valid rows
+        """
+        p1, p2, direction, length = edge
+        scale = numpy.maximum(3, (length / self.distance_minorradius * 2).astype(int))
+
+        def get_samples(rows, m):
+            # return the distance (infinite if invalid) and the height for each sample
+            p = p1[rows] + batch_intersection.pmul(direction[rows], m * length[rows])
+            ccp, cp, dist, valid = batch_intersection.intersect_torus_point(
+                center[rows], self.distance_majorradius, self.distance_minorradius,
+                self.distance_minorradiussq, p)
+            return numpy.where(valid, dist, numpy.inf), p[:, 2] + (starts[rows, 2] - ccp[:, 2])
+
+        distances = numpy.full(len(p1), numpy.inf)
+        heights = numpy.full(len(p1), numpy.nan)
+        # skip edges outside of the ring below the torus (no sample could be valid there)
+        delta = (p2 - p1)[:, :2]
+        offsets = (center - p1)[:, :2]
+        delta_sq = numpy.einsum("ij,ij->i", delta, delta)
+        position = numpy.einsum("ij,ij->i", offsets, delta)
+        position = numpy.clip(numpy.divide(position, delta_sq, out=numpy.zeros_like(position),
+                                           where=delta_sq > 0), 0, 1)
+        closest = offsets - delta * position[:, numpy.newaxis]
+        min_lsq = numpy.einsum("ij,ij->i", closest, closest)
+        max_lsq = numpy.maximum(numpy.einsum("ij,ij->i", offsets, offsets),
+                                numpy.einsum("ij,ij->i", offsets - delta, offsets - delta))
+        reach = ((min_lsq <= (self.distance_majorradius + self.distance_minorradius) ** 2
+                  + epsilon)
+                 & (max_lsq >= (self.distance_majorradius - self.distance_minorradius) ** 2
+                    - epsilon))
+        candidates = numpy.flatnonzero(reach)
+        # process the (possibly many) samples in blocks of rows
+        sample_ends = numpy.cumsum(scale[candidates] + 1)
+        block_start = 0
+        while block_start < len(candidates):
+            offset = sample_ends[block_start - 1] if block_start > 0 else 0
+            block_end = max(block_start + 1,
+                            numpy.searchsorted(sample_ends, offset + max_samples, side="right"))
+            block = candidates[block_start:block_end]
+            block_start = block_end
+            # the coarse sampling: "scale + 1" points along each edge
+            counts = scale[block] + 1
+            groups = numpy.repeat(numpy.arange(len(block)), counts)
+            steps = numpy.arange(len(groups)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            rows = block[groups]
+            m = steps / scale[rows]
+            sample_distances, sample_heights = get_samples(rows, m)
+            first = batch_intersection.get_first_minimum(groups, sample_distances, len(block))
+            found = sample_distances[first] < INFINITE
+            if not found.any():
+                continue
+            selected = first[found]
+            min_m = m[selected]
+            min_distances = sample_distances[selected]
+            min_heights = sample_heights[selected]
+            rows = block[found]
+            # refine the result around the best sample
+            factors = (numpy.arange(1, 11) / 10.0) * 2 - 1
+            m = min_m[:, numpy.newaxis] + factors / scale[rows][:, numpy.newaxis]
+            refined_distances, refined_heights = get_samples(
+                numpy.repeat(rows, len(factors)), m.ravel())
+            in_range = ~((m.ravel() < -epsilon) | (m.ravel() > 1 + epsilon))
+            refined_distances = numpy.where(in_range, refined_distances, numpy.inf)
+            # the best coarse sample precedes the refined samples of the same edge
+            all_distances = numpy.concatenate((min_distances[:, numpy.newaxis],
+                                               refined_distances.reshape(m.shape)), axis=1)
+            all_heights = numpy.concatenate((min_heights[:, numpy.newaxis],
+                                             refined_heights.reshape(m.shape)), axis=1)
+            best = numpy.argmin(all_distances, axis=1)
+            distances[rows] = all_distances[numpy.arange(len(rows)), best]
+            heights[rows] = all_heights[numpy.arange(len(rows)), best]
+        return distances, heights, distances < INFINITE
+
+    def _get_drop_heights(self, triangles, starts):
+        # see "intersect": the same steps for many triangles at once
+        center = self._get_drop_offset(starts)
+        points = (triangles.p1, triangles.p2, triangles.p3)
+        contacts = batch_intersection.ContactSelection(len(triangles))
+        ccp, cp, l_len, valid = batch_intersection.intersect_torus_plane(
+            center, self.distance_majorradius, self.distance_minorradius, triangles)
+        valid &= triangles.is_point_inside(cp)
+        contacts.add(l_len, cp[:, 2] + (starts[:, 2] - ccp[:, 2]), valid)
+        for edge in triangles.edges:
+            contacts.add(*self._get_torus_edge_drop(center, starts, edge))
+        for point in points:
+            ccp, cp, l_len, valid = batch_intersection.intersect_torus_point(
+                center, self.distance_majorradius, self.distance_minorradius,
+                self.distance_minorradiussq, point)
+            contacts.add(l_len, point[:, 2] + (starts[:, 2] - ccp[:, 2]), valid)
+        # the circle at the bottom of the tool
+        ccp, cp, d, valid = batch_intersection.intersect_circle_plane(
+            starts, self.distance_majorradius, triangles)
+        valid &= triangles.is_point_inside(cp)
+        contacts.add(d, cp[:, 2] - (ccp[:, 2] - starts[:, 2]), valid)
+        for point in points:
+            ccp, cp, l_len, valid = batch_intersection.intersect_circle_point(
+                starts, self.distance_majorradiussq, point)
+            contacts.add(l_len, cp[:, 2] - (ccp[:, 2] - starts[:, 2]), valid)
+        for edge in triangles.edges:
+            ccp, cp, l_len, valid = batch_intersection.intersect_circle_line(
+                starts, self.distance_majorradius, self.distance_majorradiussq, edge)
+            valid &= self._get_edge_mask(cp, edge)
+            contacts.add(l_len, cp[:, 2] - (ccp[:, 2] - starts[:, 2]), valid)
+        return contacts.heights
+
     def intersect_cylinder_point(self, direction, point, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_cylinder_point(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_cylinder_point(self.get_center(start),
                                                 self.axis, self.distance_radius,
                                                 self.distance_radiussq, direction, point)
         # offset intersection
@@ -179,7 +301,7 @@ class ToroidalCutter(BaseCutter):
     def intersect_cylinder_line(self, direction, edge, start=None):
         if start is None:
             start = self.location
-        (ccp, cp, l) = intersect_cylinder_line(padd(psub(start, self.location), self.center),
+        (ccp, cp, l) = intersect_cylinder_line(self.get_center(start),
                                                self.axis, self.distance_radius,
                                                self.distance_radiussq, direction, edge)
         # offset intersection
@@ -189,8 +311,10 @@ class ToroidalCutter(BaseCutter):
         return (None, None, None, INFINITE)
 
     def intersect_cylinder_edge(self, direction, edge, start=None):
+        if start is None:
+            start = self.location
         (cl, ccp, cp, l) = self.intersect_cylinder_line(direction, edge, start=start)
-        if ccp and ccp[2] < self.center[2]:
+        if ccp and ccp[2] < self.get_center(start)[2]:
             return (None, INFINITE, None)
         if ccp:
             m = pdot(psub(cp, edge.p1), edge.dir)
@@ -229,6 +353,19 @@ class ToroidalCutter(BaseCutter):
             return (cl, ccp, cp, l_len)
         return (None, None, None, INFINITE)
 
+    def get_profile_heights(self, distances):
+        distances = numpy.asarray(distances, dtype=numpy.float64)
+        # the distance from the circle in the middle of the torus
+        ring_distances = numpy.maximum(0, distances - self.distance_majorradius)
+        with numpy.errstate(invalid="ignore"):
+            heights = self.minorradius - numpy.sqrt(self.distance_minorradiussq
+                                                    - ring_distances ** 2)
+        reach = min(self.distance_radius, self.distance_majorradius + self.distance_minorradius)
+        return numpy.where(distances <= reach, heights, numpy.nan)
+
+    def get_push_shape(self):
+        return (self.distance_majorradius, self.distance_minorradius, self.minorradius)
+
     def intersect(self, direction, triangle, start=None):
         (cl_t, d_t, cp_t) = self.intersect_torus_triangle(direction, triangle, start=start)
         d = INFINITE
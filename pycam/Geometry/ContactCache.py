@@ -0,0 +1,179 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections
+import threading
+
+import numpy
+
+from pycam.Geometry import epsilon
+from pycam.Geometry.TriangleBVH import _expand_ranges, _get_overlap_mask
+
+
+class ContactCache:
+    """ bounded storage of tool heights and candidate facets shared by the queries of one job
+
+    Two kinds of data are kept (the least recently used items are discarded first):
+        - the height of the tool for each x/y position: the key includes the exact
+          coordinates, the fingerprints of the model and of the tool and the height limits.
+          Positions are queried repeatedly e.g. at the crossings of the two layers of an
+          xy-grid.
+        - the facets near each cell of a regular x/y grid (the size of a query box): the
+          candidates of neighbouring queries (e.g. the next line of a grid) are taken from
+          these cells instead of the spatial index of the model
+
+    The candidates of a query are filtered exactly like in TriangleBVH.query_many.  Thus the
+    results do not depend on the cache.  Stored heights are returned only for identical
+    positions.  The cache may be shared by multiple threads.  Worker processes would only
+    receive their own empty copy.
+    """
+
+    def __init__(self, max_heights=2 ** 16, max_cells=2 ** 12):
+        """
+        @param max_heights: the maximum number of stored heights
+        @param max_cells: the maximum number of stored cells
+        """
+        self.max_heights = max_heights
+        self.max_cells = max_cells
+        self._heights = collections.OrderedDict()
+        self._cells = collections.OrderedDict()
+        self.height_hits = 0
+        self.height_misses = 0
+        self.cell_hits = 0
+        self.cell_misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # locks cannot be transferred to other processes
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return ("heights: %d/%d hits, candidate cells: %d/%d hits"
+                % (self.height_hits, self.height_hits + self.height_misses, self.cell_hits,
+                   self.cell_hits + self.cell_misses))
+
+    def get_hit_rates(self):
+        """ return the ratio of cache hits for heights and cells (None without requests) """
+        result = []
+        for hits, misses in ((self.height_hits, self.height_misses),
+                             (self.cell_hits, self.cell_misses)):
+            result.append(hits / (hits + misses) if hits + misses > 0 else None)
+        return tuple(result)
+
+    def get_heights(self, context, positions):
+        """ look up the stored heights of the given positions
+
+        @param context: hashable description of the model, the tool and the limits
+        @param positions: array of shape (n, 2)
+        @returns: tuple of the keys of the positions (see "set_heights") and an array of the
+            heights (NaN for unknown positions)
+        """
+        # a stored height is returned only for exactly the same position - otherwise the result
+        # would depend on the order of the queries
+        keys = [(context, x, y) for x, y in positions.tolist()]
+        heights = numpy.full(len(keys), numpy.nan)
+        with self._lock:
+            for index, key in enumerate(keys):
+                height = self._heights.get(key)
+                if height is not None:
+                    self._heights.move_to_end(key)
+                    heights[index] = height
+            hits = int(numpy.count_nonzero(~numpy.isnan(heights)))
+            self.height_hits += hits
+            self.height_misses += len(keys) - hits
+        return keys, heights
+
+    def set_heights(self, keys, heights):
+        with self._lock:
+            for key, height in zip(keys, heights):
+                self._heights[key] = height
+            while len(self._heights) > self.max_heights:
+                self._heights.popitem(last=False)
+
+    def query_candidates(self, context, bvh, lowers, uppers):
+        """ return the facets overlapping each of the given boxes (see TriangleBVH.query_many)
+
+        All boxes need to have the same size.  The facets of the cells containing the lower
+        corners of the boxes are retrieved from the spatial index only once.  New cells along a
+        row of the grid (e.g. the positions of a raster line) are retrieved in one sweep (see
+        TriangleBVH.query_sweep).
+        @param context: hashable description of the model
+        @returns: tuple of the facet indices and the index of the box for all pairs (each box
+            is followed by the next one, its facets are sorted)
+        """
+        size = uppers[0] - lowers[0]
+        cell_size = max(size[0], size[1], epsilon)
+        cell_context = (context, tuple(size.tolist()), lowers[0, 2], uppers[0, 2])
+        cells = numpy.floor(lowers[:, :2] / cell_size).astype(numpy.int64)
+        unique_cells, cell_indices = numpy.unique(cells, axis=0, return_inverse=True)
+        cell_indices = cell_indices.reshape(-1)
+        cell_facets = []
+        missing = []
+        with self._lock:
+            for index, (x, y) in enumerate(unique_cells.tolist()):
+                key = (cell_context, x, y)
+                facets = self._cells.get(key)
+                if facets is None:
+                    missing.append(index)
+                else:
+                    self._cells.move_to_end(key)
+                cell_facets.append(facets)
+            self.cell_hits += len(unique_cells) - len(missing)
+            self.cell_misses += len(missing)
+        if missing:
+            # each cell covers all boxes with their lower corner inside of it
+            cell_lowers = numpy.empty((len(missing), 3))
+            cell_lowers[:, :2] = unique_cells[missing] * cell_size - epsilon
+            cell_lowers[:, 2] = lowers[0, 2]
+            cell_uppers = numpy.empty((len(missing), 3))
+            cell_uppers[:, :2] = (unique_cells[missing] + 1) * cell_size + size[:2] + epsilon
+            cell_uppers[:, 2] = uppers[0, 2]
+            missing_cells = unique_cells[missing]
+            if (missing_cells.min(axis=0) == missing_cells.max(axis=0)).any():
+                # the cells form a row (e.g. along a line of the grid): one sweep for all
+                facets, boxes = bvh.query_sweep(cell_lowers, cell_uppers)
+                sort_order = numpy.lexsort((facets, boxes))
+                splits = numpy.searchsorted(boxes[sort_order], numpy.arange(1, len(missing)))
+                found = numpy.split(facets[sort_order], splits)
+            else:
+                found = bvh.query_many(cell_lowers, cell_uppers)
+            with self._lock:
+                for index, facets in zip(missing, found):
+                    x, y = unique_cells[index].tolist()
+                    self._cells[(cell_context, x, y)] = facets
+                    cell_facets[index] = facets
+                while len(self._cells) > self.max_cells:
+                    self._cells.popitem(last=False)
+        # pick the candidates of the cell of each box and keep the overlapping ones
+        counts = numpy.array([len(facets) for facets in cell_facets], dtype=numpy.intp)
+        ends = numpy.cumsum(counts)
+        all_facets = numpy.concatenate(cell_facets + [numpy.empty(0, dtype=numpy.intp)])
+        box_ends = ends[cell_indices]
+        box_starts = box_ends - counts[cell_indices]
+        facets = all_facets[_expand_ranges(box_starts, box_ends)]
+        boxes = numpy.repeat(numpy.arange(len(lowers)), box_ends - box_starts)
+        valid = _get_overlap_mask(bvh.facet_lower[facets], bvh.facet_upper[facets],
+                                  lowers[boxes], uppers[boxes])
+        return facets[valid], boxes[valid]
@@ -0,0 +1,242 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+import numpy
+
+
+def _get_node_range(lower, upper, origin, resolution, count):
+    """ return the first and the last index of the grid nodes between "lower" and "upper" """
+    first = numpy.maximum(0, numpy.ceil((lower - origin) / resolution)).astype(numpy.int64)
+    last = numpy.minimum(count - 1, numpy.floor((upper - origin) / resolution)).astype(numpy.int64)
+    return first, last
+
+
+class HeightField:
+    """ the heights of a surface sampled at the nodes of a regular x/y grid (a "Z-map")
+
+    The height of a node is stored in "heights[row, column]" for the location
+    (minx + column * resolution, miny + row * resolution).  Nodes without a surface above them
+    contain -inf.
+    """
+
+    def __init__(self, minx, miny, resolution, heights):
+        self.minx = minx
+        self.miny = miny
+        self.resolution = resolution
+        self.heights = heights
+
+    @property
+    def shape(self):
+        return self.heights.shape
+
+    @classmethod
+    def from_model(cls, model, minx, miny, maxx, maxy, resolution, max_pairs=2 ** 20):
+        """ store the highest point of the surface of a triangle model within each cell of a grid
+
+        Each node represents the square cell (the size of the resolution) surrounding it.  Its
+        height is at least the highest point of the surface within the cell.  Thus the height
+        field never is below the model - even for walls and narrow peaks.
+        @param model: a Model or a CompositeModel
+        @param max_pairs: the number of facet/node pairs to be processed in one step
+        """
+        columns = int(math.floor((maxx - minx) / resolution)) + 2
+        rows = int(math.floor((maxy - miny) / resolution)) + 2
+        result = cls(minx, miny, resolution, numpy.full((rows, columns), -numpy.inf))
+        models = model.get_models() if hasattr(model, "get_models") else [model]
+        for one_model in models:
+            mesh = one_model.get_mesh()
+            if len(mesh) > 0:
+                result._add_mesh(mesh, max_pairs)
+        return result
+
+    def _add_mesh(self, mesh, max_pairs):
+        rows, columns = self.shape
+        flat_heights = self.heights.reshape(-1)
+        vertices = mesh.vertices
+        indices = mesh.indices
+        normals = mesh.normals
+        half = self.resolution / 2
+        # the cells overlapping the bounding box of each facet
+        first_columns, last_columns = _get_node_range(mesh.lower[:, 0] - half,
+                                                      mesh.upper[:, 0] + half, self.minx,
+                                                      self.resolution, columns)
+        first_rows, last_rows = _get_node_range(mesh.lower[:, 1] - half,
+                                                mesh.upper[:, 1] + half, self.miny,
+                                                self.resolution, rows)
+        widths = numpy.maximum(0, last_columns - first_columns + 1)
+        counts = widths * numpy.maximum(0, last_rows - first_rows + 1)
+        facets = numpy.flatnonzero(counts > 0)
+        first_columns, first_rows, widths, counts = (
+            first_columns[facets], first_rows[facets], widths[facets], counts[facets])
+        count_ends = numpy.cumsum(counts)
+        start = 0
+        while start < len(facets):
+            offset = count_ends[start - 1] if start > 0 else 0
+            end = max(start + 1,
+                      numpy.searchsorted(count_ends, offset + max_pairs, side="right"))
+            # one pair for each cell within the bounding box of a facet
+            block_counts = counts[start:end]
+            groups = numpy.repeat(numpy.arange(start, end), block_counts)
+            steps = (numpy.arange(len(groups))
+                     - numpy.repeat(numpy.cumsum(block_counts) - block_counts, block_counts))
+            node_columns = first_columns[groups] + steps % widths[groups]
+            node_rows = first_rows[groups] + steps // widths[groups]
+            start = end
+            x = self.minx + node_columns * self.resolution
+            y = self.miny + node_rows * self.resolution
+            corners = [vertices[indices[facets[groups], index]] for index in range(3)]
+            # The cell is separated from the facet, if all its corners are on the other side of
+            # an edge than the third vertex (both sides for facets without an area).
+            separated = numpy.zeros(len(groups), dtype=bool)
+            for p1, p2, p3 in ((corners[0], corners[1], corners[2]),
+                               (corners[1], corners[2], corners[0]),
+                               (corners[2], corners[0], corners[1])):
+                dx = p2[:, 0] - p1[:, 0]
+                dy = p2[:, 1] - p1[:, 1]
+                center_side = dx * (y - p1[:, 1]) - dy * (x - p1[:, 0])
+                spread = (numpy.abs(dx) + numpy.abs(dy)) * half
+                vertex_side = dx * (p3[:, 1] - p1[:, 1]) - dy * (p3[:, 0] - p1[:, 0])
+                separated |= (vertex_side >= 0) & (center_side + spread < 0)
+                separated |= (vertex_side <= 0) & (center_side - spread > 0)
+            touching = ~separated
+            node_facets = facets[groups[touching]]
+            normal = normals[node_facets]
+            p1 = corners[0][touching]
+            top = numpy.maximum(numpy.maximum(p1[:, 2], corners[1][touching, 2]),
+                                corners[2][touching, 2])
+            # the plane of the facet reaches its highest point within the cell at a corner
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                z = (p1[:, 2] - (normal[:, 0] * (x[touching] - p1[:, 0])
+                                 + normal[:, 1] * (y[touching] - p1[:, 1])) / normal[:, 2]
+                     + (numpy.abs(normal[:, 0]) + numpy.abs(normal[:, 1])) * half
+                     / numpy.abs(normal[:, 2]))
+            # vertical facets only contribute their top
+            z = numpy.where(normal[:, 2] == 0, top, numpy.fmin(z, top))
+            numpy.maximum.at(flat_heights, node_rows[touching] * columns + node_columns[touching],
+                             z)
+
+    def _get_corner_nodes(self, x, y):
+        """ return the nodes surrounding each of the given positions
+
+        @returns: list of four tuples of rows, columns and a mask of the nodes within the grid
+        """
+        rows, columns = self.shape
+        x = (numpy.asarray(x, dtype=numpy.float64) - self.minx) / self.resolution
+        y = (numpy.asarray(y, dtype=numpy.float64) - self.miny) / self.resolution
+        result = []
+        for node_columns in (numpy.floor(x), numpy.ceil(x)):
+            for node_rows in (numpy.floor(y), numpy.ceil(y)):
+                inside = ((node_columns >= 0) & (node_columns < columns)
+                          & (node_rows >= 0) & (node_rows < rows))
+                result.append((numpy.where(inside, node_rows, 0).astype(numpy.int64),
+                               numpy.where(inside, node_columns, 0).astype(numpy.int64), inside))
+        return result
+
+    def get_heights(self, x, y):
+        """ return the highest value of the nodes surrounding each of the given positions
+
+        Positions outside of the grid are treated like nodes without a surface (-inf).
+        """
+        result = numpy.full(numpy.shape(x), -numpy.inf)
+        for node_rows, node_columns, inside in self._get_corner_nodes(x, y):
+            heights = numpy.where(inside, self.heights[node_rows, node_columns], -numpy.inf)
+            numpy.maximum(result, heights, out=result)
+        return result
+
+    def _get_offset_nodes(self, cutter, nodes, floor, chunk_size=2 ** 14):
+        """ calculate the dilation with the profile of the tool for the given nodes
+
+        The profile of the tool is widened by the horizontal error (see
+        "get_horizontal_error").  Thus the tool located at a node is not lower than the exact
+        tool location at any position within half of a cell diagonal around the node.
+        @param nodes: array of flat indices of nodes
+        @returns: array of the tool location heights (at least "floor") for the nodes
+        """
+        margin = self.get_horizontal_error()
+        reach = int(math.floor((cutter.distance_radius + margin) / self.resolution))
+        steps = numpy.arange(-reach, reach + 1)
+        offset_columns, offset_rows = [grid.ravel() for grid in numpy.meshgrid(steps, steps)]
+        profile = cutter.get_profile_heights(numpy.maximum(
+            0, self.resolution * numpy.hypot(offset_columns, offset_rows) - margin))
+        valid = ~numpy.isnan(profile)
+        rows, columns = self.shape
+        # surround the grid with nodes without a surface - then no offset exceeds the array
+        padded_columns = columns + 2 * reach
+        padded = numpy.full((rows + 2 * reach, padded_columns), -numpy.inf)
+        padded[reach:reach + rows, reach:reach + columns] = self.heights
+        padded = padded.ravel()
+        shifts = offset_rows[valid] * padded_columns + offset_columns[valid]
+        kernel = list(zip(shifts.tolist(), profile[valid].tolist()))
+        padded_nodes = ((nodes // columns) + reach) * padded_columns + (nodes % columns) + reach
+        result = numpy.full(len(nodes), floor, dtype=numpy.float64)
+        # small chunks of nodes keep the data in the cache for all offsets
+        for start in range(0, len(nodes), chunk_size):
+            chunk = padded_nodes[start:start + chunk_size]
+            chunk_result = result[start:start + chunk_size]
+            shifted = numpy.empty(len(chunk))
+            for shift, height in kernel:
+                numpy.subtract(padded.take(chunk + shift), height, out=shifted)
+                numpy.maximum(chunk_result, shifted, out=chunk_result)
+        return result
+
+    def get_offset_surface(self, cutter, floor=-numpy.inf):
+        """ calculate the lowest location of the tool at every node without touching the surface
+
+        This is the morphological dilation of the height field with the profile of the tool (see
+        "get_profile_heights" of the cutters).  Only nodes within the reach of the tool are
+        considered.
+        @param floor: lower heights of the tool are not relevant (e.g. the minimum height)
+        @returns: a new HeightField containing the z values of the tool locations
+        """
+        heights = self._get_offset_nodes(cutter, numpy.arange(self.heights.size), floor)
+        return self.__class__(self.minx, self.miny, self.resolution,
+                              heights.reshape(self.shape))
+
+    def get_offset_heights(self, cutter, x, y, floor=-numpy.inf):
+        """ calculate "get_heights" of the offset surface for the given positions
+
+        Only the nodes surrounding the positions are calculated (see "get_offset_surface").  This
+        is a lot faster than the complete offset surface for sparse toolpath grids.
+        The heights are never below the exact tool locations.  They may exceed them close to
+        steep parts of the model (e.g. by the slope times the horizontal error).
+        @returns: array of the heights
+        """
+        corners = self._get_corner_nodes(x, y)
+        columns = self.shape[1]
+        nodes = numpy.concatenate([(node_rows * columns + node_columns)[inside]
+                                   for node_rows, node_columns, inside in corners])
+        nodes, inverse = numpy.unique(nodes, return_inverse=True)
+        node_heights = self._get_offset_nodes(cutter, nodes, floor)[inverse]
+        result = numpy.full(numpy.shape(x), -numpy.inf)
+        offset = 0
+        for node_rows, node_columns, inside in corners:
+            heights = numpy.full(numpy.shape(x), -numpy.inf)
+            heights[inside] = node_heights[offset:offset + numpy.count_nonzero(inside)]
+            offset += numpy.count_nonzero(inside)
+            numpy.maximum(result, heights, out=result)
+        return result
+
+    def get_horizontal_error(self):
+        """ return the largest distance between a position and the nodes used for its height
+
+        The profile of the tool is widened by this distance (see "_get_offset_nodes").
+        """
+        return self.resolution * math.sqrt(2)
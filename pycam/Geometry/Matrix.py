@@ -21,6 +21,8 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
 
+import numpy
+
 from pycam.Geometry import sqrt, number, epsilon
 from pycam.Geometry.PointUtils import pcross, pnormalized
 
@@ -146,6 +148,21 @@ def get_rotation_matrix_axis_angle(rot_axis, rot_angle, use_radians=True):
              cos + rot_axis[2] * rot_axis[2] * (1 - cos)))
 
 
+def get_rotation_matrix_around_point(center, rot_axis, rot_angle, use_radians=True):
+    """ calculate the 3x4 matrix of a rotation around an axis through a given point
+
+    @type center: tuple(float)
+    @value center: a point on the rotation axis
+    @rtype: tuple(tuple(float))
+    @return: the transformation matrix (3x4)
+    """
+    rotation = get_rotation_matrix_axis_angle(rot_axis, rot_angle, use_radians=use_radians)
+    # shift the center to the origin, rotate and shift back
+    return get_combined_transformation(
+        ((1, 0, 0, -center[0]), (0, 1, 0, -center[1]), (0, 0, 1, -center[2])), rotation,
+        ((1, 0, 0, center[0]), (0, 1, 0, center[1]), (0, 0, 1, center[2])))
+
+
 def multiply_vector_matrix(v, m):
     """ Multiply a 3d vector with a 3x3 matrix. The result is a 3d vector.
 
@@ -167,3 +184,65 @@ def multiply_vector_matrix(v, m):
     return (v[0] * m[0][0] + v[1] * m[0][1] + v[2] * m[0][2],
             v[0] * m[1][0] + v[1] * m[1][1] + v[2] * m[1][2],
             v[0] * m[2][0] + v[1] * m[2][1] + v[2] * m[2][2])
+
+
+def _get_affine_matrix(matrix):
+    """ turn a 3x3 or 3x4 matrix into a 4x4 numpy array """
+    result = numpy.identity(4)
+    for index, row in enumerate(matrix):
+        result[index, :len(row)] = row
+    return result
+
+
+def get_combined_transformation(*matrices):
+    """ combine a sequence of 3x3 or 3x4 transformation matrices into one 3x4 matrix
+
+    @value matrices: the matrices in the order of their application
+    @rtype: tuple(tuple(float))
+    @return: a 3x4 matrix with the same effect as all given matrices applied one after another
+    """
+    result = numpy.identity(4)
+    for matrix in matrices:
+        result = numpy.dot(_get_affine_matrix(matrix), result)
+    return tuple(tuple(row) for row in result[:3].tolist())
+
+
+def transform_points(points, matrix):
+    """ apply a 3x3 or 3x4 transformation matrix to an array of points
+
+    The result is exactly the same as "ptransform_by_matrix" applied to every single point.
+    @type points: numpy.ndarray | list(tuple(float))
+    @value points: points with three coordinates (shape (n, 3))
+    @rtype: numpy.ndarray
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape((-1, 3))
+    result = numpy.empty_like(points)
+    for axis, row in enumerate(matrix):
+        result[:, axis] = points[:, 0] * row[0] + points[:, 1] * row[1] + points[:, 2] * row[2]
+        if len(row) > 3:
+            result[:, axis] += row[3]
+    return result
+
+
+def transform_normals(normals, matrix):
+    """ calculate the normals of surfaces transformed by a 3x3 or 3x4 matrix
+
+    The normals are multiplied with the transposed inverse of the linear part of the matrix and
+    normalized afterwards.  Zero-length results (e.g. caused by a singular matrix) remain zero.
+    @type normals: numpy.ndarray
+    @value normals: array of shape (n, 3)
+    @rtype: numpy.ndarray
+    """
+    linear = _get_affine_matrix(matrix)[:3, :3]
+    columns = linear.T
+    # the adjugate is defined for singular matrices, too (it equals det * inverse)
+    adjugate = numpy.array((numpy.cross(columns[1], columns[2]),
+                            numpy.cross(columns[2], columns[0]),
+                            numpy.cross(columns[0], columns[1])))
+    if numpy.linalg.det(linear) < 0:
+        adjugate = -adjugate
+    result = numpy.dot(normals, adjugate)
+    lengths = numpy.sqrt((result ** 2).sum(axis=1))
+    valid = lengths > 0
+    result[valid] /= lengths[valid, numpy.newaxis]
+    return result
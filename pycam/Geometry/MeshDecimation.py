@@ -0,0 +1,364 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import heapq
+import math
+
+import numpy
+
+from pycam.Geometry.TriangleMesh import get_facet_normals
+import pycam.Utils.log
+log = pycam.Utils.log.get_logger()
+
+
+# the minimum cosine between a facet normal and the projection direction of a fan
+MIN_FACING = 1e-3
+# the minimum length of a facet normal relative to the squared length of its edges
+MIN_AREA = 1e-6
+
+
+def _sub(p1, p2):
+    return (p1[0] - p2[0], p1[1] - p2[1], p1[2] - p2[2])
+
+
+def _dot(p1, p2):
+    return p1[0] * p2[0] + p1[1] * p2[1] + p1[2] * p2[2]
+
+
+def _cross(p1, p2):
+    return (p1[1] * p2[2] - p1[2] * p2[1], p1[2] * p2[0] - p1[0] * p2[2],
+            p1[0] * p2[1] - p1[1] * p2[0])
+
+
+def _is_facing(p1, p2, p3, direction):
+    """ check if the facet is not degenerate and roughly faces along the direction """
+    edge1, edge2 = _sub(p3, p1), _sub(p2, p1)
+    # see Triangle for the orientation of the normal
+    normal = _cross(edge1, edge2)
+    length = math.sqrt(_dot(normal, normal))
+    return ((length > MIN_AREA * (_dot(edge1, edge1) + _dot(edge2, edge2)))
+            and (_dot(normal, direction) > MIN_FACING * length))
+
+
+def _get_crossing(p1, p2, p3, p4):
+    """ return the parameters of the intersection of the 2D segments p1-p2 and p3-p4 or None
+
+    Only proper crossings (not at the ends of the segments) are reported.
+    """
+    d1 = (p2[0] - p1[0], p2[1] - p1[1])
+    d2 = (p4[0] - p3[0], p4[1] - p3[1])
+    denominator = d1[0] * d2[1] - d1[1] * d2[0]
+    if denominator == 0:
+        return None
+    offset = (p3[0] - p1[0], p3[1] - p1[1])
+    s = (offset[0] * d2[1] - offset[1] * d2[0]) / denominator
+    u = (offset[0] * d1[1] - offset[1] * d1[0]) / denominator
+    if (0 < s < 1) and (0 < u < 1):
+        return s, u
+    return None
+
+
+class MeshDecimation:
+    """ reduce the number of facets of a triangle mesh within a given deviation
+
+    The mesh is simplified by half-edge collapses: a vertex is merged into one of its neighbours.
+    Thus the remaining vertices keep their original positions.  The collapses with the smallest
+    deviation are applied first.
+
+    The deviation of each collapse is bounded exactly: the facets around the removed vertex (its
+    "fan") and the new facets are projected along the average normal of the fan.  The collapse is
+    allowed only if both sets of facets cover the same projected area without folds.  Then every
+    point of one surface has a counterpart with the same projection on the other surface.  Their
+    distance is limited by the difference of the piecewise linear height functions of both
+    surfaces.  This difference reaches its maximum at the removed vertex or at an intersection of
+    an old and a new edge.
+    Each facet carries the sum of the bounds of the collapses that formed it.  Thus the Hausdorff
+    distance between the original and the decimated mesh never exceeds the tolerance.
+
+    Only vertices inside of manifold areas of the mesh are removed.  The open borders of a
+    surface are preserved.
+    """
+
+    def __init__(self, mesh, tolerance):
+        """
+        @param mesh: a TriangleMesh
+        @param tolerance: the maximum distance between the original and the decimated surface
+        """
+        self.mesh = mesh
+        self.tolerance = tolerance
+        self._points = [tuple(point) for point in mesh.vertices.tolist()]
+        self._faces = [list(face) for face in mesh.indices.tolist()]
+        self._alive = [True] * len(self._faces)
+        self._errors = [0.0] * len(self._faces)
+        self._vertex_faces = [set() for _ in self._points]
+        for index, face in enumerate(self._faces):
+            for vertex in face:
+                self._vertex_faces[vertex].add(index)
+        self._versions = [0] * len(self._points)
+        # the error of the latest candidate of each vertex (None: not collapsible)
+        self._costs = [None] * len(self._points)
+
+    def _get_ring(self, vertex):
+        """ return the neighbours of a vertex in the order of its facets
+
+        None is returned for vertices at the border of the mesh or at non-manifold locations.
+        """
+        following = {}
+        for index in self._vertex_faces[vertex]:
+            v1, v2, v3 = self._faces[index]
+            if vertex == v1:
+                first, second = v2, v3
+            elif vertex == v2:
+                first, second = v3, v1
+            else:
+                first, second = v1, v2
+            if (first == second) or (vertex in (first, second)) or (first in following):
+                return None
+            following[first] = second
+        if not following:
+            return None
+        start = next(iter(following))
+        ring = [start]
+        current = following[start]
+        while current != start:
+            if (current not in following) or (len(ring) >= len(following)):
+                return None
+            ring.append(current)
+            current = following[current]
+        if len(ring) != len(following):
+            return None
+        return ring
+
+    def _get_neighbours(self, vertex):
+        result = set()
+        for index in self._vertex_faces[vertex]:
+            result.update(self._faces[index])
+        result.discard(vertex)
+        return result
+
+    def _is_collapsible(self, vertex, target, ring=None):
+        """ check the link condition for merging the vertex into a neighbour
+
+        The vertices adjacent to both of them must be the ones opposite to their common edge.
+        Otherwise the collapse would create a non-manifold mesh.
+        """
+        if ring is None:
+            ring = self._get_ring(vertex)
+            if (ring is None) or (target not in ring):
+                return False
+        target_index = ring.index(target)
+        expected = {ring[(target_index + 1) % len(ring)], ring[target_index - 1]}
+        return self._get_neighbours(target) & set(ring) == expected
+
+    def _get_candidate(self, vertex):
+        """ return the cheapest valid collapse of the vertex as (error, target) or None """
+        ring = self._get_ring(vertex)
+        # a tetrahedron would collapse into a double sided facet
+        if (ring is None) or (len(ring) < 4):
+            return None
+        base_error = max(self._errors[index] for index in self._vertex_faces[vertex])
+        if base_error > self.tolerance:
+            return None
+        points = self._points
+        origin = points[vertex]
+        count = len(ring)
+        old_facets = [(origin, points[ring[index]], points[ring[(index + 1) % count]])
+                      for index in range(count)]
+        # the sum of the (not normalized) normals: larger facets are more important
+        direction = [0, 0, 0]
+        for p1, p2, p3 in old_facets:
+            normal = _cross(_sub(p3, p1), _sub(p2, p1))
+            direction = [direction[axis] + normal[axis] for axis in range(3)]
+        length = math.sqrt(_dot(direction, direction))
+        if length == 0:
+            return None
+        direction = (direction[0] / length, direction[1] / length, direction[2] / length)
+        if not all(_is_facing(p1, p2, p3, direction) for p1, p2, p3 in old_facets):
+            return None
+        # two axes perpendicular to the direction
+        helper = (1, 0, 0) if abs(direction[0]) < 0.9 else (0, 1, 0)
+        axis1 = _cross(direction, helper)
+        axis1_length = math.sqrt(_dot(axis1, axis1))
+        axis1 = (axis1[0] / axis1_length, axis1[1] / axis1_length, axis1[2] / axis1_length)
+        axis2 = _cross(direction, axis1)
+        offsets = [_sub(points[neighbour], origin) for neighbour in ring]
+        flat = [(_dot(offset, axis1), _dot(offset, axis2)) for offset in offsets]
+        heights = [_dot(offset, direction) for offset in offsets]
+        # the projected fan must wind around the vertex exactly once
+        angle_sum = 0
+        for index in range(count):
+            p1, p2 = flat[index], flat[(index + 1) % count]
+            angle_sum += math.atan2(p1[0] * p2[1] - p1[1] * p2[0], p1[0] * p2[0] + p1[1] * p2[1])
+        if abs(angle_sum) > 3 * math.pi:
+            return None
+        # The deviation below the removed vertex is a lower limit for the deviation of a
+        # collapse.  Thus the expensive test of all edge intersections is skipped for most
+        # targets.
+        local = [(x, y, h) for (x, y), h in zip(flat, heights)]
+        options = []
+        for target_index in range(count):
+            new_facets = [(index, (index + 1) % count) for index in range(count)
+                          if target_index not in (index, (index + 1) % count)]
+            # the projection direction is the z axis of the local coordinates
+            target_local = local[target_index]
+            if not all(_is_facing(target_local, local[i1], local[i2], (0, 0, 1))
+                       for i1, i2 in new_facets):
+                continue
+            lower = self._get_vertex_deviation(flat, heights, target_index, new_facets)
+            if base_error + lower <= self.tolerance:
+                options.append((lower, target_index))
+        options.sort()
+        best = None
+        for lower, target_index in options:
+            if (best is not None) and (base_error + lower >= best[0]):
+                break
+            error = base_error + max(lower, self._get_edge_deviation(flat, heights, target_index))
+            if (error > self.tolerance) or ((best is not None) and (error >= best[0])):
+                continue
+            if self._is_collapsible(vertex, ring[target_index], ring=ring):
+                best = (error, ring[target_index])
+        return best
+
+    @staticmethod
+    def _get_vertex_deviation(flat, heights, target_index, new_facets):
+        """ return the height of the new facets below the removed vertex
+
+        The removed vertex is located at the origin of the projected coordinates.
+        """
+        (x1, y1), target_height = flat[target_index], heights[target_index]
+        for i1, i2 in new_facets:
+            (x2, y2), (x3, y3) = flat[i1], flat[i2]
+            determinant = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+            weight1 = ((y2 - y3) * -x3 + (x3 - x2) * -y3) / determinant
+            weight2 = ((y3 - y1) * -x3 + (x1 - x3) * -y3) / determinant
+            weight3 = 1 - weight1 - weight2
+            if min(weight1, weight2, weight3) >= -1e-9:
+                return abs(weight1 * target_height + weight2 * heights[i1]
+                           + weight3 * heights[i2])
+        # rounding errors: the removed vertex is not covered by the new facets
+        return math.inf
+
+    @staticmethod
+    def _get_edge_deviation(flat, heights, target_index):
+        """ return the maximum height difference at the intersections of old and new edges
+
+        The old edges connect the removed vertex (the origin) with its neighbours.  The new
+        edges connect the target with the other neighbours.
+        """
+        count = len(flat)
+        target_flat, target_height = flat[target_index], heights[target_index]
+        diagonals = [index for index in range(count)
+                     if index not in (target_index, (target_index + 1) % count,
+                                      (target_index - 1) % count)]
+        deviation = 0
+        for old_index in range(count):
+            if old_index == target_index:
+                continue
+            for new_index in diagonals:
+                if new_index == old_index:
+                    continue
+                crossing = _get_crossing((0, 0), flat[old_index], target_flat, flat[new_index])
+                if crossing is not None:
+                    s, u = crossing
+                    old_height = s * heights[old_index]
+                    new_height = (1 - u) * target_height + u * heights[new_index]
+                    deviation = max(deviation, abs(old_height - new_height))
+        return deviation
+
+    def _collapse(self, vertex, target, error):
+        changed = self._get_ring(vertex)
+        for index in list(self._vertex_faces[vertex]):
+            face = self._faces[index]
+            if target in face:
+                self._alive[index] = False
+                for other in face:
+                    self._vertex_faces[other].discard(index)
+            else:
+                face[face.index(vertex)] = target
+                self._errors[index] = error
+                self._vertex_faces[target].add(index)
+        self._vertex_faces[vertex] = set()
+        return changed
+
+    def _push_candidate(self, queue, vertex):
+        self._versions[vertex] += 1
+        candidate = self._get_candidate(vertex)
+        if candidate is None:
+            self._costs[vertex] = None
+        else:
+            error, target = candidate
+            self._costs[vertex] = error
+            heapq.heappush(queue, (error, vertex, self._versions[vertex], target))
+
+    def _postpone_candidate(self, queue, vertex):
+        """ schedule the evaluation of a changed vertex at its previous cost
+
+        Neighbouring collapses usually change a vertex multiple times before its turn has come.
+        Thus most repeated evaluations are avoided.  Vertices without a previous candidate are
+        evaluated immediately.
+        """
+        if self._costs[vertex] is None:
+            self._push_candidate(queue, vertex)
+        else:
+            self._versions[vertex] += 1
+            heapq.heappush(queue, (self._costs[vertex], vertex, self._versions[vertex], None))
+
+    def get_decimated(self, callback=None):
+        """ return the vertices, indices and normals of the decimated mesh
+
+        @param callback: a function accepting a "percent" keyword argument - the operation is
+            cancelled (None is returned) if it returns True
+        @returns: a tuple of three arrays (see TriangleMesh.add_triangles)
+        """
+        vertex_count = len(self._points)
+        queue = []
+        for vertex in range(vertex_count):
+            if callback and (vertex % 1000 == 0) and callback(
+                    percent=50.0 * vertex / max(vertex_count, 1)):
+                return None
+            self._push_candidate(queue, vertex)
+        initial_size = max(len(queue), 1)
+        steps = 0
+        while queue:
+            error, vertex, version, target = heapq.heappop(queue)
+            if version != self._versions[vertex]:
+                continue
+            steps += 1
+            if callback and (steps % 1000 == 0) and callback(
+                    percent=min(100.0, 50.0 + 50.0 * steps / initial_size)):
+                return None
+            if (target is None) or not self._is_collapsible(vertex, target):
+                # the vertex or the neighbourhood of the target changed in the meantime
+                self._push_candidate(queue, vertex)
+                continue
+            for changed in self._collapse(vertex, target, error):
+                self._postpone_candidate(queue, changed)
+            # discard the remaining entries of the removed vertex
+            self._versions[vertex] += 1
+        alive = numpy.array(self._alive, dtype=bool)
+        indices = numpy.array(self._faces, dtype=self.mesh.indices.dtype).reshape((-1, 3))
+        normals = self.mesh.normals.copy()
+        # the normals of modified facets are calculated from their new vertices
+        changed = numpy.array(self._errors) > 0
+        changed |= (indices != self.mesh.indices).any(axis=1)
+        normals[changed] = get_facet_normals(self.mesh.vertices, indices[changed])
+        used, new_indices = numpy.unique(indices[alive], return_inverse=True)
+        log.info("Mesh decimation: reduced %d facets to %d (tolerance: %g)",
+                 len(alive), alive.sum(), self.tolerance)
+        return (self.mesh.vertices[used], new_indices.reshape((-1, 3)), normals[alive])
@@ -18,17 +18,25 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import itertools
 import math
-import uuid
 
-from pycam.Geometry import epsilon, INFINITE, TransformableContainer, IDGenerator, Box3D, Point3D
-from pycam.Geometry.Matrix import TRANSFORMATIONS
+import numpy
+
+from pycam.Geometry import (epsilon, INFINITE, TransformableContainer, IDGenerator, Box3D, Point3D,
+                            DimensionalObject, get_fingerprint)
+from pycam.Geometry.Matrix import (get_combined_transformation, get_rotation_matrix_around_point,
+                                   transform_points, TRANSFORMATIONS)
+from pycam.Geometry.batch_intersection import TriangleArrays
 from pycam.Geometry.Line import Line
+from pycam.Geometry.MeshDecimation import MeshDecimation
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.Polygon import Polygon
-from pycam.Geometry.PointUtils import pcross, pdist, pmul, pnorm, pnormalized, psub
+from pycam.Geometry.PointUtils import pcross, pdist, pnorm, pnormalized, psub
+from pycam.Geometry.Slicing import get_slice_segments
 from pycam.Geometry.Triangle import Triangle
-from pycam.Geometry.TriangleKdtree import TriangleKdtree
+from pycam.Geometry.TriangleBVH import TriangleBVH
+from pycam.Geometry.TriangleMesh import TriangleMesh
 from pycam.Toolpath import Bounds
 from pycam.Utils import ProgressCounter
 import pycam.Utils.log
@@ -68,6 +76,163 @@ def get_combined_model(models):
     return result
 
 
+def get_model_view(models):
+    """ combine multiple models for collision queries without copying their geometry
+
+    Triangle models are wrapped in a CompositeModel.  Other types of models are combined via
+    "get_combined_model".
+    """
+    models = [model for model in models if model is not None]
+    if not models:
+        return None
+    elif len(models) == 1:
+        return models[0]
+    elif all(isinstance(model, Model) for model in models):
+        return CompositeModel(models)
+    else:
+        return get_combined_model(models)
+
+
+class CompositeModel(DimensionalObject):
+    """ read-only view of multiple triangle models
+
+    Queries are delegated to the members - each of them uses its own spatial index.  Thus the
+    geometry is neither copied nor indexed again.  The results are the same as for a combined
+    model (see "get_combined_model").
+    """
+
+    def __init__(self, models):
+        self._models = tuple(models)
+        box = get_combined_bounds(self._models)
+        if box is None:
+            self.minx = self.miny = self.minz = None
+            self.maxx = self.maxy = self.maxz = None
+        else:
+            self.minx, self.miny, self.minz = box.lower
+            self.maxx, self.maxy, self.maxz = box.upper
+
+    def __len__(self):
+        return sum(len(model) for model in self._models)
+
+    def __iter__(self):
+        for model in self._models:
+            yield from model.triangles()
+
+    def get_models(self):
+        return self._models
+
+    @property
+    def fingerprint(self):
+        return get_fingerprint(self.__class__.__name__,
+                               *(model.fingerprint for model in self._models))
+
+    def get_bounds(self):
+        return Bounds(Bounds.TYPE_CUSTOM, Box3D(Point3D(self.minx, self.miny, self.minz),
+                                                Point3D(self.maxx, self.maxy, self.maxz)))
+
+    def triangles(self, minx=-INFINITE, miny=-INFINITE, minz=-INFINITE, maxx=+INFINITE,
+                  maxy=+INFINITE, maxz=+INFINITE):
+        result = []
+        for model in self._models:
+            result.extend(model.triangles(minx, miny, minz, maxx, maxy, maxz))
+        return result
+
+    def get_max_height(self, cutter, x, y, minz=-INFINITE, maxz=+INFINITE):
+        """ calculate the highest position of the tool touching any member (see Model) """
+        margin = cutter.get_required_distance() + epsilon
+        result = None
+        for model in self._models:
+            if (model.maxz is None) or ((result is not None) and (model.maxz + margin <= result)):
+                # this model cannot raise the tool any further
+                continue
+            height = model.get_max_height(cutter, x, y, minz, maxz)
+            if (height is not None) and ((result is None) or (height > result)):
+                result = height
+                if result > maxz + epsilon:
+                    # the exact height is not relevant anymore
+                    break
+        return result
+
+    def get_max_heights(self, cutter, positions, minz=-INFINITE, maxz=+INFINITE, cache=None):
+        """ calculate "get_max_height" for many positions at once (see Model) """
+        result = [None] * len(positions)
+        for model in self._models:
+            if model.maxz is None:
+                continue
+            for index, height in enumerate(model.get_max_heights(cutter, positions, minz, maxz,
+                                                                 cache=cache)):
+                if (height is not None) and ((result[index] is None) or (height > result[index])):
+                    result[index] = height
+        return result
+
+
+class TransformationChain(DimensionalObject):
+    """ collect affine transformations of a model and apply them in one step
+
+    The transformations are combined into a single matrix.  The bounding box of the transformed
+    model is available without transforming the model (min[xyz], max[xyz], get_center).
+    The original model is never changed - "get_model" transforms a single copy.
+    """
+
+    def __init__(self, model):
+        self._model = model
+        self._matrices = []
+        self._bounds = None
+
+    def __len__(self):
+        """ the number of pending transformations """
+        return len(self._matrices)
+
+    def append(self, matrix):
+        """ add a 3x3 or 3x4 transformation matrix to the end of the chain """
+        self._matrices.append(matrix)
+        self._bounds = None
+
+    def get_matrix(self):
+        return get_combined_transformation(*self._matrices)
+
+    def get_model(self, callback=None):
+        """ return the original model or a transformed copy (if transformations are pending) """
+        if self._matrices:
+            model = self._model.copy()
+            model.transform_by_matrix(self.get_matrix(),
+                                      callback=model._get_progress_callback(callback))
+            # following calls share the result
+            self._model = model
+            self._matrices = []
+        return self._model
+
+    def _get_bounds(self):
+        if self._bounds is None:
+            model = self._model
+            matrix = self.get_matrix()
+            if not self._matrices or (model.minx is None):
+                self._bounds = ((model.minx, model.miny, model.minz),
+                                (model.maxx, model.maxy, model.maxz))
+            elif all(sum(1 for value in row[:3] if value != 0) <= 1 for row in matrix):
+                # each axis is mapped onto (at most) one axis: the corners of the box are enough
+                corners = itertools.product((model.minx, model.maxx), (model.miny, model.maxy),
+                                            (model.minz, model.maxz))
+                points = transform_points(list(corners), matrix)
+                self._bounds = (tuple(points.min(axis=0).tolist()),
+                                tuple(points.max(axis=0).tolist()))
+            elif hasattr(model, "get_mesh"):
+                self._bounds = model.get_mesh().get_transformed_bounds(matrix)
+            else:
+                # no shortcut available (e.g. rotated polygons)
+                model = self.get_model()
+                self._bounds = ((model.minx, model.miny, model.minz),
+                                (model.maxx, model.maxy, model.maxz))
+        return self._bounds
+
+    minx = property(lambda self: self._get_bounds()[0][0])
+    miny = property(lambda self: self._get_bounds()[0][1])
+    minz = property(lambda self: self._get_bounds()[0][2])
+    maxx = property(lambda self: self._get_bounds()[1][0])
+    maxy = property(lambda self: self._get_bounds()[1][1])
+    maxz = property(lambda self: self._get_bounds()[1][2])
+
+
 class BaseModel(IDGenerator, TransformableContainer):
 
     def __init__(self):
@@ -195,23 +360,9 @@ class BaseModel(IDGenerator, TransformableContainer):
         matrix = ((scale_x, 0, 0, 0), (0, scale_y, 0, 0), (0, 0, scale_z, 0))
         self.transform_by_matrix(matrix, callback=self._get_progress_callback(callback))
 
-    def _shift_to_origin(self, position, callback=None):
-        if position != Point3D(0, 0, 0):
-            self.shift(*(pmul(position, -1)), callback=callback)
-
-    def _shift_origin_to(self, position, callback=None):
-        if position != Point3D(0, 0, 0):
-            self.shift(*position, callback=callback)
-
     def rotate(self, center, axis_vector, angle, callback=None):
-        # shift the model to the rotation center
-        self._shift_to_origin(center, callback=callback)
-        # rotate the model
-        matrix = pycam.Geometry.Matrix.get_rotation_matrix_axis_angle(axis_vector, angle,
-                                                                      use_radians=False)
+        matrix = get_rotation_matrix_around_point(center, axis_vector, angle, use_radians=False)
         self.transform_by_matrix(matrix, callback=callback)
-        # shift the model back to its original position
-        self._shift_origin_to(center, callback=callback)
 
     def get_bounds(self):
         return Bounds(Bounds.TYPE_CUSTOM, Box3D(Point3D(self.minx, self.miny, self.minz),
@@ -223,72 +374,316 @@ class Model(BaseModel):
     def __init__(self, use_kdtree=True):
         import pycam.Exporters.STLExporter
         super().__init__()
-        self._triangles = []
-        self._item_groups.append(self._triangles)
+        # the triangles are stored in shared arrays - Triangle objects are created on demand
+        self._mesh = TriangleMesh()
         self._export_function = pycam.Exporters.STLExporter.STLExporter
-        # marker for state of kdtree and uuid
+        # marker for state of the spatial index
         self._dirty = True
-        # enable/disable kdtree
+        # enable/disable the spatial index
         self._use_kdtree = use_kdtree
-        self._t_kdtree = None
-        self.__uuid = None
+        self._bvh = None
 
     def __len__(self):
         """ Return the number of available items in the model.
         This is mainly useful for evaluating an empty model as False.
         """
-        return len(self._triangles)
+        return len(self._mesh)
 
     def __iter__(self):
-        yield from self._triangles
+        yield from self.triangles()
+
+    def __next__(self):
+        yield from self.triangles()
+
+    def __add__(self, other_model):
+        """ combine two models """
+        result = self.copy()
+        if isinstance(other_model, Model):
+            result.extend_mesh(other_model.get_mesh())
+        else:
+            for item in next(other_model):
+                result.append(item.copy())
+        return result
 
     def copy(self):
         result = self.__class__(use_kdtree=self._use_kdtree)
-        for triangle in self.triangles():
-            result.append(triangle.copy())
+        result.extend_mesh(self._mesh)
         return result
 
     @property
-    def uuid(self):
-        if (self.__uuid is None) or self._dirty:
-            self._update_caches()
-        return self.__uuid
+    def fingerprint(self):
+        """ hash value of the geometry - models with identical triangles share it """
+        return get_fingerprint(self.__class__.__name__, self._mesh.get_fingerprint())
+
+    def get_mesh(self):
+        """ return the array based storage of the triangles (see TriangleMesh) """
+        return self._mesh
+
+    def get_children_count(self):
+        # see Triangle.get_children_count
+        return 7 * len(self._mesh)
 
     def append(self, item):
         super().append(item)
         if isinstance(item, Triangle):
-            self._triangles.append(item)
-            # we assume, that the kdtree needs to be rebuilt again
+            index = self._mesh.add_triangle(item.p1, item.p2, item.p3, item.normal)
+            # keep the identity of the given triangle
+            self._mesh.set_triangle(index, item)
+            # we assume, that the spatial index needs to be rebuilt again
             self._dirty = True
 
+    def add_triangle(self, p1, p2, p3, normal=None):
+        """ add a triangle without creating a Triangle object
+
+        The vertices are expected in clockwise order (see Triangle).
+        """
+        index = self._mesh.add_triangle(p1, p2, p3, normal)
+        self._update_limits_from_mesh(self._mesh.lower[index], self._mesh.upper[index])
+        self._dirty = True
+
+    def add_triangles(self, vertices, indices, normals=None):
+        """ add a number of triangles given as arrays (see TriangleMesh.add_triangles) """
+        if len(indices) > 0:
+            new_facets = self._mesh.add_triangles(vertices, indices, normals)
+            self._update_limits_from_mesh(self._mesh.lower[new_facets.start:].min(axis=0),
+                                          self._mesh.upper[new_facets.start:].max(axis=0))
+            self._dirty = True
+
+    def extend_mesh(self, mesh):
+        """ add all triangles of a TriangleMesh """
+        if len(mesh) > 0:
+            self._mesh.extend(mesh)
+            self._update_limits_from_mesh(mesh.lower.min(axis=0), mesh.upper.max(axis=0))
+            self._dirty = True
+
+    def _update_limits_from_mesh(self, lower, upper):
+        minx, miny, minz = lower.tolist()
+        maxx, maxy, maxz = upper.tolist()
+        if self.minx is None:
+            self.minx, self.miny, self.minz = minx, miny, minz
+            self.maxx, self.maxy, self.maxz = maxx, maxy, maxz
+        else:
+            self.minx = min(self.minx, minx)
+            self.miny = min(self.miny, miny)
+            self.minz = min(self.minz, minz)
+            self.maxx = max(self.maxx, maxx)
+            self.maxy = max(self.maxy, maxy)
+            self.maxz = max(self.maxz, maxz)
+
+    def transform_by_matrix(self, matrix, transformed_list=None, callback=None):
+        # all triangles are transformed at once
+        self._mesh.transform_by_matrix(matrix)
+        # run the callback - e.g. for a progress counter
+        if callback:
+            callback()
+        self.reset_cache()
+
     def reset_cache(self):
-        super().reset_cache()
-        # the triangle kdtree needs to be reset after transforming the model
-        self._update_caches()
+        self.minx = None
+        self.miny = None
+        self.minz = None
+        self.maxx = None
+        self.maxy = None
+        self.maxz = None
+        if len(self._mesh) > 0:
+            self._update_limits_from_mesh(self._mesh.lower.min(axis=0),
+                                          self._mesh.upper.max(axis=0))
+        # the spatial index needs to be rebuilt after transforming the model
+        self._dirty = True
 
     def _update_caches(self):
         if self._use_kdtree:
-            self._t_kdtree = TriangleKdtree(self.triangles())
-        self.__uuid = str(uuid.uuid4())
-        # the kdtree is up-to-date again
+            self._bvh = TriangleBVH(self._mesh.lower, self._mesh.upper)
+        # the spatial index is up-to-date again
         self._dirty = False
 
+    def get_bvh(self):
+        """ return the spatial index of the triangles (see TriangleBVH) or None if disabled """
+        if self._use_kdtree and self._dirty:
+            self._update_caches()
+        return self._bvh
+
+    def get_triangle_indices(self, minx=-INFINITE, miny=-INFINITE, minz=-INFINITE, maxx=+INFINITE,
+                             maxy=+INFINITE, maxz=+INFINITE):
+        """ return the mesh indices of all triangles overlapping the given box """
+        bvh = self.get_bvh()
+        if bvh is None:
+            return numpy.arange(len(self._mesh))
+        # tolerate floating point inaccuracies along the z axis
+        return bvh.query((minx, miny, minz - epsilon), (maxx, maxy, maxz + epsilon))
+
     def triangles(self, minx=-INFINITE, miny=-INFINITE, minz=-INFINITE, maxx=+INFINITE,
                   maxy=+INFINITE, maxz=+INFINITE):
         if (minx == miny == minz == -INFINITE) and (maxx == maxy == maxz == +INFINITE):
-            return self._triangles
+            return self._mesh.get_triangles()
         if self._use_kdtree:
-            # update the kdtree, if new triangles were added meanwhile
-            if self._dirty:
-                self._update_caches()
-            return self._t_kdtree.search(minx, maxx, miny, maxy)
-        return self._triangles
+            indices = self.get_triangle_indices(minx, miny, minz, maxx, maxy, maxz)
+            return self._mesh.get_triangles(indices.tolist())
+        return self._mesh.get_triangles()
+
+    def get_max_height(self, cutter, x, y, minz=-INFINITE, maxz=+INFINITE):
+        """ calculate the highest position of the tool (dropped from above) touching the model
+
+        The triangles are visited in descending order of their height.  Thus triangles deep
+        below the highest contact point are usually never checked.
+        @param cutter: the tool to be used
+        @param x: requested position along the x axis
+        @param y: requested position along the y axis
+        @param minz: contact heights below this level are not relevant
+        @param maxz: the search may stop as soon as a contact above this level is found
+        @returns: the height of the tool or None (no collision above minz)
+        """
+        start = (x, y, maxz)
+
+        def get_height(index):
+            cut = cutter.drop_at(self._mesh.get_triangle(index), start)
+            return None if cut is None else cut[2]
+
+        bvh = self.get_bvh()
+        lower = (cutter.get_minx(start), cutter.get_miny(start), minz)
+        upper = (cutter.get_maxx(start), cutter.get_maxy(start), +INFINITE)
+        if bvh is None:
+            heights = [get_height(index) for index in range(len(self._mesh))]
+            heights = [height for height in heights if height is not None]
+            return max(heights) if heights else None
+        # the lowest point of the tool may be below the contact point ("required distance")
+        height = bvh.find_highest(lower, upper, get_height,
+                                  margin=cutter.get_required_distance() + epsilon,
+                                  limit=maxz + epsilon)[0]
+        return height
+
+    def get_max_heights(self, cutter, positions, minz=-INFINITE, maxz=+INFINITE,
+                        max_pairs=2 ** 16, cache=None):
+        """ calculate "get_max_height" for many positions at once
+
+        The candidate triangles of all positions are processed together by the array based
+        "get_drop_heights" of the cutter.  The results are identical to "get_max_height", apart
+        from heights above "maxz" (these are not relevant for the caller).
+        @param positions: sequence of x/y tuples
+        @param max_pairs: the number of triangle/position pairs to be processed in one step
+        @param cache: optional ContactCache for reusing heights and candidate triangles of
+            previous calls
+        @returns: a list of heights (None for positions without a collision)
+        """
+        positions = numpy.asarray(positions, dtype=numpy.float64).reshape((-1, 2))
+        if cache is None:
+            heights = self._get_max_heights(cutter, positions, minz, maxz, max_pairs)
+        else:
+            keys, heights = cache.get_heights((self.fingerprint, cutter.fingerprint, minz, maxz),
+                                              positions)
+            missing = numpy.flatnonzero(numpy.isnan(heights))
+            if len(missing) > 0:
+                heights[missing] = self._get_max_heights(cutter, positions[missing], minz, maxz,
+                                                         max_pairs, cache)
+                cache.set_heights([keys[index] for index in missing], heights[missing].tolist())
+        return [None if height == -numpy.inf else height for height in heights.tolist()]
+
+    def _get_max_heights(self, cutter, positions, minz, maxz, max_pairs, cache=None):
+        """ return an array of the heights (-inf without a collision) for "get_max_heights" """
+        starts = numpy.empty((len(positions), 3))
+        starts[:, :2] = positions
+        starts[:, 2] = maxz
+        bvh = self.get_bvh()
+        if bvh is None:
+            pair_facets = numpy.tile(numpy.arange(len(self._mesh)), len(starts))
+            pair_positions = numpy.repeat(numpy.arange(len(starts)), len(self._mesh))
+        else:
+            lowers = numpy.empty_like(starts)
+            lowers[:, :2] = positions - cutter.distance_radius
+            lowers[:, 2] = minz
+            uppers = numpy.empty_like(starts)
+            uppers[:, :2] = positions + cutter.distance_radius
+            uppers[:, 2] = INFINITE
+            if cache is None:
+                extent = positions.max(axis=0) - positions.min(axis=0)
+                if extent.min() <= 2 * cutter.distance_radius:
+                    # the positions are along a line parallel to the x or y axis
+                    pair_facets, pair_positions = bvh.query_sweep(lowers, uppers)
+                else:
+                    found = bvh.query_many(lowers, uppers)
+                    pair_facets = numpy.concatenate(found + [numpy.empty(0, dtype=numpy.intp)])
+                    pair_positions = numpy.repeat(numpy.arange(len(starts)),
+                                                  [len(f) for f in found])
+            else:
+                pair_facets, pair_positions = cache.query_candidates(self.fingerprint, bvh,
+                                                                     lowers, uppers)
+        heights = numpy.full(len(starts), -numpy.inf)
+        for offset in range(0, len(pair_facets), max_pairs):
+            facets = pair_facets[offset:offset + max_pairs]
+            pair_starts = pair_positions[offset:offset + max_pairs]
+            unique_facets, inverse = numpy.unique(facets, return_inverse=True)
+            triangles = TriangleArrays.from_mesh(self._mesh, unique_facets).take(inverse)
+            numpy.fmax.at(heights, pair_starts,
+                          cutter.get_drop_heights(triangles, starts[pair_starts]))
+        return heights
+
+    def get_push_intervals(self, cutter, p1, p2):
+        """ calculate the parts of the line from p1 to p2 blocked by the triangles of the model
+
+        All candidate triangles are processed together by the array based "get_push_intervals" of
+        the cutter.
+        @returns: arrays of the lowest and the highest blocked location (as distances from p1) and
+            the mesh indices of all colliding triangles
+        """
+        shape = cutter.get_push_shape()
+        reach = cutter.distance_radius if shape is None else max(cutter.distance_radius,
+                                                                 shape[0] + shape[1])
+        lower = numpy.minimum(p1[:3], p2[:3]) - (reach, reach, cutter.get_required_distance())
+        upper = numpy.maximum(p1[:3], p2[:3]) + reach
+        facets = self.get_triangle_indices(lower[0], lower[1], lower[2], upper[0], upper[1],
+                                           INFINITE)
+        starts, ends = cutter.get_push_intervals(TriangleArrays.from_mesh(self._mesh, facets), p1,
+                                                 p2)
+        found = starts <= ends
+        return starts[found], ends[found], facets[found]
+
+    def get_simplified_model(self, tolerance, callback=None):
+        """ return a copy of the model with fewer triangles (see MeshDecimation)
+
+        The surface of the result deviates less than 'tolerance' from the original model.
+        None is returned if the operation was cancelled via the callback.
+        """
+        decimated = MeshDecimation(self._mesh, tolerance).get_decimated(callback=callback)
+        if decimated is None:
+            return None
+        result = self.__class__(use_kdtree=self._use_kdtree)
+        result.add_triangles(*decimated)
+        return result
+
+    def get_waterline_contours(self, levels, callback=None):
+        """ return the horizontal cross sections of the model for many z levels at once
+
+        All levels are sliced in one sweep (see "get_slice_segments").
+        The toolpath generators do not slice the model: PushCutter moves the cutter along the
+        lines of its grid and ContourFollow calculates the waterlines of single triangles for the
+        shape of the cutter.  Thus only the horizontal planes of "get_waterline_contour" (model
+        projections and support grids) are sliced here.
+        @param levels: a sequence of z values
+        @returns: a list of ContourModel objects (one for each level) or None if the operation
+            was cancelled via the callback
+        """
+        level_indices, starts, ends = get_slice_segments(self._mesh, levels)[:3]
+        contours = [ContourModel(plane=Plane((0, 0, z), (0, 0, 1, 'v'))) for z in levels]
+        for counter, (level_index, start, end) in enumerate(zip(
+                level_indices.tolist(), starts.tolist(), ends.tolist())):
+            if callback and callback(percent=100.0 * counter / len(level_indices)):
+                return None
+            line = Line(tuple(start), tuple(end))
+            # the lines of almost touching vertices are too short for a polygon
+            if line.len >= epsilon:
+                contours[level_index].append(line)
+        return contours
 
     def get_waterline_contour(self, plane, callback=None):
+        if tuple(plane.n[:3]) == (0, 0, 1):
+            # horizontal planes are handled by the slicer
+            contours = self.get_waterline_contours([plane.p[2]], callback=callback)
+            return None if contours is None else contours[0]
         collision_lines = []
-        progress_max = 2 * len(self._triangles)
+        triangles = self.triangles()
+        progress_max = 2 * len(triangles)
         counter = 0
-        for t in self._triangles:
+        for t in triangles:
             if callback and callback(percent=100.0 * counter / progress_max):
                 return
             collision_line = plane.intersect_triangle(t, counter_clockwise=True)
@@ -341,6 +736,15 @@ class ContourModel(BaseModel):
             result.append(polygon.copy())
         return result
 
+    @property
+    def fingerprint(self):
+        """ hash value of the plane and the points of all polygons """
+        values = [self.__class__.__name__, self._plane.p, self._plane.n[:3]]
+        for polygon in self.get_polygons():
+            values.append("closed" if polygon.is_closed else "open")
+            values.append(polygon.get_points())
+        return get_fingerprint(*values)
+
     def _merge_polygon_if_possible(self, other_polygon, allow_reverse=False):
         """ Check if the given 'other_polygon' can be connected to another
         polygon of the the current model. Both polygons are merged if possible.
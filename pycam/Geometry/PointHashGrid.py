@@ -0,0 +1,146 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+import numpy
+
+from pycam.Geometry import epsilon
+
+
+_NEIGHBOUR_OFFSETS = tuple((dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                           for dz in (-1, 0, 1))
+# one half of the neighbours - the other half is covered by symmetry
+_FORWARD_OFFSETS = tuple(offset for offset in _NEIGHBOUR_OFFSETS if offset > (0, 0, 0))
+
+
+def _get_crowded_mask(points, tolerance):
+    """ detect the points having any other point in their own cell or in an adjacent cell
+
+    Only these points can be merged with another point.
+    """
+    cells = numpy.floor(points / tolerance).astype(numpy.int64)
+    cells -= cells.min(axis=0) - 1
+    sizes = (cells.max(axis=0) + 2).tolist()
+    if sizes[0] * sizes[1] * sizes[2] >= 2 ** 62:
+        # the cell keys would not fit into integers - treat all points as crowded
+        return numpy.ones(len(points), dtype=bool)
+    keys = (cells[:, 0] * sizes[1] + cells[:, 1]) * sizes[2] + cells[:, 2]
+    cell_keys, point_cells, cell_sizes = numpy.unique(keys, return_inverse=True,
+                                                      return_counts=True)
+    crowded_cells = cell_sizes > 1
+    for dx, dy, dz in _FORWARD_OFFSETS:
+        wanted = cell_keys + ((dx * sizes[1] + dy) * sizes[2] + dz)
+        found = numpy.searchsorted(cell_keys, wanted)
+        hit = found < len(cell_keys)
+        hit[hit] = cell_keys[found[hit]] == wanted[hit]
+        crowded_cells[hit] = True
+        crowded_cells[found[hit]] = True
+    return crowded_cells[point_cells]
+
+
+def merge_points(points, tolerance=None):
+    """ remove duplicate points from an array
+
+    The result is the same as feeding all points (in order) into a PointHashGrid.  But only
+    points with close neighbours are processed one by one.
+
+    @param points: array of shape (n, 3)
+    @param tolerance: points closer than this distance are merged (default: exact duplicates only)
+    @returns: tuple of the remaining points (in order of their first occurrence) and an array
+        containing the index of the remaining point for each original point
+    """
+    # adding zero turns "-0.0" into "0.0"
+    points = numpy.asarray(points, dtype=numpy.float64).reshape((-1, 3)) + 0.0
+    if len(points) == 0:
+        return points, numpy.empty(0, dtype=numpy.intp)
+    # group identical points (lexsort is stable: the first item of a group occurs first)
+    order = numpy.lexsort((points[:, 2], points[:, 1], points[:, 0]))
+    sorted_points = points[order]
+    group_starts = numpy.ones(len(points), dtype=bool)
+    group_starts[1:] = (sorted_points[1:] != sorted_points[:-1]).any(axis=1)
+    inverse = numpy.empty(len(points), dtype=numpy.intp)
+    inverse[order] = numpy.cumsum(group_starts) - 1
+    first_occurrences = order[group_starts]
+    # sort the groups by their first occurrence
+    group_order = numpy.argsort(first_occurrences)
+    group_ranks = numpy.empty(len(group_order), dtype=numpy.intp)
+    group_ranks[group_order] = numpy.arange(len(group_order))
+    unique_points = points[first_occurrences[group_order]]
+    inverse = group_ranks[inverse]
+    if tolerance:
+        targets = numpy.arange(len(unique_points))
+        grid = PointHashGrid(tolerance)
+        point_indices = {}
+        crowded = numpy.nonzero(_get_crowded_mask(unique_points, tolerance))[0]
+        for index, point in zip(crowded.tolist(), unique_points[crowded].tolist()):
+            merged = grid.point(*point)
+            targets[index] = point_indices.setdefault(merged, index)
+        remaining, targets = numpy.unique(targets, return_inverse=True)
+        unique_points = unique_points[remaining]
+        inverse = targets[inverse]
+    return unique_points, inverse
+
+
+class PointHashGrid:
+    """ merge points closer than a given tolerance
+
+    The space is divided into cubic cells with the size of the tolerance.  A new point is
+    compared only with the points in its own cell and the adjacent cells.  Thus each lookup
+    takes constant time - regardless of the order of the incoming points.
+    """
+
+    def __init__(self, tolerance=epsilon):
+        self.tolerance = tolerance
+        self._tolerance_sq = tolerance ** 2
+        self._cells = {}
+        # shortcut for exact duplicates (very common for shared vertices)
+        self._known = {}
+        self._count = 0
+
+    def __len__(self):
+        """ the number of distinct points (after merging) """
+        return self._count
+
+    def _get_cell(self, x, y, z):
+        return (math.floor(x / self.tolerance), math.floor(y / self.tolerance),
+                math.floor(z / self.tolerance))
+
+    def point(self, x, y, z):
+        """ return the closest known point within the tolerance or add the given point """
+        key = (x, y, z)
+        try:
+            return self._known[key]
+        except KeyError:
+            pass
+        cx, cy, cz = self._get_cell(x, y, z)
+        best = None
+        best_dist = self._tolerance_sq
+        for dx, dy, dz in _NEIGHBOUR_OFFSETS:
+            for other in self._cells.get((cx + dx, cy + dy, cz + dz), ()):
+                dist = (other[0] - x) ** 2 + (other[1] - y) ** 2 + (other[2] - z) ** 2
+                if dist < best_dist:
+                    best = other
+                    best_dist = dist
+        if best is None:
+            best = key
+            self._cells.setdefault((cx, cy, cz), []).append(best)
+            self._count += 1
+        self._known[key] = best
+        return best
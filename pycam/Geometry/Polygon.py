@@ -19,6 +19,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 from pycam.Geometry import epsilon, number, TransformableContainer, IDGenerator
 from pycam.Geometry.Line import Line
+from pycam.Geometry.Matrix import transform_points
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.PointUtils import padd, pcross, pdist, pdiv, pdot, pis_inside, pmul, pnorm, \
         pnormalized, psub
@@ -325,6 +326,21 @@ class Polygon(TransformableContainer):
     def get_children_count(self):
         return len(self._points) + self.plane.get_children_count()
 
+    def transform_by_matrix(self, matrix, transformed_list=None, callback=None):
+        if transformed_list is None:
+            transformed_list = set()
+        elif id(self) in transformed_list:
+            return
+        transformed_list.add(id(self))
+        # all points are transformed at once
+        self._points = [tuple(point)
+                        for point in transform_points(self._points, matrix).tolist()]
+        # the plane may be shared with other polygons (it is transformed only once)
+        self.plane.transform_by_matrix(matrix, transformed_list, callback=callback)
+        if callback:
+            callback()
+        self.reset_cache()
+
     def get_area(self):
         """ calculate the area covered by a line group
         Currently this works only for line groups in an xy-plane.
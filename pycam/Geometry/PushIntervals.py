@@ -0,0 +1,347 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+from pycam.Geometry.batch_intersection import pdot
+
+
+# the number of steps for searching contacts along edges (see "_add_rim_edge")
+SEARCH_STEPS = 32
+GOLDEN_RATIO = (numpy.sqrt(5.0) - 1) / 2
+
+
+class _IntervalHull:
+    """ collect the smallest interval containing all given intervals for every row """
+
+    def __init__(self, count):
+        self.lower = numpy.full(count, numpy.inf)
+        self.upper = numpy.full(count, -numpy.inf)
+
+    def add(self, lower, upper, valid, rows=None):
+        if rows is None:
+            rows = slice(None)
+        valid = valid & (lower <= upper)
+        self.lower[rows] = numpy.where(valid, numpy.minimum(self.lower[rows], lower),
+                                       self.lower[rows])
+        self.upper[rows] = numpy.where(valid, numpy.maximum(self.upper[rows], upper),
+                                       self.upper[rows])
+
+
+def _clip_linear(lower, upper, alpha, beta):
+    """ restrict the intervals to the values of t with "alpha + beta * t >= 0" """
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        root = -alpha / beta
+    lower = numpy.where(beta > 0, numpy.maximum(lower, root), lower)
+    upper = numpy.where(beta < 0, numpy.minimum(upper, root), upper)
+    # constraints independent of t
+    unsatisfiable = (beta == 0) & (alpha < 0)
+    return numpy.where(unsatisfiable, numpy.inf, lower), upper
+
+
+def _get_disc_ranges(center, direction, points, radius):
+    """ the values of t with the horizontal distance of "center + t * direction" to the points
+    being at most "radius"
+
+    @returns: lower and upper end of the range and the mask of the non-empty ranges
+    """
+    offset = points - center
+    along = pdot(offset, direction)
+    # the horizontal distance to the line
+    across_sq = (offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1]) - along * along
+    remaining = radius * radius - across_sq
+    half_width = numpy.sqrt(numpy.maximum(remaining, 0.0))
+    return along - half_width, along + half_width, remaining >= 0
+
+
+def _get_rim_radius(center_height, heights, radius, rounding):
+    """ the horizontal reach of the tool at the given heights (nan if it is out of reach)
+
+    The center height is the lower end of the vertical cylinder of the tool shape.
+    """
+    below = numpy.maximum(center_height - heights, 0.0)
+    with numpy.errstate(invalid="ignore"):
+        result = radius + numpy.sqrt(rounding * rounding - below * below)
+    return numpy.where(below <= rounding, result, numpy.nan)
+
+
+def _get_edge_part(p1, p2, center_height, lower_offset, upper_offset):
+    """ clip the edges to the part between the two heights relative to the center height
+
+    @returns: start and end of the parts and the mask of the non-empty parts
+    """
+    height = p2[:, 2] - p1[:, 2]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        factor_low = (center_height + lower_offset - p1[:, 2]) / height
+        factor_high = (center_height + upper_offset - p1[:, 2]) / height
+    flat = height == 0
+    inside_flat = ((p1[:, 2] >= center_height + lower_offset)
+                   & (p1[:, 2] <= center_height + upper_offset))
+    start = numpy.where(flat, 0.0, numpy.clip(numpy.minimum(factor_low, factor_high), 0.0, 1.0))
+    end = numpy.where(flat, 1.0, numpy.clip(numpy.maximum(factor_low, factor_high), 0.0, 1.0))
+    valid = numpy.where(flat, inside_flat, (numpy.maximum(factor_low, factor_high) >= 0)
+                        & (numpy.minimum(factor_low, factor_high) <= 1))
+    vector = p2 - p1
+    return (p1 + vector * start[:, numpy.newaxis], p1 + vector * end[:, numpy.newaxis],
+            valid & (start <= end))
+
+
+def _add_band(hull, center, direction, p1, p2, radius, valid):
+    """ add the ranges of t with "center + t * direction" passing the sides of the horizontal
+    capsules around the edges (the round ends are not included)
+    """
+    vector = p2 - p1
+    length = numpy.hypot(vector[:, 0], vector[:, 1])
+    valid = valid & (length > 0)
+    length = numpy.where(valid, length, 1.0)
+    edge_dir = vector[:, :2] / length[:, numpy.newaxis]
+    normal = numpy.stack((-edge_dir[:, 1], edge_dir[:, 0]), axis=-1)
+    offset = center[:2] - p1[:, :2]
+    normal_speed = normal[:, 0] * direction[0] + normal[:, 1] * direction[1]
+    edge_speed = edge_dir[:, 0] * direction[0] + edge_dir[:, 1] * direction[1]
+    normal_offset = normal[:, 0] * offset[:, 0] + normal[:, 1] * offset[:, 1]
+    edge_offset = edge_dir[:, 0] * offset[:, 0] + edge_dir[:, 1] * offset[:, 1]
+    valid &= normal_speed != 0
+    normal_speed = numpy.where(valid, normal_speed, 1.0)
+    for side in (-radius, radius):
+        t = (side - normal_offset) / normal_speed
+        position = edge_offset + t * edge_speed
+        hull.add(t, t, valid & (position >= 0) & (position <= length))
+
+
+def _add_capsule_wall(hull, center, direction, p1, p2, radius, valid):
+    """ add the ranges of t with "center + t * direction" being within "radius" of the edges -
+    apart from their round ends
+    """
+    vector = p2 - p1
+    length = numpy.sqrt(pdot(vector, vector))
+    valid = valid & (length > 0)
+    length = numpy.where(valid, length, 1.0)
+    edge_dir = vector / length[:, numpy.newaxis]
+    offset = center - p1
+    along_dir = pdot(edge_dir, numpy.broadcast_to(direction, edge_dir.shape))
+    along_offset = pdot(edge_dir, offset)
+    # squared distance to the line: (1 - along_dir^2) t^2 + 2 (q - along_dir along_offset) t + c
+    a = 1.0 - along_dir * along_dir
+    b = pdot(offset, numpy.broadcast_to(direction, offset.shape)) - along_dir * along_offset
+    c = pdot(offset, offset) - along_offset * along_offset - radius * radius
+    discriminant = b * b - a * c
+    valid &= (a > 0) & (discriminant >= 0)
+    a = numpy.where(valid, a, 1.0)
+    root = numpy.sqrt(numpy.maximum(discriminant, 0.0))
+    for t in ((-b - root) / a, (-b + root) / a):
+        position = along_offset + t * along_dir
+        hull.add(t, t, valid & (position >= 0) & (position <= length))
+
+
+def _find_maximum(func, low, high):
+    """ golden section search for the maximum of concave functions (one for each row)
+
+    @returns: the arguments and the values of the maxima
+    """
+    probe1 = high - GOLDEN_RATIO * (high - low)
+    probe2 = low + GOLDEN_RATIO * (high - low)
+    value1 = func(probe1)
+    value2 = func(probe2)
+    for _ in range(SEARCH_STEPS):
+        keep_lower = value1 >= value2
+        high = numpy.where(keep_lower, probe2, high)
+        low = numpy.where(keep_lower, low, probe1)
+        moved = numpy.where(keep_lower, high - GOLDEN_RATIO * (high - low),
+                            low + GOLDEN_RATIO * (high - low))
+        moved_value = func(moved)
+        probe1, probe2 = (numpy.where(keep_lower, moved, probe2),
+                          numpy.where(keep_lower, probe1, moved))
+        value1, value2 = (numpy.where(keep_lower, moved_value, value2),
+                          numpy.where(keep_lower, value1, moved_value))
+    use_first = value1 >= value2
+    return numpy.where(use_first, probe1, probe2), numpy.where(use_first, value1, value2)
+
+
+def _find_root(func, outside, inside):
+    """ bisection search for the border of the region with "func >= 0" (one for each row) """
+    for _ in range(SEARCH_STEPS):
+        middle = (outside + inside) / 2
+        is_inside = func(middle) >= 0
+        inside = numpy.where(is_inside, middle, inside)
+        outside = numpy.where(is_inside, outside, middle)
+    return inside
+
+
+def _add_rim_edge(hull, center, direction, p1, p2, radius, rounding, valid):
+    """ add the ranges of t with the edges touching the rounded rim of a flat-bottomed tool
+
+    There is no closed solution for this part of a toroidal tool.  Thus the ends of the range are
+    searched along the edges: the points of an edge touched by the tool form a single part of the
+    edge (the tool is convex).  Along this part the upper end of the range of a point is a concave
+    function of its position and the lower end is a convex function.
+    """
+    rows = numpy.flatnonzero(valid)
+    if len(rows) == 0:
+        return
+    p1 = p1[rows]
+    vector = p2[rows] - p1
+    center_height = center[2]
+
+    def get_points(indices, factors):
+        points = p1[indices] + vector[indices] * factors[:, numpy.newaxis]
+        return points, _get_rim_radius(center_height, points[:, 2], radius, rounding)
+
+    def get_margin(indices, factors):
+        # the horizontal distance between the point and the reach of the tool along the line
+        points, rim = get_points(indices, factors)
+        offset = points - center
+        across = offset[:, 0] * direction[1] - offset[:, 1] * direction[0]
+        return numpy.nan_to_num(rim, nan=0.0) - numpy.abs(across)
+
+    def get_range_end(indices, signs, factors):
+        # the upper end (positive sign) or the negated lower end (negative sign) of the range
+        points, rim = get_points(indices, factors)
+        lower, upper = _get_disc_ranges(center, direction, points, rim)[:2]
+        return numpy.where(signs > 0, upper, -lower)
+
+    indices = numpy.arange(len(rows))
+    inside, margin = _find_maximum(lambda factors: get_margin(indices, factors),
+                                   numpy.zeros(len(rows)), numpy.ones(len(rows)))
+    found = numpy.flatnonzero(margin >= 0)
+    if len(found) == 0:
+        return
+    # the part of the edge touched by the tool (both ends are searched at once)
+    indices = numpy.concatenate((found, found))
+    limits = numpy.repeat([0.0, 1.0], len(found))
+    inside = numpy.concatenate((inside[found], inside[found]))
+    limits = numpy.where(get_margin(indices, limits) >= 0, limits,
+                         _find_root(lambda factors: get_margin(indices, factors), limits, inside))
+    # search the upper and the lower end of the range at once
+    signs = numpy.repeat([1.0, -1.0], len(found))
+    low = numpy.concatenate((limits[:len(found)], limits[:len(found)]))
+    high = numpy.concatenate((limits[len(found):], limits[len(found):]))
+    ends = _find_maximum(lambda factors: get_range_end(indices, signs, factors), low, high)[1]
+    hull.add(-ends[len(found):], ends[:len(found)], numpy.ones(len(found), dtype=bool),
+             rows[found])
+
+
+def _add_face(hull, center, direction, triangles, radius, rounding):
+    """ add the ranges of t with the tool at "center + t * direction" touching the inner part of
+    the triangles
+
+    The contact is detected via a point of the tool on the plane of the triangle (the "witness").
+    Its position depends linearly on t.  Either the axis of the tool crosses the plane or the
+    lowest point of the tool (relative to the plane) is below the plane.  In the latter case, the
+    witness is the projection of this point onto the plane.  Vertical triangles are covered by
+    their edges.
+    """
+    normal = triangles.normal
+    # the normals point upwards
+    normal = numpy.where((normal[:, 2] < 0)[:, numpy.newaxis], -normal, normal)
+    valid = triangles.valid & (normal[:, 2] > 0)
+    plane_offset = pdot(normal, triangles.p1)
+    horizontal = numpy.hypot(normal[:, 0], normal[:, 1])
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        rim_dir = numpy.where((horizontal > 0)[:, numpy.newaxis],
+                              normal * [1.0, 1.0, 0.0] / horizontal[:, numpy.newaxis], 0.0)
+    lowest_offset = -radius * rim_dir - rounding * normal
+    # the witnesses and their movement along t (both are linear in t)
+    center_distance = pdot(normal, numpy.broadcast_to(center, normal.shape)) - plane_offset
+    center_speed = pdot(normal, numpy.broadcast_to(direction, normal.shape))
+    normal_z = numpy.where(valid, normal[:, 2], 1.0)
+    axis_witness = center - numpy.outer(center_distance / normal_z, (0.0, 0.0, 1.0))
+    axis_speed = direction - numpy.outer(center_speed / normal_z, (0.0, 0.0, 1.0))
+    lowest = center + lowest_offset
+    lowest_distance = pdot(normal, lowest) - plane_offset
+    lowest_witness = lowest - normal * lowest_distance[:, numpy.newaxis]
+    lowest_speed = direction - normal * center_speed[:, numpy.newaxis]
+    v0 = triangles.p3 - triangles.p1
+    v1 = triangles.p2 - triangles.p1
+    dot00 = pdot(v0, v0)
+    dot01 = pdot(v0, v1)
+    dot11 = pdot(v1, v1)
+    denom = dot00 * dot11 - dot01 * dot01
+    valid &= denom != 0
+    denom = numpy.where(valid, denom, 1.0)
+    for witness, speed, conditions in (
+            # the axis crosses the plane above the center
+            (axis_witness, axis_speed, ((-center_distance, -center_speed), )),
+            # the center is above the plane and the lowest point is below it
+            (lowest_witness, lowest_speed, ((center_distance, center_speed),
+                                            (-lowest_distance, -center_speed)))):
+        lower = numpy.full(len(triangles), -numpy.inf)
+        upper = numpy.full(len(triangles), numpy.inf)
+        for alpha, beta in conditions:
+            lower, upper = _clip_linear(lower, upper, alpha, beta)
+        # barycentric coordinates (see Triangle.is_point_inside)
+        offset = witness - triangles.p1
+        dot02 = pdot(v0, offset)
+        dot12 = pdot(v1, offset)
+        speed02 = pdot(v0, speed)
+        speed12 = pdot(v1, speed)
+        u = ((dot11 * dot02 - dot01 * dot12) / denom, (dot11 * speed02 - dot01 * speed12) / denom)
+        v = ((dot00 * dot12 - dot01 * dot02) / denom, (dot00 * speed12 - dot01 * speed02) / denom)
+        lower, upper = _clip_linear(lower, upper, u[0], u[1])
+        lower, upper = _clip_linear(lower, upper, v[0], v[1])
+        lower, upper = _clip_linear(lower, upper, 1.0 - u[0] - v[0], -u[1] - v[1])
+        hull.add(lower, upper, valid & numpy.isfinite(lower) & numpy.isfinite(upper))
+
+
+def get_push_intervals(triangles, start, direction, radius, rounding, height):
+    """ calculate the ranges of tool locations along a horizontal line colliding with triangles
+
+    The shape of the tool is described by a vertical cylinder open to the top (with "radius"
+    and its lower end at "height" above the location of the tool) and all points within the
+    distance "rounding" of this cylinder.  This describes cylindrical (no rounding), spherical
+    (zero radius) and toroidal tools.  The collisions of such a convex tool with a triangle
+    form a single range of locations along a line.  The range is combined from the contacts of
+    the vertices, the edges and the inner part of the triangle.
+    @param triangles: TriangleArrays
+    @param start: the location of the tool at t=0
+    @param direction: horizontal unit vector
+    @returns: arrays of the lowest and the highest t for each triangle (inf / -inf without a
+        collision)
+    """
+    start = numpy.asarray(start, dtype=numpy.float64)
+    direction = numpy.asarray(direction, dtype=numpy.float64)
+    center = start + (0.0, 0.0, height)
+    center_height = center[2]
+    hull = _IntervalHull(len(triangles))
+    reach = radius + rounding
+    with numpy.errstate(invalid="ignore"):
+        for point in (triangles.p1, triangles.p2, triangles.p3):
+            rim = _get_rim_radius(center_height, point[:, 2], radius, rounding)
+            lower, upper, found = _get_disc_ranges(center, direction, point, rim)
+            hull.add(lower, upper, found & ~numpy.isnan(rim) & triangles.valid)
+        for p1, p2 in ((triangles.p1, triangles.p2), (triangles.p2, triangles.p3),
+                       (triangles.p3, triangles.p1)):
+            # the part of the edge above the lower end of the cylinder
+            part1, part2, found = _get_edge_part(p1, p2, center_height, 0.0, numpy.inf)
+            found &= triangles.valid
+            for point in (part1, part2):
+                lower, upper, in_reach = _get_disc_ranges(center, direction, point, reach)
+                hull.add(lower, upper, found & in_reach)
+            _add_band(hull, center, direction, part1, part2, reach, found)
+            if rounding > 0:
+                # the part of the edge touching the rounded rim of the tool
+                part1, part2, found = _get_edge_part(p1, p2, center_height, -rounding, 0.0)
+                found &= triangles.valid
+                if radius > 0:
+                    _add_rim_edge(hull, center, direction, part1, part2, radius, rounding,
+                                  found)
+                else:
+                    _add_capsule_wall(hull, center, direction, part1, part2, rounding, found)
+        _add_face(hull, center, direction, triangles, radius, rounding)
+    return hull.lower, hull.upper
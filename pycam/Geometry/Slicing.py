@@ -0,0 +1,100 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+from pycam.Geometry.TriangleBVH import _expand_ranges
+
+
+def _get_edge_crossings(below, above, levels):
+    """ return the points where the edges from "below" to "above" reach the given levels
+
+    The result depends only on the two vertices of an edge.  Thus both facets sharing an edge
+    calculate exactly the same point.  Vertices located at a level are returned unchanged.
+    """
+    factors = (levels - below[:, 2]) / (above[:, 2] - below[:, 2])
+    points = below + factors[:, numpy.newaxis] * (above - below)
+    at_level = above[:, 2] == levels
+    points[at_level] = above[at_level]
+    points[:, 2] = levels
+    return points
+
+
+def get_slice_segments(mesh, levels):
+    """ intersect a mesh with a number of horizontal planes in one sweep
+
+    The facets and the levels are sorted once.  Each facet is combined with the range of levels
+    between its lowest and its highest vertex.  Thus the costs depend on the number of resulting
+    segments - not on the product of the number of facets and the number of levels.
+
+    Vertices located exactly at a level are considered to be above this level.  Thus every edge
+    in the plane is reported once (by the facet below the plane) and flat facets are ignored.
+    A level at the bottom of the mesh has no facets below it.  There the vertices at the level
+    are considered to be below it instead - the bottom edges are reported by the facets above.
+    The direction of a segment is derived from the order of the vertices of its facet (see
+    "Plane.intersect_triangle" with "counter_clockwise=True").  Thus the outlines of a closed
+    mesh run counter-clockwise around its material and the segments of adjacent facets share
+    their end points exactly.
+    @param mesh: a TriangleMesh
+    @param levels: a sequence of z values (in any order)
+    @returns: arrays of the level indices, the start points, the end points and the facet
+        indices of all segments - sorted by level
+    """
+    levels = numpy.asarray(levels, dtype=numpy.float64).reshape(-1)
+    level_order = numpy.argsort(levels, kind="stable")
+    sorted_levels = levels[level_order]
+    points = mesh.vertices[mesh.indices]
+    heights = points[:, :, 2]
+    facet_minz = heights.min(axis=1)
+    facet_maxz = heights.max(axis=1)
+    bottom = facet_minz.min() if len(points) > 0 else None
+    # a facet crosses all levels with "minz < level <= maxz" - or "minz <= level < maxz" at the
+    # bottom of the mesh
+    first = numpy.searchsorted(sorted_levels, facet_minz, side="right")
+    touches_bottom = (facet_minz == bottom) & (facet_maxz > bottom)
+    first[touches_bottom] = numpy.searchsorted(sorted_levels, bottom, side="left")
+    last = numpy.searchsorted(sorted_levels, facet_maxz, side="right")
+    counts = last - first
+    facets = numpy.repeat(numpy.arange(len(points)), counts)
+    sorted_level_indices = _expand_ranges(first, last)
+    # process the pairs level by level
+    pair_order = numpy.argsort(sorted_level_indices, kind="stable")
+    facets = facets[pair_order]
+    sorted_level_indices = sorted_level_indices[pair_order]
+    pair_levels = sorted_levels[sorted_level_indices]
+    pair_points = points[facets]
+    is_below = pair_points[:, :, 2] < pair_levels[:, numpy.newaxis]
+    at_bottom = pair_levels == bottom
+    is_below[at_bottom] |= pair_points[at_bottom, :, 2] == bottom
+    # Walking along the vertices of a facet, one edge leads upwards across the level and another
+    # one leads downwards.
+    next_is_below = numpy.roll(is_below, -1, axis=1)
+    upwards = numpy.argmax(is_below & ~next_is_below, axis=1)
+    downwards = numpy.argmax(~is_below & next_is_below, axis=1)
+    pair_range = numpy.arange(len(facets))
+    up_start = pair_points[pair_range, upwards]
+    up_end = pair_points[pair_range, (upwards + 1) % 3]
+    down_start = pair_points[pair_range, downwards]
+    down_end = pair_points[pair_range, (downwards + 1) % 3]
+    starts = _get_edge_crossings(up_start, up_end, pair_levels)
+    ends = _get_edge_crossings(down_end, down_start, pair_levels)
+    # a vertex touching the level from below results in a segment without length
+    valid = (starts != ends).any(axis=1)
+    return (level_order[sorted_level_indices[valid]], starts[valid], ends[valid],
+            facets[valid])
@@ -0,0 +1,276 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+import numpy
+
+from pycam.Geometry import epsilon
+from pycam.Geometry.TriangleBVH import _expand_ranges
+import pycam.Utils.log
+log = pycam.Utils.log.get_logger()
+
+
+def _get_shells(indices):
+    """ group the facets of a mesh into closed and consistently oriented shells
+
+    A shell is closed if each of its directed edges is used exactly once and the reversed edge
+    belongs to another facet of the shell.
+    @returns: tuple of the shell label of each facet and a boolean array marking the facets of
+        closed shells
+    """
+    count = len(indices)
+    edges = indices[:, [0, 1, 1, 2, 2, 0]].reshape((-1, 2)).astype(numpy.int64)
+    edge_facets = numpy.repeat(numpy.arange(count), 3)
+    base = int(indices.max()) + 1 if count > 0 else 1
+    keys = edges[:, 0] * base + edges[:, 1]
+    reversed_keys = edges[:, 1] * base + edges[:, 0]
+    order = numpy.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    duplicate = numpy.zeros(len(keys), dtype=bool)
+    same = sorted_keys[1:] == sorted_keys[:-1]
+    duplicate[order[1:][same]] = True
+    duplicate[order[:-1][same]] = True
+    positions = numpy.minimum(numpy.searchsorted(sorted_keys, reversed_keys), len(keys) - 1)
+    matched = ((sorted_keys[positions] == reversed_keys) & ~duplicate
+               & (edges[:, 0] != edges[:, 1]))
+    partners = order[positions]
+    matched &= ~duplicate[partners]
+    broken = numpy.zeros(count, dtype=bool)
+    broken[edge_facets[~matched]] = True
+    # connected components (label propagation with pointer jumping)
+    pairs_a = edge_facets[matched]
+    pairs_b = edge_facets[partners[matched]]
+    labels = numpy.arange(count)
+    while True:
+        minimum = numpy.minimum(labels[pairs_a], labels[pairs_b])
+        new_labels = labels.copy()
+        numpy.minimum.at(new_labels, pairs_a, minimum)
+        numpy.minimum.at(new_labels, pairs_b, minimum)
+        new_labels = new_labels[new_labels]
+        if numpy.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    closed = numpy.bincount(labels, weights=broken, minlength=count) == 0
+    return labels, closed[labels]
+
+
+def _get_cell_ranges(lower, upper, origin, resolution, count):
+    """ return the first and the last index of the cells touching the intervals """
+    first = numpy.clip(numpy.floor((lower - epsilon - origin) / resolution), 0, count - 1)
+    last = numpy.clip(numpy.floor((upper + epsilon - origin) / resolution), 0, count - 1)
+    return first.astype(numpy.int64), last.astype(numpy.int64)
+
+
+def _get_cell_pairs(lower, upper, origin, resolution, shape):
+    """ return the pairs of items (given by their xy bounding boxes) and the cells touching them
+    """
+    rows, columns = shape
+    first_columns, last_columns = _get_cell_ranges(lower[:, 0], upper[:, 0], origin[0],
+                                                   resolution, columns)
+    first_rows, last_rows = _get_cell_ranges(lower[:, 1], upper[:, 1], origin[1], resolution,
+                                             rows)
+    widths = last_columns - first_columns + 1
+    counts = widths * (last_rows - first_rows + 1)
+    items = numpy.repeat(numpy.arange(len(lower)), counts)
+    steps = _expand_ranges(numpy.zeros_like(counts), counts)
+    cell_rows = first_rows[items] + steps // widths[items]
+    cell_columns = first_columns[items] + steps % widths[items]
+    return items, cell_rows * columns + cell_columns
+
+
+class TopSurfaceFilter:
+    """ determine the facets of a triangle mesh that can be relevant for dropping a tool
+
+    A facet is irrelevant, if there is another point of the model directly above each of its
+    points: the tool would touch this higher point first - regardless of its shape and size.
+    Thus removing these facets does not change the result of any drop query - apart from
+    rounding, if a contact is shared by a removed facet.  Two conservative rules are applied:
+        - downward facing facets of closed shells: the inside of the shell is directly above
+          them, thus the shell has to cross every vertical line above them again
+        - facets below the "cover" of other closed shells: a grid of cells stores a lower limit
+          for the top surface of each shell (the lowest upward facing facet of the shell touching
+          the cell).  Cells crossed by the outline of a shell (edges between upward and other
+          facets) or outside of the shell are not used.  A facet is removed, if all cells
+          touching its bounding box are covered by a shell above its highest point.
+    The orientation of each shell is taken from its volume (not from the stored normals).  Shells
+    need to be closed (each edge is shared with exactly one other facet in reversed order) and
+    may not intersect themselves.  All facets of other shells are kept (unless they are covered).
+    """
+
+    def __init__(self, mesh, resolution=None, min_slope=1e-3, max_facets=2 ** 16):
+        """
+        @param mesh: a TriangleMesh
+        @param resolution: the size of the cells of the cover grid (default: 1/256 of the size
+            of the model)
+        @param min_slope: facets with a smaller z component of their (normalized) normal are
+            considered to be vertical
+        @param max_facets: the number of facets to be processed in one step
+        """
+        self.mesh = mesh
+        self.min_slope = min_slope
+        self.max_facets = max_facets
+        lower, upper = mesh.lower, mesh.upper
+        if resolution is None:
+            resolution = max((upper[:, :2].max(axis=0) - lower[:, :2].min(axis=0)).max() / 256,
+                             epsilon) if len(mesh) > 0 else 1
+        self.resolution = resolution
+
+    def get_visible_mask(self):
+        """ return a boolean array marking the facets, that need to be kept """
+        mesh = self.mesh
+        count = len(mesh)
+        if count == 0:
+            return numpy.zeros(0, dtype=bool)
+        vertices = mesh.vertices.astype(numpy.float64)
+        indices = mesh.indices
+        p1, p2, p3 = (vertices[indices[:, column]] for column in range(3))
+        # the orientation follows the order of the vertices (see TriangleMesh.normals)
+        normals = numpy.cross(p3 - p1, p2 - p1)
+        shells, closed = _get_shells(indices)
+        volumes = numpy.bincount(shells, weights=(p1 * normals).sum(axis=1), minlength=count)
+        # pointing to the outside of their shell
+        lengths = numpy.sqrt((normals ** 2).sum(axis=1))
+        outward_z = numpy.where(lengths > 0, normals[:, 2] / numpy.maximum(lengths, 1e-300), 0)
+        outward_z *= numpy.sign(volumes[shells])
+        # The orientation of almost vertical facets is not reliable (e.g. due to rounded
+        # vertices of slightly self-intersecting shells).
+        hidden = closed & (outward_z < -self.min_slope)
+        upward = closed & (outward_z > self.min_slope)
+        hidden |= self._get_covered_mask(shells, upward, p1, p2, p3)
+        return ~hidden
+
+    def _get_covered_mask(self, shells, upward, p1, p2, p3):
+        mesh = self.mesh
+        resolution = self.resolution
+        origin = mesh.lower[:, :2].min(axis=0).astype(numpy.float64)
+        size = mesh.upper[:, :2].max(axis=0) - origin
+        shape = (int(math.floor(size[1] / resolution)) + 1,
+                 int(math.floor(size[0] / resolution)) + 1)
+        cell_count = shape[0] * shape[1]
+        up_facets = numpy.flatnonzero(upward)
+        if len(up_facets) == 0:
+            return numpy.zeros(len(mesh), dtype=bool)
+        # lowest upward facet of each shell touching a cell and coverage of the cell center
+        shell_keys = []
+        shell_lowest = []
+        shell_inside = []
+        for offset in range(0, len(up_facets), self.max_facets):
+            facets = up_facets[offset:offset + self.max_facets]
+            items, cells = _get_cell_pairs(mesh.lower[facets], mesh.upper[facets], origin,
+                                           resolution, shape)
+            facets = facets[items]
+            centers = numpy.column_stack(
+                ((cells % shape[1] + 0.5) * resolution + origin[0],
+                 (cells // shape[1] + 0.5) * resolution + origin[1]))
+            shell_keys.append(shells[facets] * cell_count + cells)
+            shell_lowest.append(mesh.lower[facets, 2].astype(numpy.float64))
+            shell_inside.append(self._is_inside(centers, p1[facets], p2[facets], p3[facets]))
+        keys = numpy.concatenate(shell_keys)
+        lowest = numpy.concatenate(shell_lowest)
+        inside = numpy.concatenate(shell_inside)
+        order = numpy.argsort(keys, kind="stable")
+        keys, lowest, inside = keys[order], lowest[order], inside[order]
+        group_starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+        group_keys = keys[group_starts]
+        group_lowest = numpy.minimum.reduceat(lowest, group_starts)
+        group_inside = numpy.maximum.reduceat(inside, group_starts)
+        # exclude the cells crossed by the outline of a shell
+        outline_keys = self._get_outline_keys(shells, upward, origin, shape)
+        if len(outline_keys) > 0:
+            positions = numpy.minimum(numpy.searchsorted(outline_keys, group_keys),
+                                      len(outline_keys) - 1)
+            group_inside &= outline_keys[positions] != group_keys
+        cover = numpy.full(cell_count, -numpy.inf)
+        numpy.maximum.at(cover, group_keys[group_inside] % cell_count,
+                         group_lowest[group_inside])
+        # remove the facets below the cover
+        covered = numpy.zeros(len(mesh), dtype=bool)
+        candidates = numpy.flatnonzero(mesh.upper[:, 2] + epsilon
+                                       < cover.max(initial=-numpy.inf))
+        for offset in range(0, len(candidates), self.max_facets):
+            facets = candidates[offset:offset + self.max_facets]
+            items, cells = _get_cell_pairs(mesh.lower[facets], mesh.upper[facets], origin,
+                                           resolution, shape)
+            starts = numpy.flatnonzero(numpy.concatenate(([True], items[1:] != items[:-1])))
+            lowest_cover = numpy.minimum.reduceat(cover[cells], starts)
+            covered[facets[items[starts]]] = mesh.upper[facets[items[starts]], 2] + epsilon \
+                < lowest_cover
+        return covered
+
+    def _get_outline_keys(self, shells, upward, origin, shape):
+        """ return the sorted keys (shell and cell) of the cells touching the outline of shells
+        """
+        mesh = self.mesh
+        indices = mesh.indices
+        edges = indices[:, [0, 1, 1, 2, 2, 0]].reshape((-1, 2)).astype(numpy.int64)
+        edge_facets = numpy.repeat(numpy.arange(len(indices)), 3)
+        base = int(indices.max()) + 1
+        keys = numpy.minimum(edges[:, 0], edges[:, 1]) * base \
+            + numpy.maximum(edges[:, 0], edges[:, 1])
+        order = numpy.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # edges of closed shells are shared by exactly two facets
+        pairs = numpy.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+        first = edge_facets[order[pairs]]
+        second = edge_facets[order[pairs + 1]]
+        outline = (upward[first] != upward[second]) & (shells[first] == shells[second])
+        outline_edges = edges[order[pairs[outline]]]
+        if len(outline_edges) == 0:
+            return numpy.empty(0, dtype=numpy.int64)
+        vertices = mesh.vertices.astype(numpy.float64)
+        start_points = vertices[outline_edges[:, 0], :2]
+        end_points = vertices[outline_edges[:, 1], :2]
+        items, cells = _get_cell_pairs(numpy.minimum(start_points, end_points),
+                                       numpy.maximum(start_points, end_points), origin,
+                                       self.resolution, shape)
+        outline_shells = shells[first[outline]]
+        return numpy.unique(outline_shells[items] * (shape[0] * shape[1]) + cells)
+
+    @staticmethod
+    def _is_inside(points, p1, p2, p3):
+        """ check if the xy positions are inside (or on the border of) the projected triangles """
+        def side(a, b):
+            return ((b[:, 0] - a[:, 0]) * (points[:, 1] - a[:, 1])
+                    - (b[:, 1] - a[:, 1]) * (points[:, 0] - a[:, 0]))
+        s1, s2, s3 = side(p1, p2), side(p2, p3), side(p3, p1)
+        return (((s1 >= 0) & (s2 >= 0) & (s3 >= 0)) | ((s1 <= 0) & (s2 <= 0) & (s3 <= 0)))
+
+
+def get_top_surface_model(model, resolution=None):
+    """ return a model containing only the facets that are relevant for dropping a tool
+
+    The result must be used only for drop queries (see TopSurfaceFilter).  The facets of all
+    models are analyzed together.  Thus a model may hide parts of another one.
+    @param model: a Model or a CompositeModel
+    @param resolution: see TopSurfaceFilter
+    """
+    # avoid a circular import
+    from pycam.Geometry.Model import Model
+    models = model.get_models() if hasattr(model, "get_models") else [model]
+    combined = Model()
+    for one_model in models:
+        combined.extend_mesh(one_model.get_mesh())
+    mesh = combined.get_mesh()
+    visible = TopSurfaceFilter(mesh, resolution=resolution).get_visible_mask()
+    result = Model()
+    if visible.any():
+        result.add_triangles(mesh.vertices, mesh.indices[visible], mesh.normals[visible])
+    log.info("Top surface: kept %d of %d facets", len(result), len(mesh))
+    return result
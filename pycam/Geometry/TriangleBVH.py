@@ -0,0 +1,275 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import heapq
+
+import numpy
+
+
+def _expand_ranges(starts, ends):
+    """ return the concatenation of all ranges "start:end" as one array """
+    counts = ends - starts
+    if len(counts) == 0:
+        return numpy.empty(0, dtype=numpy.intp)
+    offsets = starts - (numpy.cumsum(counts) - counts)
+    return numpy.repeat(offsets, counts) + numpy.arange(counts.sum())
+
+
+def _get_overlap_mask(lower, upper, query_lower, query_upper):
+    return ((lower <= query_upper).all(axis=1) & (upper >= query_lower).all(axis=1))
+
+
+class TriangleBVH:
+    """ bounding volume hierarchy for the facets of a TriangleMesh
+
+    The tree is stored in flat arrays: each node owns a contiguous range of the "order" array
+    (facet indices) and the bounding box of these facets.  Inner nodes refer to their two
+    children, leaves are marked by a negative child index.  The tree is traversed iteratively
+    (one level at a time) - thus many nodes and many query boxes are tested in one step.
+    The maximum z value of each node ("upper[:, 2]") can be used for pruning.
+    """
+
+    def __init__(self, lower, upper, leaf_size=8):
+        """ build the hierarchy for the given facet bounding boxes
+
+        @param lower: array of shape (n, 3) containing the lower corner of every facet
+        @param upper: array of shape (n, 3) containing the upper corner of every facet
+        @param leaf_size: maximum number of facets in a leaf node
+        """
+        self.facet_lower = numpy.asarray(lower, dtype=numpy.float64).reshape((-1, 3))
+        self.facet_upper = numpy.asarray(upper, dtype=numpy.float64).reshape((-1, 3))
+        self.leaf_size = max(1, leaf_size)
+        self._build()
+
+    def __len__(self):
+        return len(self.order)
+
+    def _build(self):
+        count = len(self.facet_lower)
+        centers = (self.facet_lower + self.facet_upper) / 2
+        order = numpy.arange(count, dtype=numpy.intp)
+        starts = [0]
+        ends = [count]
+        left = [-1]
+        right = [-1]
+        depths = [0]
+        todo = [0]
+        while todo:
+            node = todo.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= self.leaf_size:
+                continue
+            indices = order[start:end]
+            node_centers = centers[indices]
+            spread = node_centers.max(axis=0) - node_centers.min(axis=0)
+            axis = int(spread.argmax())
+            if spread[axis] <= 0:
+                # all facets share the same center - no split possible
+                continue
+            middle = (end - start) // 2
+            partition = numpy.argpartition(node_centers[:, axis], middle)
+            order[start:end] = indices[partition]
+            for child_start, child_end in ((start, start + middle), (start + middle, end)):
+                starts.append(child_start)
+                ends.append(child_end)
+                left.append(-1)
+                right.append(-1)
+                depths.append(depths[node] + 1)
+                todo.append(len(starts) - 1)
+            left[node] = len(starts) - 2
+            right[node] = len(starts) - 1
+        self.order = order
+        self.starts = numpy.array(starts, dtype=numpy.intp)
+        self.ends = numpy.array(ends, dtype=numpy.intp)
+        self.left = numpy.array(left, dtype=numpy.intp)
+        self.right = numpy.array(right, dtype=numpy.intp)
+        node_count = len(starts)
+        self.lower = numpy.full((node_count, 3), numpy.inf)
+        self.upper = numpy.full((node_count, 3), -numpy.inf)
+        # the bounding boxes of the leaves are calculated via "reduceat" (requires sorted starts)
+        leaves = numpy.nonzero((self.left < 0) & (self.ends > self.starts))[0]
+        leaves = leaves[numpy.argsort(self.starts[leaves])]
+        if len(leaves) > 0:
+            self.lower[leaves] = numpy.minimum.reduceat(self.facet_lower[order],
+                                                        self.starts[leaves], axis=0)
+            self.upper[leaves] = numpy.maximum.reduceat(self.facet_upper[order],
+                                                        self.starts[leaves], axis=0)
+        # combine the boxes of the inner nodes - starting with the deepest level
+        depths = numpy.array(depths, dtype=numpy.intp)
+        inner = numpy.nonzero(self.left >= 0)[0]
+        for depth in range(int(depths.max()) if node_count > 0 else 0, -1, -1):
+            nodes = inner[depths[inner] == depth]
+            self.lower[nodes] = numpy.minimum(self.lower[self.left[nodes]],
+                                              self.lower[self.right[nodes]])
+            self.upper[nodes] = numpy.maximum(self.upper[self.left[nodes]],
+                                              self.upper[self.right[nodes]])
+
+    @property
+    def max_z(self):
+        """ the highest z value of the facets below each node """
+        return self.upper[:, 2]
+
+    def is_leaf(self, nodes):
+        return self.left[nodes] < 0
+
+    def get_facets_of_nodes(self, nodes):
+        """ return the facet indices belonging to the given nodes (concatenated) """
+        nodes = numpy.asarray(nodes, dtype=numpy.intp)
+        return self.order[_expand_ranges(self.starts[nodes], self.ends[nodes])]
+
+    def query(self, lower, upper):
+        """ return the indices of all facets overlapping the given box
+
+        @param lower: lower corner (x, y, z) of the box - infinite values are allowed
+        @param upper: upper corner (x, y, z) of the box
+        @returns: sorted array of facet indices
+        """
+        return self.query_many([lower], [upper])[0]
+
+    def query_many(self, lowers, uppers):
+        """ return the indices of the facets overlapping each of the given boxes
+
+        @param lowers: array of shape (n, 3) containing the lower corners of the boxes
+        @param uppers: array of shape (n, 3) containing the upper corners of the boxes
+        @returns: a list of n sorted arrays of facet indices
+        """
+        lowers = numpy.asarray(lowers, dtype=numpy.float64).reshape((-1, 3))
+        uppers = numpy.asarray(uppers, dtype=numpy.float64).reshape((-1, 3))
+        query_count = len(lowers)
+        # the traversal state is a list of pairs (node, query)
+        nodes = numpy.zeros(query_count, dtype=numpy.intp)
+        queries = numpy.arange(query_count, dtype=numpy.intp)
+        found_facets = []
+        found_queries = []
+        while len(nodes) > 0:
+            overlap = _get_overlap_mask(self.lower[nodes], self.upper[nodes], lowers[queries],
+                                        uppers[queries])
+            nodes = nodes[overlap]
+            queries = queries[overlap]
+            leaf = self.left[nodes] < 0
+            if leaf.any():
+                leaf_nodes = nodes[leaf]
+                counts = self.ends[leaf_nodes] - self.starts[leaf_nodes]
+                facets = self.order[_expand_ranges(self.starts[leaf_nodes],
+                                                   self.ends[leaf_nodes])]
+                facet_queries = numpy.repeat(queries[leaf], counts)
+                valid = _get_overlap_mask(self.facet_lower[facets], self.facet_upper[facets],
+                                          lowers[facet_queries], uppers[facet_queries])
+                found_facets.append(facets[valid])
+                found_queries.append(facet_queries[valid])
+            inner = nodes[~leaf]
+            queries = numpy.concatenate((queries[~leaf], queries[~leaf]))
+            nodes = numpy.concatenate((self.left[inner], self.right[inner]))
+        if not found_facets:
+            return [numpy.empty(0, dtype=numpy.intp) for _ in range(query_count)]
+        facets = numpy.concatenate(found_facets)
+        facet_queries = numpy.concatenate(found_queries)
+        sort_order = numpy.lexsort((facets, facet_queries))
+        facets = facets[sort_order]
+        splits = numpy.searchsorted(facet_queries[sort_order], numpy.arange(1, query_count))
+        return numpy.split(facets, splits)
+
+    def query_sweep(self, lowers, uppers):
+        """ return the facets overlapping the given boxes (e.g. the tool positions along a line)
+
+        The hierarchy is queried only once for the footprint of all boxes.  Afterwards the boxes
+        are sorted along the axis of the largest extent of the footprint.  The boxes overlapping
+        a facet on this axis form a contiguous range of this order, as long as the boxes have
+        the same size (e.g. the tool positions along a line parallel to the x or y axis).
+        Otherwise "query_many" is used.  The result is the same as for "query_many".
+        @returns: tuple of the facet indices and the index of the box for all pairs
+        """
+        lowers = numpy.asarray(lowers, dtype=numpy.float64).reshape((-1, 3))
+        uppers = numpy.asarray(uppers, dtype=numpy.float64).reshape((-1, 3))
+        if len(lowers) == 0:
+            return numpy.empty(0, dtype=numpy.intp), numpy.empty(0, dtype=numpy.intp)
+        axis = int(numpy.argmax(uppers.max(axis=0)[:2] - lowers.min(axis=0)[:2]))
+        box_order = numpy.argsort(lowers[:, axis], kind="stable")
+        box_lowers = lowers[box_order, axis]
+        box_uppers = uppers[box_order, axis]
+        if (numpy.diff(box_uppers) < 0).any():
+            # the boxes overlapping a facet are not contiguous
+            found = self.query_many(lowers, uppers)
+            return (numpy.concatenate(found + [numpy.empty(0, dtype=numpy.intp)]),
+                    numpy.repeat(numpy.arange(len(lowers)), [len(f) for f in found]))
+        candidates = self.query(lowers.min(axis=0), uppers.max(axis=0))
+        # the range of boxes overlapping each facet on the axis
+        first = numpy.searchsorted(box_uppers, self.facet_lower[candidates, axis], side="left")
+        last = numpy.searchsorted(box_lowers, self.facet_upper[candidates, axis], side="right")
+        last = numpy.maximum(first, last)
+        facets = numpy.repeat(candidates, last - first)
+        boxes = box_order[_expand_ranges(first, last)]
+        valid = _get_overlap_mask(self.facet_lower[facets], self.facet_upper[facets],
+                                  lowers[boxes], uppers[boxes])
+        return facets[valid], boxes[valid]
+
+    def find_highest(self, lower, upper, get_height, margin=0, limit=None):
+        """ branch-and-bound search for the highest result of "get_height" within a box
+
+        The nodes overlapping the box are visited in descending order of their maximum z value.
+        The search stops as soon as no remaining facet can exceed the best height found so far.
+
+        @param lower: lower corner of the box - its z value is the lowest height of interest
+        @param upper: upper corner of the box
+        @param get_height: function returning a height (or None) for a facet index.  The result
+            may not exceed the highest z value of the facet by more than "margin".
+        @param margin: maximum distance between a height and the top of its facet
+        @param limit: the search stops early, if a height above this value is found
+        @returns: tuple of the best height and the related facet index (or (None, None))
+        """
+        lower = numpy.asarray(lower, dtype=numpy.float64)
+        upper = numpy.asarray(upper, dtype=numpy.float64)
+        best_height = None
+        best_facet = None
+        # heap of (negative upper bound, node)
+        candidates = []
+        if _get_overlap_mask(self.lower[:1], self.upper[:1], lower, upper)[0]:
+            candidates.append((-(self.upper[0, 2] + margin), 0))
+        while candidates:
+            bound, node = heapq.heappop(candidates)
+            bound = -bound
+            if (best_height is not None) and (bound <= best_height):
+                # no remaining node can beat the current result
+                break
+            if self.left[node] >= 0:
+                children = numpy.array((self.left[node], self.right[node]))
+                overlap = _get_overlap_mask(self.lower[children], self.upper[children], lower,
+                                            upper)
+                for child, child_bound in zip(children[overlap].tolist(),
+                                              (self.upper[children[overlap], 2]
+                                               + margin).tolist()):
+                    heapq.heappush(candidates, (-child_bound, child))
+                continue
+            facets = self.order[self.starts[node]:self.ends[node]]
+            facets = facets[_get_overlap_mask(self.facet_lower[facets], self.facet_upper[facets],
+                                              lower, upper)]
+            facet_bounds = self.facet_upper[facets, 2] + margin
+            sort_order = numpy.argsort(-facet_bounds, kind="stable")
+            for facet, facet_bound in zip(facets[sort_order].tolist(),
+                                          facet_bounds[sort_order].tolist()):
+                if (best_height is not None) and (facet_bound <= best_height):
+                    break
+                height = get_height(facet)
+                if (height is not None) and ((best_height is None) or (height > best_height)):
+                    best_height = height
+                    best_facet = facet
+            if (limit is not None) and (best_height is not None) and (best_height > limit):
+                # the caller is not interested in the exact value
+                break
+        return best_height, best_facet
@@ -0,0 +1,295 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+
+import numpy
+
+from pycam.Geometry.Matrix import transform_normals, transform_points
+from pycam.Geometry.PointUtils import pcross, pnormalized, psub
+from pycam.Geometry.Triangle import Triangle
+
+
+# dtypes of the shared arrays
+COORDINATE_TYPE = numpy.float64
+INDEX_TYPE = numpy.int32
+
+
+def _get_grown_array(array, used, wanted):
+    """ return an array with room for at least 'wanted' rows
+
+    The first 'used' rows of the original array are retained.  The capacity is doubled in order
+    to keep the amortized costs of single appends low.
+    """
+    if wanted <= len(array):
+        return array
+    capacity = max(wanted, 2 * len(array), 16)
+    result = numpy.empty((capacity, ) + array.shape[1:], dtype=array.dtype)
+    result[:used] = array[:used]
+    return result
+
+
+def get_facet_normals(vertices, indices):
+    """ calculate the normalized normals of the given facets
+
+    The vertices of each facet are expected in clockwise order (see Triangle).
+    Degenerate facets receive a zero-length normal.
+    """
+    p1 = vertices[indices[:, 0]]
+    p2 = vertices[indices[:, 1]]
+    p3 = vertices[indices[:, 2]]
+    # this is equal to "pnormalized(pcross(psub(p3, p1), psub(p2, p1)))" in Triangle
+    normals = numpy.cross(p3 - p1, p2 - p1)
+    lengths = numpy.sqrt(normals[:, 0] ** 2 + normals[:, 1] ** 2 + normals[:, 2] ** 2)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, numpy.newaxis]
+    return normals
+
+
+class TriangleMesh:
+    """ storage for a large number of triangles based on shared arrays
+
+    The mesh consists of a table of vertices and an index table referencing three vertices for
+    each facet.  The normal and the bounding box (lower and upper corner) of every facet are
+    stored in additional arrays.  All arrays are allocated with spare capacity, thus the public
+    properties (e.g. "vertices") return views of the used part only.
+
+    Triangle objects are created only on request (see "get_triangle").  They are cached, in order
+    to keep their identity stable for callers comparing them (e.g. ContourFollow).
+    """
+
+    def __init__(self):
+        self._vertices = numpy.empty((0, 3), dtype=COORDINATE_TYPE)
+        self._indices = numpy.empty((0, 3), dtype=INDEX_TYPE)
+        self._normals = numpy.empty((0, 3), dtype=COORDINATE_TYPE)
+        self._lower = numpy.empty((0, 3), dtype=COORDINATE_TYPE)
+        self._upper = numpy.empty((0, 3), dtype=COORDINATE_TYPE)
+        self._vertex_count = 0
+        self._facet_count = 0
+        # map exact coordinates to vertex indices - this is built lazily
+        self._vertex_lookup = None
+        self._triangle_cache = {}
+        # hash states of the arrays and the number of hashed vertices and facets
+        self._hashes = None
+
+    def __len__(self):
+        return self._facet_count
+
+    def __getstate__(self):
+        # transfer only the used part of the arrays (e.g. to other processes)
+        return {"vertices": self.vertices.copy(), "indices": self.indices.copy(),
+                "normals": self.normals.copy()}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.add_triangles(state["vertices"], state["indices"], state["normals"])
+
+    @property
+    def vertices(self):
+        return self._vertices[:self._vertex_count]
+
+    @property
+    def indices(self):
+        return self._indices[:self._facet_count]
+
+    @property
+    def normals(self):
+        return self._normals[:self._facet_count]
+
+    @property
+    def lower(self):
+        """ the lowest x/y/z coordinates of each facet """
+        return self._lower[:self._facet_count]
+
+    @property
+    def upper(self):
+        """ the highest x/y/z coordinates of each facet """
+        return self._upper[:self._facet_count]
+
+    def get_bounds(self):
+        """ return the lower and upper corner of the complete mesh (or None if empty) """
+        if self._facet_count == 0:
+            return None
+        return (tuple(self.lower.min(axis=0).tolist()), tuple(self.upper.max(axis=0).tolist()))
+
+    def get_transformed_bounds(self, matrix):
+        """ return the bounds the mesh would have after "transform_by_matrix" (or None)
+
+        Only the vertices are transformed - the mesh itself is not changed.
+        """
+        if self._facet_count == 0:
+            return None
+        used = numpy.zeros(self._vertex_count, dtype=bool)
+        used[self.indices.ravel()] = True
+        points = transform_points(self.vertices[used], matrix)
+        return (tuple(points.min(axis=0).tolist()), tuple(points.max(axis=0).tolist()))
+
+    def get_fingerprint(self):
+        """ return a hash value (hex string) of the vertex, index and normal arrays
+
+        Meshes containing the same data share the same fingerprint - regardless of their identity
+        or the process they live in.  Only the facets added since the previous call are hashed
+        (the complete arrays after a transformation).
+        """
+        if self._hashes is None:
+            self._hashes = (0, 0, tuple(hashlib.blake2b(digest_size=16) for _ in range(3)))
+        vertex_count, facet_count, hashes = self._hashes
+        new_data = (self.vertices[vertex_count:].astype("<f8"),
+                    self.indices[facet_count:].astype("<i4"),
+                    self.normals[facet_count:].astype("<f8"))
+        for hash_state, data in zip(hashes, new_data):
+            hash_state.update(data.tobytes())
+        self._hashes = (self._vertex_count, self._facet_count, hashes)
+        result = hashlib.blake2b(digest_size=16)
+        for hash_state in hashes:
+            result.update(hash_state.digest())
+        return result.hexdigest()
+
+    def copy(self):
+        result = self.__class__()
+        result.add_triangles(self.vertices, self.indices, self.normals)
+        return result
+
+    def _get_vertex_index(self, point):
+        if self._vertex_lookup is None:
+            self._vertex_lookup = {tuple(vertex): index
+                                   for index, vertex in enumerate(self.vertices.tolist())}
+        key = (float(point[0]), float(point[1]), float(point[2]))
+        try:
+            return self._vertex_lookup[key]
+        except KeyError:
+            index = self._vertex_count
+            self._vertices = _get_grown_array(self._vertices, index, index + 1)
+            self._vertices[index] = key
+            self._vertex_count += 1
+            self._vertex_lookup[key] = index
+            return index
+
+    def _reserve_facets(self, count):
+        wanted = self._facet_count + count
+        for name in ("_indices", "_normals", "_lower", "_upper"):
+            setattr(self, name, _get_grown_array(getattr(self, name), self._facet_count, wanted))
+
+    def add_triangle(self, p1, p2, p3, normal=None):
+        """ add a single facet to the mesh and return its index
+
+        The vertices are expected in clockwise order (see Triangle).  Identical vertices are
+        shared with previously added facets.
+        """
+        if normal is None:
+            normal = pnormalized(pcross(psub(p3, p1), psub(p2, p1)))
+        index = self._facet_count
+        self._reserve_facets(1)
+        vertex_indices = [self._get_vertex_index(p) for p in (p1, p2, p3)]
+        points = self._vertices[vertex_indices]
+        self._indices[index] = vertex_indices
+        self._normals[index] = normal[:3]
+        self._lower[index] = points.min(axis=0)
+        self._upper[index] = points.max(axis=0)
+        self._facet_count += 1
+        return index
+
+    def add_triangles(self, vertices, indices, normals=None):
+        """ add a number of facets at once
+
+        @param vertices: array of shape (n, 3) containing the vertices referenced by "indices"
+        @param indices: array of shape (m, 3) with indices of clockwise ordered vertices
+        @param normals: optional array of shape (m, 3) - calculated if missing
+        @returns: the range of indices of the new facets
+        """
+        vertices = numpy.asarray(vertices, dtype=COORDINATE_TYPE).reshape((-1, 3))
+        indices = numpy.asarray(indices, dtype=INDEX_TYPE).reshape((-1, 3))
+        if normals is None:
+            normals = get_facet_normals(vertices, indices)
+        else:
+            normals = numpy.asarray(normals, dtype=COORDINATE_TYPE).reshape((-1, 3))
+        first_vertex = self._vertex_count
+        first_facet = self._facet_count
+        new_vertex_count = first_vertex + len(vertices)
+        self._vertices = _get_grown_array(self._vertices, first_vertex, new_vertex_count)
+        self._vertices[first_vertex:new_vertex_count] = vertices
+        self._vertex_count = new_vertex_count
+        # the lookup table is rebuilt when needed
+        self._vertex_lookup = None
+        self._reserve_facets(len(indices))
+        new_facet_count = first_facet + len(indices)
+        self._indices[first_facet:new_facet_count] = indices + first_vertex
+        self._normals[first_facet:new_facet_count] = normals
+        points = vertices[indices]
+        self._lower[first_facet:new_facet_count] = points.min(axis=1)
+        self._upper[first_facet:new_facet_count] = points.max(axis=1)
+        self._facet_count = new_facet_count
+        return range(first_facet, new_facet_count)
+
+    def extend(self, other):
+        """ append all facets of another mesh """
+        return self.add_triangles(other.vertices, other.indices, other.normals)
+
+    def _update_bounds(self):
+        points = self.vertices[self.indices]
+        self._lower[:self._facet_count] = points.min(axis=1)
+        self._upper[:self._facet_count] = points.max(axis=1)
+
+    def transform_by_matrix(self, matrix):
+        """ apply a 3x3 or 3x4 transformation matrix to all facets at once
+
+        The normals and the bounding boxes of the facets are recalculated.  The vertices of
+        mirrored facets are reordered in order to remain clockwise.  All Triangle objects are
+        discarded.
+        """
+        self._vertices[:self._vertex_count] = transform_points(self.vertices, matrix)
+        linear = [list(row[:3]) for row in matrix]
+        if linear != [[1, 0, 0], [0, 1, 0], [0, 0, 1]]:
+            # the normals are not changed by a translation
+            self._normals[:self._facet_count] = transform_normals(self.normals, matrix)
+            if numpy.linalg.det(linear) < 0:
+                self._indices[:self._facet_count] = self.indices[:, (0, 2, 1)]
+        self._update_bounds()
+        self._vertex_lookup = None
+        self._hashes = None
+        self.reset_triangles()
+
+    def get_points(self, index):
+        """ return the three vertices (clockwise) of a facet as tuples """
+        return tuple(tuple(point) for point in self._vertices[self._indices[index]].tolist())
+
+    def set_triangle(self, index, triangle):
+        """ use an existing Triangle object for representing a facet """
+        self._triangle_cache[index] = triangle
+
+    def get_triangle(self, index):
+        """ return a Triangle object representing the facet with the given index """
+        try:
+            return self._triangle_cache[index]
+        except KeyError:
+            p1, p2, p3 = self.get_points(index)
+            normal = tuple(self._normals[index].tolist()) + ('v', )
+            triangle = Triangle(p1, p2, p3, normal)
+            self._triangle_cache[index] = triangle
+            return triangle
+
+    def get_triangles(self, indices=None):
+        """ return a list of Triangle objects for the given facets (default: all) """
+        if indices is None:
+            indices = range(self._facet_count)
+        return [self.get_triangle(index) for index in indices]
+
+    def reset_triangles(self):
+        """ forget all Triangle objects, e.g. after the vertices were changed """
+        self._triangle_cache = {}
@@ -20,7 +20,11 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import collections
 import decimal
+import hashlib
 import math
+import struct
+
+import numpy
 
 import pycam.Utils.log
 _log = pycam.Utils.log.get_logger()
@@ -54,6 +58,24 @@ else:
     number = float
 
 
+def get_fingerprint(*values):
+    """ calculate a stable hash value (hex string) of strings and (arrays of) numbers
+
+    Numbers are hashed as 64 bit floats - thus "1" and "1.0" are equal.  In contrast to "hash"
+    the result does not depend on the process.
+    """
+    result = hashlib.blake2b(digest_size=16)
+    for value in values:
+        if isinstance(value, str):
+            data = value.encode()
+        else:
+            data = numpy.asarray(value, dtype="<f8").tobytes()
+        # the length separates consecutive values
+        result.update(struct.pack("<Q", len(data)))
+        result.update(data)
+    return result.hexdigest()
+
+
 Point3D = collections.namedtuple("Point3D", ("x", "y", "z"))
 Vector3D = collections.namedtuple("Vector3D", ("x", "y", "z"))
 
@@ -150,10 +172,13 @@ class TransformableContainer(DimensionalObject):
     def transform_by_matrix(self, matrix, transformed_list=None, callback=None):
         from pycam.Geometry.PointUtils import ptransform_by_matrix
         if transformed_list is None:
-            transformed_list = []
-        # Prevent any kind of loops or double transformations (e.g. Points in
-        # multiple containers (Line, Triangle, ...).
+            transformed_list = set()
+        # Prevent any kind of loops or double transformations (e.g. a Plane shared by
+        # multiple Polygons).
         # Use the 'id' builtin to prevent expensive object comparisons.
+        if id(self) in transformed_list:
+            return
+        transformed_list.add(id(self))
         for item in next(self):
             if isinstance(item, TransformableContainer):
                 item.transform_by_matrix(matrix, transformed_list, callback=callback)
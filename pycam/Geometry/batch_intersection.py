@@ -0,0 +1,382 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+from pycam.Geometry import INFINITE, epsilon
+from pycam.Geometry.Triangle import Triangle
+
+
+# Array variants of the functions in pycam.Geometry.intersection for a vertical drop.
+# Every row of the arguments describes a separate problem.  The operations are carried out in
+# exactly the same order as in the scalar functions, thus both produce identical results.
+# Instead of returning None, each function returns a mask of the rows containing a result.
+
+DIRECTION = numpy.array((0.0, 0.0, -1.0))
+AXIS = numpy.array((0.0, 0.0, 1.0))
+
+
+def _square(values):
+    # "numpy.power" differs from "x ** 2" in the last bit for some values
+    return numpy.float_power(values, 2.0)
+
+
+def _sqrt(values):
+    # like pycam.Geometry.sqrt: negative values result in zero
+    return numpy.sqrt(numpy.where(values > 0, values, 0.0))
+
+
+def pdot(a, b):
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1] + a[..., 2] * b[..., 2]
+
+
+def pcross(a, b):
+    return numpy.stack((a[..., 1] * b[..., 2] - b[..., 1] * a[..., 2],
+                        b[..., 0] * a[..., 2] - a[..., 0] * b[..., 2],
+                        a[..., 0] * b[..., 1] - b[..., 0] * a[..., 1]), axis=-1)
+
+
+def pmul(a, values):
+    return a * numpy.asarray(values)[..., numpy.newaxis]
+
+
+def pnorm(a):
+    return _sqrt(pdot(a, a))
+
+
+def pnormalized(a):
+    """ return the normalized vectors and the mask of the vectors with a non-zero length """
+    norm = pnorm(a)
+    valid = norm != 0
+    return a / numpy.where(valid, norm, 1.0)[..., numpy.newaxis], valid
+
+
+def pdist_sq(a, b):
+    diff = a - b
+    return _square(diff[..., 0]) + _square(diff[..., 1]) + _square(diff[..., 2])
+
+
+def intersect_plane_point(plane_point, plane_normal, direction, point):
+    """ see Plane.intersect_point
+
+    @returns: tuple of the intersection points, the distances and the mask of valid rows
+    """
+    norm = pnorm(direction)
+    normalized, valid = pnormalized(direction)
+    direction = numpy.where((norm == 1)[..., numpy.newaxis], direction, normalized)
+    valid = valid | (norm == 1)
+    denom = pdot(plane_normal, direction)
+    valid = valid & (denom != 0)
+    l_len = -(pdot(plane_normal, point) - pdot(plane_normal, plane_point)) \
+        / numpy.where(valid, denom, 1.0)
+    return point + pmul(direction, l_len), l_len, valid
+
+
+class TriangleArrays:
+    """ the vertices and the derived properties of many triangles (see Triangle)
+
+    Each row describes one triangle.  Rows may refer to the same triangle multiple times (e.g. for
+    combining it with different tool positions).  Degenerate triangles are marked as invalid
+    instead of raising errors.
+    """
+
+    def __init__(self, p1, p2, p3, normal):
+        self.p1 = numpy.asarray(p1, dtype=numpy.float64).reshape((-1, 3))
+        self.p2 = numpy.asarray(p2, dtype=numpy.float64).reshape((-1, 3))
+        self.p3 = numpy.asarray(p3, dtype=numpy.float64).reshape((-1, 3))
+        self.normal = numpy.asarray(normal, dtype=numpy.float64).reshape((-1, 3))
+        p1, p2, p3 = self.p1, self.p2, self.p3
+        self.lower = numpy.minimum(numpy.minimum(p1, p2), p3)
+        self.upper = numpy.maximum(numpy.maximum(p1, p2), p3)
+        self.center = ((p1 + p2) + p3) / 3.0
+        # the edges e1, e2 and e3: start, end, direction and length
+        self.edges = []
+        for start, end in ((p1, p2), (p2, p3), (p3, p1)):
+            vector = end - start
+            direction = pnormalized(vector)[0]
+            self.edges.append((start, end, direction, pnorm(vector)))
+        # the circumcircle
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            denom = pnorm(pcross(p2 - p1, p3 - p2))
+            self.valid = denom != 0
+            denom = numpy.where(self.valid, denom, 1.0)
+            self.radius = (_sqrt(pdist_sq(p2, p1)) * _sqrt(pdist_sq(p3, p2))
+                           * _sqrt(pdist_sq(p3, p1))) / (2 * denom)
+            self.radiussq = _square(self.radius)
+            denom2 = 2 * denom * denom
+            alpha = pdist_sq(p3, p2) * pdot(p1 - p2, p1 - p3) / denom2
+            beta = pdist_sq(p1, p3) * pdot(p2 - p1, p2 - p3) / denom2
+            gamma = pdist_sq(p1, p2) * pdot(p3 - p1, p3 - p2) / denom2
+            self.middle = pmul(p1, alpha) + pmul(p2, beta) + pmul(p3, gamma)
+
+    @classmethod
+    def from_mesh(cls, mesh, facets):
+        """ collect the given facets of a TriangleMesh """
+        points = mesh.vertices[mesh.indices[facets]]
+        return cls(points[:, 0], points[:, 1], points[:, 2], mesh.normals[facets])
+
+    def __len__(self):
+        return len(self.p1)
+
+    def take(self, rows):
+        """ return the selected rows (an index array or a mask) as a new object """
+        result = self.__class__.__new__(self.__class__)
+        for key, value in self.__dict__.items():
+            if key == "edges":
+                value = [tuple(item[rows] for item in edge) for edge in value]
+            else:
+                value = value[rows]
+            setattr(result, key, value)
+        return result
+
+    def get_triangle(self, row):
+        """ return a Triangle object for a single row """
+        return Triangle(tuple(self.p1[row].tolist()), tuple(self.p2[row].tolist()),
+                        tuple(self.p3[row].tolist()), tuple(self.normal[row].tolist()) + ("v", ))
+
+    def is_point_inside(self, p):
+        """ see Triangle.is_point_inside """
+        v0 = self.p3 - self.p1
+        v1 = self.p2 - self.p1
+        v2 = p - self.p1
+        dot00 = pdot(v0, v0)
+        dot01 = pdot(v0, v1)
+        dot02 = pdot(v0, v2)
+        dot11 = pdot(v1, v1)
+        dot12 = pdot(v1, v2)
+        denom = dot00 * dot11 - dot01 * dot01
+        valid = denom != 0
+        inv_denom = 1.0 / numpy.where(valid, denom, 1.0)
+        u = (dot11 * dot02 - dot01 * dot12) * inv_denom
+        v = (dot00 * dot12 - dot01 * dot02) * inv_denom
+        return valid & (u > 0) & (v > 0) & (u + v < 1)
+
+
+class ContactSelection:
+    """ keep the closest contact of every row
+
+    This is the equivalent of the "if d_x < d" chains in the "intersect" methods of the cutters.
+    """
+
+    def __init__(self, count):
+        self.distances = numpy.full(count, float(INFINITE))
+        self.heights = numpy.full(count, numpy.nan)
+        self.done = numpy.zeros(count, dtype=bool)
+
+    def add(self, distances, heights, valid, rows=None):
+        """ take the given candidates, if they are closer than the current contacts
+
+        @param rows: the rows (indices) the candidates belong to (default: all)
+        """
+        if rows is None:
+            rows = slice(None)
+        take = valid & ~self.done[rows] & (distances < self.distances[rows])
+        self.distances[rows] = numpy.where(take, distances, self.distances[rows])
+        self.heights[rows] = numpy.where(take, heights, self.heights[rows])
+
+    def finish_contacts(self):
+        """ ignore further candidates for the rows with a contact (an early "return") """
+        self.done |= ~numpy.isnan(self.heights)
+
+    def get_pending(self):
+        return numpy.nonzero(~self.done)[0]
+
+
+def get_first_minimum(groups, values, group_count):
+    """ find the first occurrence of the smallest value within each group
+
+    @param groups: ascending group number for each value
+    @returns: the index of the selected value for each group (-1 for empty groups)
+    """
+    result = numpy.full(group_count, -1)
+    if len(values) == 0:
+        return result
+    minima = numpy.full(group_count, numpy.inf)
+    numpy.minimum.at(minima, groups, values)
+    # the candidates are in ascending order - thus the first one of each group is picked
+    candidates = numpy.flatnonzero(values == minima[groups])
+    candidate_groups = groups[candidates]
+    firsts = numpy.ones(len(candidates), dtype=bool)
+    firsts[1:] = candidate_groups[1:] != candidate_groups[:-1]
+    result[candidate_groups[firsts]] = candidates[firsts]
+    return result
+
+
+def intersect_circle_plane(center, radius, triangles):
+    """ see pycam.Geometry.intersection.intersect_circle_plane
+
+    @returns: tuple of ccp, cp, d and the mask of valid rows
+    """
+    n = triangles.normal
+    valid = pdot(n, DIRECTION) != 0
+    n2 = n.copy()
+    n2[:, 2] = 0.0
+    n2_len = pnorm(n2)
+    flat = (n2_len == 0)[:, numpy.newaxis]
+    # the horizontal plane
+    cp_flat, d_flat, valid_flat = intersect_plane_point(triangles.center, n, DIRECTION, center)
+    ccp_flat = cp_flat - pmul(DIRECTION, d_flat)
+    # any other plane
+    n2 = pnormalized(n2)[0]
+    ccp = center + n2 * -radius
+    cp, d, valid_sloped = intersect_plane_point(triangles.center, n, DIRECTION, ccp)
+    valid &= numpy.where(flat[:, 0], valid_flat, valid_sloped)
+    return (numpy.where(flat, ccp_flat, ccp), numpy.where(flat, cp_flat, cp),
+            numpy.where(flat[:, 0], d_flat, d), valid)
+
+
+def intersect_circle_point(center, radiussq, point):
+    """ see pycam.Geometry.intersection.intersect_circle_point
+
+    @returns: tuple of ccp, cp, l and the mask of valid rows
+    """
+    ccp, l_len, valid = intersect_plane_point(center, AXIS, DIRECTION, point)
+    valid &= pdot(center - ccp, center - ccp) < radiussq - epsilon
+    return ccp, point, -l_len, valid
+
+
+def _closest_point(p1, p2, point):
+    """ see Line.closest_point """
+    direction, valid = pnormalized(p2 - p1)
+    dist = pdot(p1, direction) - pdot(point, direction)
+    return numpy.where(valid[:, numpy.newaxis], p1 - pmul(direction, dist), p1)
+
+
+def intersect_circle_line(center, radius, radiussq, edge):
+    """ see pycam.Geometry.intersection.intersect_circle_line
+
+    @param edge: tuple of start, end and direction of the lines
+    @returns: tuple of ccp, cp, l and the mask of valid rows
+    """
+    p1, p2, d = edge[:3]
+    horizontal = pdot(d, AXIS) == 0
+    # horizontal lines: intersect the projected line with the circle
+    proj1, l_len, valid = intersect_plane_point(center, AXIS, DIRECTION, p1)
+    proj2, l_len, valid = intersect_plane_point(center, AXIS, DIRECTION, p2)
+    pc = _closest_point(proj1, proj2, center)
+    d_sq = pdot(pc - center, pc - center)
+    valid_horizontal = d_sq < radiussq
+    a = _sqrt(radiussq - d_sq)
+    d1 = pdot(proj1 - pc, d)
+    d2 = pdot(proj2 - pc, d)
+    use_p1 = numpy.abs(d1) < a - epsilon
+    use_p2 = ~use_p1 & (numpy.abs(d2) < a - epsilon)
+    use_pc = ~use_p1 & ~use_p2 & (((d1 < -a + epsilon) & (d2 > a - epsilon))
+                                  | ((d2 < -a + epsilon) & (d1 > a - epsilon)))
+    valid_horizontal &= use_p1 | use_p2 | use_pc
+    ccp_horizontal = numpy.where(use_p1[:, numpy.newaxis], proj1,
+                                 numpy.where(use_p2[:, numpy.newaxis], proj2, pc))
+    cp_horizontal = ccp_horizontal - pmul(DIRECTION, l_len)
+    l_horizontal = -l_len
+    # any other line
+    n, valid = pnormalized(pcross(d, DIRECTION))
+    lp, l_len, valid_lp = intersect_plane_point(center, AXIS, d, p1)
+    valid &= valid_lp
+    v, valid_v = pnormalized(pcross(AXIS, n))
+    n2, valid_n2 = pnormalized(pcross(v, AXIS))
+    valid &= valid_v & valid_n2
+    dist = pdot(n2, center) - pdot(n2, lp)
+    distsq = dist * dist
+    valid &= ~(distsq > radiussq - epsilon)
+    dist2 = _sqrt(radiussq - distsq)
+    dist2 = numpy.where(pdot(d, AXIS) < 0, -dist2, dist2)
+    ccp = center - (pmul(n2, dist) - pmul(v, dist2))
+    cp, l_len, valid_cp = intersect_plane_point(p1, pcross(pcross(d, DIRECTION), d), DIRECTION,
+                                                ccp)
+    valid &= valid_cp
+    horizontal_column = horizontal[:, numpy.newaxis]
+    return (numpy.where(horizontal_column, ccp_horizontal, ccp),
+            numpy.where(horizontal_column, cp_horizontal, cp),
+            numpy.where(horizontal, l_horizontal, l_len),
+            numpy.where(horizontal, valid_horizontal, valid))
+
+
+def intersect_sphere_plane(center, radius, triangles):
+    """ see pycam.Geometry.intersection.intersect_sphere_plane
+
+    @returns: tuple of ccp, cp, d and the mask of valid rows
+    """
+    n = triangles.normal
+    n_d = pdot(n, DIRECTION)
+    ccp = numpy.where((n_d < 0)[:, numpy.newaxis], center - n * radius, center + n * radius)
+    cp, d, valid = intersect_plane_point(triangles.center, n, DIRECTION, ccp)
+    return ccp, cp, d, valid & (n_d != 0)
+
+
+def intersect_sphere_point(center, radiussq, point):
+    """ see pycam.Geometry.intersection.intersect_sphere_point
+
+    @returns: tuple of ccp, cp, dist and the mask of valid rows
+    """
+    p0_x0 = center - point
+    a = pdot(DIRECTION, DIRECTION)
+    b = 2 * pdot(p0_x0, DIRECTION)
+    c = pdot(p0_x0, p0_x0) - radiussq
+    d = b * b - 4 * a * c
+    dist = (-b - _sqrt(d)) / (2 * a)
+    return point + pmul(DIRECTION, -dist), point, dist, ~(d < 0)
+
+
+def intersect_sphere_line(center, radius, radiussq, edge):
+    """ see pycam.Geometry.intersection.intersect_sphere_line
+
+    @returns: tuple of ccp, cp, l and the mask of valid rows
+    """
+    p1, p2, d = edge[:3]
+    n, valid = pnormalized(pcross(d, DIRECTION))
+    dist = -pdot(center, n) + pdot(p1, n)
+    valid &= ~(numpy.abs(dist) > radius - epsilon)
+    n2 = pnormalized(pcross(n, d))[0]
+    dist2 = _sqrt(radiussq - dist * dist)
+    ccp = center + (pmul(n, dist) + pmul(n2, dist2))
+    cp, l_len, valid_cp = intersect_plane_point(p1, n2, DIRECTION, ccp)
+    return ccp, cp, l_len, valid & valid_cp
+
+
+def intersect_torus_plane(center, majorradius, minorradius, triangles):
+    """ see pycam.Geometry.intersection.intersect_torus_plane
+
+    @returns: tuple of ccp, cp, l and the mask of valid rows
+    """
+    n = triangles.normal
+    valid = (pdot(n, DIRECTION) != 0) & (pdot(n, AXIS) != 1)
+    b = n * -1.0
+    a = b - pmul(AXIS, pdot(AXIS, b))
+    a_sq = pdot(a, a)
+    valid &= a_sq > 0
+    a = a / _sqrt(numpy.where(valid, a_sq, 1.0))[:, numpy.newaxis]
+    ccp = (center + a * majorradius) + b * minorradius
+    cp, l_len, valid_cp = intersect_plane_point(triangles.center, n, DIRECTION, ccp)
+    return ccp, cp, l_len, valid & valid_cp
+
+
+def intersect_torus_point(center, majorradius, minorradius, minorradiussq, point):
+    """ see pycam.Geometry.intersection.intersect_torus_point (only the "drop" case)
+
+    @returns: tuple of ccp, cp, dist and the mask of valid rows
+    """
+    minlsq = (majorradius - minorradius) ** 2
+    maxlsq = (majorradius + minorradius) ** 2
+    l_sq = _square(point[:, 0] - center[:, 0]) + _square(point[:, 1] - center[:, 1])
+    valid = ~((l_sq < minlsq + epsilon) | (l_sq > maxlsq - epsilon))
+    l_len = _sqrt(l_sq)
+    z_sq = minorradiussq - _square(majorradius - l_len)
+    valid &= ~(z_sq < 0)
+    ccp = numpy.stack((point[:, 0], point[:, 1], center[:, 2] - _sqrt(z_sq)), axis=-1)
+    return ccp, point, ccp[:, 2] - point[:, 2], valid
@@ -18,12 +18,20 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
+import math
+
+import numpy
+
 from pycam.Geometry import INFINITE, sqrt, epsilon
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.Line import Line
 from pycam.Geometry.PointUtils import padd, pcross, pdiv, pdot, pmul, pnorm, pnormalized, \
         pnormsq, psub
-from pycam.Utils.polynomials import poly4_roots
+from pycam.Utils.polynomials import poly4_roots, poly4_roots_many
+
+
+# below this number of equations the array based solver is slower than the scalar one
+MIN_QUARTIC_BATCH_SIZE = 256
 
 
 def intersect_cylinder_point(center, axis, radius, radiussq, direction, point):
@@ -327,3 +335,42 @@ def intersect_torus_point(center, axis, majorradius, minorradius, majorradiussq,
         ccp = padd(point, pmul(direction, -l_len))
         dist = l_len
     return (ccp, point, dist)
+
+
+def intersect_torus_points(center, axis, majorradius, minorradius, majorradiussq, minorradiussq,
+                           direction, points):
+    """ calculate "intersect_torus_point" for many points
+
+    The quartic equations of the general case (neither drop nor push) are solved at once.  The
+    scalar solver is used for small numbers of points - it is faster there.
+    @returns: a list of results of "intersect_torus_point"
+    """
+    if (((direction[0] == 0) and (direction[1] == 0)) or (direction[2] == 0)
+            or (len(points) < MIN_QUARTIC_BATCH_SIZE)):
+        return [intersect_torus_point(center, axis, majorradius, minorradius, majorradiussq,
+                                      minorradiussq, direction, point) for point in points]
+    # see the general case of "intersect_torus_point"
+    x = numpy.array(points, dtype=numpy.float64)[:, :3] - center[:3]
+    v = numpy.array(pmul(direction, -1))
+    x_x = (x * x).sum(axis=1)
+    x_v = x.dot(v)
+    x1_x1 = (x[:, :2] * x[:, :2]).sum(axis=1)
+    x1_v1 = x[:, :2].dot(v[:2])
+    v1_v1 = v[:2].dot(v[:2])
+    r2_major = majorradiussq
+    r2_minor = minorradiussq
+    b = 4 * x_v
+    c = 2 * (x_x + 2 * x_v ** 2 + (r2_major - r2_minor) - 2 * r2_major * v1_v1)
+    d = 4 * (x_x * x_v + x_v * (r2_major - r2_minor) - 2 * r2_major * x1_v1)
+    e = (x_x ** 2 + 2 * x_x * (r2_major - r2_minor) + (r2_major - r2_minor) ** 2
+         - 4 * r2_major * x1_x1)
+    roots = poly4_roots_many(1.0, b, c, d, e)
+    result = []
+    for point, row in zip(points, roots.tolist()):
+        row = [root for root in row if not math.isnan(root)]
+        if row:
+            l_len = min(row)
+            result.append((padd(point, pmul(direction, -l_len)), point, l_len))
+        else:
+            result.append((None, None, INFINITE))
+    return result
@@ -904,7 +904,7 @@ def import_model(filename, color_as_height=False, fonts_cache=None, callback=Non
             if callback and (index % 50 == 0):
                 callback()
         log.info("DXFImporter: Imported DXF model (3D): %d triangles",
-                 len(model.triangles()))
+                 len(model))
         return model
     elif lines:
         model = pycam.Geometry.Model.ContourModel()
@@ -18,16 +18,19 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from io import BufferedReader, BytesIO, TextIOWrapper
+from io import BufferedReader, UnsupportedOperation
+import math
+import mmap
 import re
 from struct import unpack
 
+import numpy
+
 from pycam.errors import AbortOperationException, LoadFileError
 from pycam.Geometry import epsilon
 from pycam.Geometry.Model import Model
-from pycam.Geometry.PointKdtree import PointKdtree
-from pycam.Geometry.PointUtils import pcross, pdot, pnormalized, psub
-from pycam.Geometry.Triangle import Triangle
+from pycam.Geometry.PointHashGrid import merge_points
+from pycam.Geometry.TriangleMesh import get_facet_normals
 import pycam.Utils.log
 import pycam.Utils
 log = pycam.Utils.log.get_logger()
@@ -37,22 +40,35 @@ HEADER_SIZE = 80
 # The amount of bytes in the count field
 COUNT_SIZE = 4
 
-vertices = 0
-edges = 0
-kdtree = None
-last_unique_vertex = (None, None, None)
-
-
-def get_unique_vertex(x, y, z):
-    global vertices, last_unique_vertex
-    if kdtree:
-        p = kdtree.point(x, y, z)
-        if p == last_unique_vertex:
-            vertices += 1
-        return p
-    else:
-        vertices += 1
-        return (x, y, z)
+# The layout of a facet within a binary file
+BINARY_FACET_TYPE = numpy.dtype([("normal", "<f4", (3, )), ("vertices", "<f4", (3, 3)),
+                                 ("attributes", "<u2")])
+
+# Ascii files are read in blocks of this size (bytes)
+ASCII_BLOCK_SIZE = 4 * 1024 * 1024
+# Coordinates of ascii files are converted in chunks of this number of tokens
+ASCII_CHUNK_SIZE = 12 * 65536
+# Transitions of the state machine validating the structure of ascii files:
+# (state, keyword) -> new state
+# The keywords "normal" and "vertex" are followed by three numbers.
+ASCII_TRANSITIONS = {
+    ("outside", b"solid"): "header",
+    ("outside", b"facet"): "facet",
+    ("outside", b"endsolid"): "outside",
+    ("header", b"facet"): "facet",
+    ("header", b"endsolid"): "outside",
+    ("facet", b"normal"): "normal",
+    ("facet", b"outer"): "outer",
+    ("normal", b"outer"): "outer",
+    ("outer", b"loop"): "loop",
+    ("loop", b"vertex"): "loop",
+    ("loop", b"endloop"): "endloop",
+    ("endloop", b"endfacet"): "outside",
+}
+
+# Vertices closer than this distance are merged.  The value matches the previous implementation
+# based on PointKdtree (comparing the squared distance with "epsilon").
+VERTEX_MERGE_DISTANCE = math.sqrt(epsilon)
 
 
 def get_facet_count_if_binary_format(source):
@@ -87,207 +103,299 @@ def get_facet_count_if_binary_format(source):
         return facet_count
 
 
-def import_model(filename, use_kdtree=True, callback=None, **kwargs):
-    global vertices, edges, kdtree
-    vertices = 0
-    edges = 0
-    kdtree = None
+def _read_binary_facets(source, facet_count, filename):
+    """ decode all facets of a binary STL file at once
+
+    Local files are mapped into memory instead of being read.
+
+    @returns: array of BINARY_FACET_TYPE items
+    """
+    data_size = facet_count * BINARY_FACET_TYPE.itemsize
+    data = None
+    try:
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = HEADER_SIZE + COUNT_SIZE
+    except (AttributeError, OSError, ValueError, UnsupportedOperation):
+        # not a regular file (e.g. a stream in memory or a remote file)
+        source.read(HEADER_SIZE + COUNT_SIZE)
+        data = source.read(data_size)
+        offset = 0
+    if len(data) < offset + data_size:
+        raise LoadFileError("STLImporter: the binary file '{}' is truncated ({:d} facets expected)"
+                            .format(filename, facet_count))
+    return numpy.frombuffer(data, dtype=BINARY_FACET_TYPE, count=facet_count, offset=offset)
+
+
+def _get_ascii_token_blocks(source, block_size=ASCII_BLOCK_SIZE):
+    """ split a stream into lists of whitespace separated tokens
+
+    The stream is read in large blocks - thus the file never needs to fit into memory.
+    """
+    rest = b""
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        tokens = (rest + block).split()
+        if tokens and not block[-1:].isspace():
+            # the last token may be continued in the next block
+            rest = tokens.pop()
+        else:
+            rest = b""
+        yield tokens
+    if rest:
+        yield [rest]
+
+
+def _parse_ascii_numbers(tokens, missing_normals, filename):
+    """ convert the collected coordinates (twelve tokens per facet) at once
+
+    @returns: tuple of an array of shape (n, 4, 3) (normal and vertices of each facet) and the
+        mask of the facets without a valid normal
+    """
+    missing_normals = numpy.array(missing_normals, dtype=bool)
+    try:
+        return (numpy.array(tokens, dtype=bytes).astype(numpy.float64).reshape((-1, 4, 3)),
+                missing_normals)
+    except ValueError:
+        pass
+    # some numbers are invalid - convert the facets one by one
+    facets = []
+    valid = []
+    for index in range(len(missing_normals)):
+        facet_tokens = tokens[12 * index:12 * (index + 1)]
+        try:
+            points = [float(token) for token in facet_tokens[3:]]
+        except ValueError:
+            log.warn("Skipping facet with invalid vertices (%s) in '%s'. Please validate the STL "
+                     "file!", b" ".join(facet_tokens[3:]).decode(errors="replace"), filename)
+            continue
+        try:
+            normal = [float(token) for token in facet_tokens[:3]]
+        except ValueError:
+            # e.g. a decimal comma - the normal is ignored
+            normal = [0, 0, 0]
+            missing_normals[index] = True
+        facets.append(normal + points)
+        valid.append(index)
+    return (numpy.array(facets, dtype=numpy.float64).reshape((-1, 4, 3)),
+            missing_normals[valid])
+
+
+class _AsciiFacetParser:
+    """ state machine validating the structure of an ascii STL file
+
+    The transitions are defined in ASCII_TRANSITIONS.  Only the keywords are visited one by one.
+    The coordinates are collected as text and converted in large chunks.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.name = None
+        self.state = "outside"
+        self.facet_count = 0
+        self._expect_name = False
+        self._normal_tokens = None
+        self._vertex_tokens = None
+        self._chunk_tokens = []
+        self._chunk_missing_normals = []
+        self._chunks = []
+
+    def _warn_invalid_facet(self):
+        log.warn("Invalid facet definition (facet %d) in '%s'. Please validate the STL file!",
+                 self.facet_count, self.filename)
+
+    def _finish_facet(self):
+        if (len(self._vertex_tokens) != 9) or (len(self._normal_tokens) not in (0, 3)):
+            self._warn_invalid_facet()
+            return
+        if self._normal_tokens:
+            self._chunk_tokens.extend(self._normal_tokens)
+            self._chunk_missing_normals.append(False)
+        else:
+            self._chunk_tokens.extend((b"0", b"0", b"0"))
+            self._chunk_missing_normals.append(True)
+        self._chunk_tokens.extend(self._vertex_tokens)
+
+    def _convert_chunk(self):
+        self._chunks.append(_parse_ascii_numbers(self._chunk_tokens, self._chunk_missing_normals,
+                                                 self.filename))
+        self._chunk_tokens = []
+        self._chunk_missing_normals = []
+
+    def feed(self, tokens, final=False):
+        """ process a list of tokens
+
+        The numbers following a keyword may be located in the next list of tokens.  Thus the last
+        three tokens are not processed (unless "final" is set).
+
+        @returns: the number of processed tokens
+        """
+        state = self.state
+        index = 0
+        limit = len(tokens) if final else len(tokens) - 3
+        while index < limit:
+            token = tokens[index]
+            index += 1
+            new_state = ASCII_TRANSITIONS.get((state, token))
+            if new_state is None:
+                if state == "header":
+                    # the name of the solid
+                    if self._expect_name and re.fullmatch(rb"\w+", token):
+                        self.name = token.decode()
+                    self._expect_name = False
+                    continue
+                elif state == "invalid":
+                    # skip everything until the next facet
+                    new_state = ASCII_TRANSITIONS.get(("outside", token))
+                elif state != "outside":
+                    self._warn_invalid_facet()
+                    new_state = ASCII_TRANSITIONS.get(("outside", token), "invalid")
+                if new_state in (None, "invalid"):
+                    # anything outside of facets (e.g. the name after "endsolid") is ignored
+                    state = new_state or state
+                    continue
+            state = new_state
+            if token == b"vertex":
+                self._vertex_tokens.extend(tokens[index:index + 3])
+                index += 3
+            elif token == b"normal":
+                self._normal_tokens = tokens[index:index + 3]
+                index += 3
+            elif token == b"facet":
+                self.facet_count += 1
+                self._normal_tokens = []
+                self._vertex_tokens = []
+            elif token == b"endfacet":
+                self._finish_facet()
+            elif token == b"solid":
+                self._expect_name = True
+        self.state = state
+        if len(self._chunk_tokens) >= ASCII_CHUNK_SIZE:
+            self._convert_chunk()
+        return index
+
+    def get_facets(self):
+        """ return the normals, the vertices and the mask of facets without a normal """
+        if self.state not in ("outside", "header"):
+            log.warn("Incomplete facet definition at the end of '%s'. Please validate the STL "
+                     "file!", self.filename)
+        self._convert_chunk()
+        facets = numpy.concatenate([facets for facets, _ in self._chunks])
+        missing_normals = numpy.concatenate([missing for _, missing in self._chunks])
+        return facets[:, 0], facets[:, 1:], missing_normals
+
+
+def _read_ascii_facets(source, filename, callback=None, block_size=ASCII_BLOCK_SIZE):
+    """ parse the facets of an ascii STL file
+
+    @param block_size: the number of bytes to be read at once
+    @returns: tuple of the name of the solid (or None), the normals of the facets (shape (n, 3)),
+        their vertices (shape (n, 3, 3)) and a mask of the facets without a normal
+    """
+    parser = _AsciiFacetParser(filename)
+    rest = []
+    for tokens in _get_ascii_token_blocks(source, block_size=block_size):
+        tokens = rest + tokens
+        rest = tokens[parser.feed(tokens):]
+        if callback and callback():
+            raise AbortOperationException("STLImporter: load model operation cancelled")
+    parser.feed(rest, final=True)
+    return (parser.name, ) + parser.get_facets()
+
+
+def _add_facets(model, normals, points, filename, merge_distance=None, unordered=None):
+    """ add the facets of an STL file to a model
+
+    Vertices are merged and the orientation of the facets is validated for all facets at once.
+
+    @param normals: array of shape (n, 3) - zero vectors are handled as missing normals
+    @param points: array of shape (n, 3, 3) containing the vertices of the facets
+    @param unordered: optional mask of facets without a normal, whose orientation is defined by
+        the order of their vertices
+    """
+    normals = numpy.array(normals, dtype=numpy.float64)
+    vertices, indices = merge_points(points, tolerance=merge_distance)
+    indices = indices.reshape((-1, 3))
+    p1, p2, p3 = vertices[indices[:, 0]], vertices[indices[:, 1]], vertices[indices[:, 2]]
+    # the vertices are supposed to be in counter-clockwise order (matching the normal)
+    cross = numpy.cross(p2 - p1, p3 - p1)
+    dotcross = (normals[:, 0] * cross[:, 0] + normals[:, 1] * cross[:, 1]
+                + normals[:, 2] * cross[:, 2])
+    # Facets with a zero normal are turned upwards.  Vertical facets keep their orientation.
+    missing_normals = (normals == 0).all(axis=1)
+    dotcross[missing_normals] = numpy.where(cross[missing_normals, 2] != 0,
+                                            cross[missing_normals, 2],
+                                            (cross[missing_normals] ** 2).sum(axis=1))
+    if unordered is not None:
+        dotcross[unordered] = (cross[unordered] ** 2).sum(axis=1)
+    conflicts = numpy.nonzero(dotcross < 0)[0]
+    if len(conflicts) > 0:
+        log.warn("Inconsistent normal/vertices found in %d facet definitions (e.g. %d) of '%s'. "
+                 "Please validate the STL file!", len(conflicts), conflicts[0] + 1, filename)
+    invalid = numpy.nonzero(dotcross == 0)[0]
+    if len(invalid) > 0:
+        # the three points are in a line - or two points are identical
+        # usually this is caused by points, that are too close together
+        # check the value of VERTEX_MERGE_DISTANCE
+        log.warn("Skipping %d invalid triangles (e.g. %s / %s / %s) - maybe the resolution of "
+                 "the model is too high?", len(invalid),
+                 *(tuple(point) for point in vertices[indices[invalid[0]]].tolist()))
+    # Triangle expects the vertices in clockwise order
+    flipped = dotcross > 0
+    indices[flipped] = indices[flipped][:, (0, 2, 1)]
+    normals[missing_normals] = get_facet_normals(vertices, indices[missing_normals])
+    valid = dotcross != 0
+    # drop the vertices, that are used only by invalid facets
+    used_vertices, indices = numpy.unique(indices[valid], return_inverse=True)
+    model.add_triangles(vertices[used_vertices], indices.reshape((-1, 3)), normals[valid])
 
-    normal_conflict_warning_seen = False
 
+def import_model(filename, use_kdtree=True, callback=None, **kwargs):
+    """ import a binary or ascii STL file
+
+    @param use_kdtree: merge vertices that are very close to each other and enable the spatial
+        index of the resulting model
+    """
     if hasattr(filename, "read"):
-        # make sure that the input stream can seek and has ".len"
+        # make sure that the input stream supports "peek"
         f = BufferedReader(filename)
         # useful for later error messages
         filename = "input stream"
+        close_source = False
     else:
         try:
             url_file = pycam.Utils.URIHandler(filename).open()
-            # urllib.urlopen objects do not support "seek" - so we need a buffered reader
-            # Is there a better approach than consuming the whole file at once?
-            f = BufferedReader(BytesIO(url_file.read()))
-            url_file.close()
         except IOError as exc:
             raise LoadFileError("STLImporter: Failed to read file ({}): {}".format(filename, exc))
+        # local files are read directly (see "_read_binary_facets")
+        f = url_file if url_file.seekable() else BufferedReader(url_file)
+        close_source = True
 
     # the facet count is only available for the binary format
     facet_count = get_facet_count_if_binary_format(f)
     is_binary = (facet_count is not None)
 
-    if use_kdtree:
-        kdtree = PointKdtree([], 3, 1, epsilon)
     model = Model(use_kdtree)
-
-    t = None
-    p1 = None
-    p2 = None
-    p3 = None
+    merge_distance = VERTEX_MERGE_DISTANCE if use_kdtree else None
 
     if is_binary:
-        # Skip the header and count fields of binary stl file
-        f.seek(HEADER_SIZE + COUNT_SIZE)
-
-        for i in range(1, facet_count + 1):
-            if callback and callback():
-                raise AbortOperationException("STLImporter: load model operation cancelled")
-            a1 = unpack("<f", f.read(4))[0]
-            a2 = unpack("<f", f.read(4))[0]
-            a3 = unpack("<f", f.read(4))[0]
-
-            n = (float(a1), float(a2), float(a3), 'v')
-
-            v11 = unpack("<f", f.read(4))[0]
-            v12 = unpack("<f", f.read(4))[0]
-            v13 = unpack("<f", f.read(4))[0]
-
-            p1 = get_unique_vertex(float(v11), float(v12), float(v13))
-
-            v21 = unpack("<f", f.read(4))[0]
-            v22 = unpack("<f", f.read(4))[0]
-            v23 = unpack("<f", f.read(4))[0]
-
-            p2 = get_unique_vertex(float(v21), float(v22), float(v23))
-
-            v31 = unpack("<f", f.read(4))[0]
-            v32 = unpack("<f", f.read(4))[0]
-            v33 = unpack("<f", f.read(4))[0]
-
-            p3 = get_unique_vertex(float(v31), float(v32), float(v33))
-
-            # not used (additional attributes)
-            f.read(2)
-
-            dotcross = pdot(n, pcross(psub(p2, p1), psub(p3, p1)))
-            if a1 == a2 == a3 == 0:
-                dotcross = pcross(psub(p2, p1), psub(p3, p1))[2]
-                n = None
-
-            if dotcross > 0:
-                # Triangle expects the vertices in clockwise order
-                t = Triangle(p1, p3, p2)
-            elif dotcross < 0:
-                if not normal_conflict_warning_seen:
-                    log.warn("Inconsistent normal/vertices found in facet definition %d of '%s'. "
-                             "Please validate the STL file!", i, filename)
-                    normal_conflict_warning_seen = True
-                t = Triangle(p1, p2, p3)
-            else:
-                # the three points are in a line - or two points are identical
-                # usually this is caused by points, that are too close together
-                # check the tolerance value in pycam/Geometry/PointKdtree.py
-                log.warn("Skipping invalid triangle: %s / %s / %s (maybe the resolution of the "
-                         "model is too high?)", p1, p2, p3)
-                continue
-            if n:
-                t.normal = n
-
-            model.append(t)
+        facets = _read_binary_facets(f, facet_count, filename)
+        if callback and callback():
+            raise AbortOperationException("STLImporter: load model operation cancelled")
+        _add_facets(model, facets["normal"], facets["vertices"], filename,
+                    merge_distance=merge_distance)
     else:
-        # from here on we want to use a text based input stream (not bytes)
-        f = TextIOWrapper(f, encoding="utf-8")
-        solid = re.compile(r"\s*solid\s+(\w+)\s+.*")
-        endsolid = re.compile(r"\s*endsolid\s*")
-        facet = re.compile(r"\s*facet\s*")
-        normal = re.compile(r"\s*facet\s+normal"
-                            + r"\s+(?P<x>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)"
-                            + r"\s+(?P<y>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)"
-                            + r"\s+(?P<z>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)\s+")
-        endfacet = re.compile(r"\s*endfacet\s+")
-        loop = re.compile(r"\s*outer\s+loop\s+")
-        endloop = re.compile(r"\s*endloop\s+")
-        vertex = re.compile(r"\s*vertex"
-                            + r"\s+(?P<x>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)"
-                            + r"\s+(?P<y>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)"
-                            + r"\s+(?P<z>[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)\s+")
-
-        current_line = 0
-
-        for line in f:
-            if callback and callback():
-                raise AbortOperationException("STLImporter: load model operation cancelled")
-            current_line += 1
-            m = solid.match(line)
-            if m:
-                model.name = m.group(1)
-                continue
-
-            m = facet.match(line)
-            if m:
-                m = normal.match(line)
-                if m:
-                    n = (float(m.group('x')), float(m.group('y')), float(m.group('z')), 'v')
-                else:
-                    n = None
-                continue
-            m = loop.match(line)
-            if m:
-                continue
-            m = vertex.match(line)
-            if m:
-                p = get_unique_vertex(float(m.group('x')), float(m.group('y')),
-                                      float(m.group('z')))
-                if p1 is None:
-                    p1 = p
-                elif p2 is None:
-                    p2 = p
-                elif p3 is None:
-                    p3 = p
-                else:
-                    log.error("STLImporter: more then 3 points in facet (line %d)", current_line)
-                continue
-            m = endloop.match(line)
-            if m:
-                continue
-            m = endfacet.match(line)
-            if m:
-                if None in (p1, p2, p3):
-                    log.warn("Invalid facet definition in line %d of '%s'. Please validate the "
-                             "STL file!", current_line, filename)
-                    n, p1, p2, p3 = None, None, None, None
-                    continue
-                if not n:
-                    n = pnormalized(pcross(psub(p2, p1), psub(p3, p1)))
-
-                # validate the normal
-                # The three vertices of a triangle in an STL file are supposed
-                # to be in counter-clockwise order. This should match the
-                # direction of the normal.
-                if n is None:
-                    # invalid triangle (zero-length vector)
-                    dotcross = 0
-                else:
-                    # make sure the points are in ClockWise order
-                    dotcross = pdot(n, pcross(psub(p2, p1), psub(p3, p1)))
-                if dotcross > 0:
-                    # Triangle expects the vertices in clockwise order
-                    t = Triangle(p1, p3, p2, n)
-                elif dotcross < 0:
-                    if not normal_conflict_warning_seen:
-                        log.warn("Inconsistent normal/vertices found in line %d of '%s'. Please "
-                                 "validate the STL file!", current_line, filename)
-                        normal_conflict_warning_seen = True
-                    t = Triangle(p1, p2, p3, n)
-                else:
-                    # The three points are in a line - or two points are
-                    # identical. Usually this is caused by points, that are too
-                    # close together. Check the tolerance value in
-                    # pycam/Geometry/PointKdtree.py.
-                    log.warn("Skipping invalid triangle: %s / %s / %s (maybe the resolution of "
-                             "the model is too high?)", p1, p2, p3)
-                    n, p1, p2, p3 = (None, None, None, None)
-                    continue
-                n, p1, p2, p3 = (None, None, None, None)
-                model.append(t)
-                continue
-            m = endsolid.match(line)
-            if m:
-                continue
-
-    # TODO display unique vertices and edges count - currently not counted
-    log.info("Imported STL model: %d triangles", len(model.triangles()))
-    vertices = 0
-    edges = 0
-    kdtree = None
+        name, normals, points, missing_normals = _read_ascii_facets(f, filename,
+                                                                    callback=callback)
+        if name is not None:
+            model.name = name
+        _add_facets(model, normals, points, filename, merge_distance=merge_distance,
+                    unordered=missing_normals)
+    if close_source:
+        f.close()
+
+    log.info("Imported STL model: %d triangles", len(model))
 
     if not model:
         # no valid items added to the model
@@ -22,42 +22,52 @@ take a look at the related blog posting describing this algorithm:
   http://fab.senselab.org/node/43
 """
 
+import bisect
+import collections
+
+import numpy
+
 from pycam.Geometry import ceil, epsilon, sqrt
 from pycam.Geometry.Line import Line
 from pycam.Geometry.Plane import Plane
 from pycam.Geometry.PointUtils import padd, pcross, pdot, pmul, pnorm, pnormalized, psub
 from pycam.PathGenerators import get_free_paths_triangles
 from pycam.Utils import ProgressCounter
-from pycam.Utils.threading import run_in_parallel
+from pycam.Utils.threading import get_number_of_processes, run_in_parallel
 import pycam.Utils.log
 
 _DEBUG_DISABLE_COLLISION_CHECK = False
 _DEBUG_DISABLE_EXTEND_LINES = False
 _DEBUG_DISBALE_WATERLINE_SHIFT = False
 
+# the number of groups of triangles per worker process (see "_get_triangle_chunks")
+CHUNKS_PER_PROCESS = 4
+
 
 log = pycam.Utils.log.get_logger()
 
 
-# We need to use a global function here - otherwise it does not work with
-# the multiprocessing Pool.
-def _process_one_triangle(extra_args):
-    model, cutter, up_vector, triangle, z = extra_args
+def _process_one_triangle(model, cutter, up_vector, triangle, z):
+    """ calculate the waterlines of a triangle and their shifted versions
+
+    @returns: a list of (waterline, shifted waterline) tuples and a flag indicating that the
+        triangle needs no further evaluation in the following (lower) layers
+    """
     result = []
     # ignore triangles below the z level
     if triangle.maxz < z:
         # Case 1a
-        return result, None
+        return result, False
     # ignore triangles pointing upwards or downwards
     if pnorm(pcross(triangle.normal, up_vector)) == 0:
         # Case 1b
-        return result, None
+        return result, False
     edge_collisions = get_collision_waterline_of_triangle(model, cutter, up_vector, triangle, z)
     if edge_collisions is None:
         # don't try to use this edge again
-        return result, [id(triangle)]
+        return result, True
     elif len(edge_collisions) == 0:
-        return result, None
+        return result, False
     else:
         for cutter_location, edge in edge_collisions:
             shifted_edge = get_shifted_waterline(up_vector, edge, cutter_location)
@@ -66,14 +76,61 @@ def _process_one_triangle(extra_args):
                     result.append((edge, edge))
                 else:
                     result.append((edge, shifted_edge))
-        return result, None
+        return result, False
+
+
+# We need to use a global function here - otherwise it does not work with
+# the multiprocessing Pool.
+def _process_triangle_chunk(extra_args):
+    """ process a group of triangles of one layer (see "_get_triangle_chunks")
+
+    @returns: a list of (position, waterlines, done flag) tuples for the given positions of
+        triangles (see "_process_one_triangle")
+    """
+    model, cutter, up_vector, triangles, z, positions = extra_args
+    result = []
+    for position in positions:
+        waterlines, done = _process_one_triangle(model, cutter, up_vector, triangles[position], z)
+        result.append((position, waterlines, done))
+    return result
+
+
+def _get_triangle_chunks(triangles, positions, count):
+    """ split the triangles at the given positions into groups of neighbouring triangles
+
+    The triangles are ordered along the rows of a coarse grid (one cell per group on average).
+    Each group is a list of positions in "triangles" - sorted in ascending order.
+    """
+    if len(positions) == 0:
+        return []
+    count = max(1, min(count, len(positions)))
+    centers = numpy.array([triangles[position].center[:2] for position in positions])
+    lower = centers.min(axis=0)
+    extent = numpy.maximum(centers.max(axis=0) - lower, epsilon)
+    cells_per_axis = ceil(sqrt(count))
+    cells = numpy.minimum(((centers - lower) / extent * cells_per_axis).astype(int),
+                          cells_per_axis - 1)
+    order = numpy.lexsort((centers[:, 0], cells[:, 0], cells[:, 1]))
+    positions = numpy.asarray(positions)
+    return [sorted(positions[part].tolist()) for part in numpy.array_split(order, count)]
 
 
 class CollisionPaths:
+    """ connect the waterlines of the triangles of one layer
+
+    The waterlines starting and ending at each point are kept in hash maps.  Thus adding
+    waterlines and connecting them takes constant time per waterline.  Points are compared
+    exactly: adjacent triangles share the coordinates of their common edge.
+    """
 
     def __init__(self):
         self.waterlines = []
         self.shifted_lines = []
+        self._known_lines = set()
+        # the start and end point of each waterline
+        self._line_keys = []
+        self._starts = {}
+        self._ends = {}
 
     def __str__(self):
         lines = []
@@ -97,37 +154,57 @@ class CollisionPaths:
         return "\n".join(lines)
 
     def add(self, waterline, shifted_line):
-        if waterline in self.waterlines:
+        # lines are compared by identity (like "waterline in self.waterlines")
+        if id(waterline) in self._known_lines:
             # ignore this triangle
             return
+        self._known_lines.add(id(waterline))
+        line_key = (tuple(waterline.p1), tuple(waterline.p2))
+        index = len(self.waterlines)
+        self._starts.setdefault(line_key[0], []).append(index)
+        self._ends.setdefault(line_key[1], []).append(index)
+        self._line_keys.append(line_key)
         self.waterlines.append(waterline)
         self.shifted_lines.append(shifted_line)
 
+    def _is_closed(self, group):
+        return self._line_keys[group[0]][0] == self._line_keys[group[-1]][1]
+
     def _get_groups(self):
-        if len(self.waterlines) == 0:
-            return []
-        queue = range(len(self.waterlines))
-        current_group = [0]
-        queue.pop(0)
-        groups = [current_group]
-        while queue:
-            for index in queue:
-                index_wl = self.waterlines[index]
-                if index_wl.p2 == self.waterlines[current_group[0]].p1:
-                    current_group.insert(0, index)
-                    queue.remove(index)
-                    break
-                elif index_wl.p1 == self.waterlines[current_group[-1]].p2:
-                    current_group.append(index)
-                    queue.remove(index)
-                    break
+        """ combine connected waterlines into groups
+
+        Each group starts with the lowest remaining waterline.  The group is extended by the
+        lowest remaining waterline connected to its start or its end (preferring the start).
+        """
+        used = [False] * len(self.waterlines)
+        starts = {key: collections.deque(indices) for key, indices in self._starts.items()}
+        ends = {key: collections.deque(indices) for key, indices in self._ends.items()}
+
+        def get_first_unused(table, key):
+            candidates = table.get(key)
+            # the lists are sorted - thus used items are removed from their beginning
+            while candidates and used[candidates[0]]:
+                candidates.popleft()
+            return candidates[0] if candidates else None
+
+        groups = []
+        for first in range(len(self.waterlines)):
+            if used[first]:
+                continue
+            used[first] = True
+            current_group = collections.deque([first])
+            while True:
+                before = get_first_unused(ends, self._line_keys[current_group[0]][0])
+                after = get_first_unused(starts, self._line_keys[current_group[-1]][1])
+                if (before is not None) and ((after is None) or (before <= after)):
+                    current_group.appendleft(before)
+                    used[before] = True
+                elif after is not None:
+                    current_group.append(after)
+                    used[after] = True
                 else:
-                    pass
-            else:
-                # no new members added to this group - start a new one
-                current_group = [queue[0]]
-                queue.pop(0)
-                groups.append(current_group)
+                    break
+            groups.append(list(current_group))
         return groups
 
     def extend_shifted_lines(self):
@@ -137,7 +214,7 @@ class CollisionPaths:
         def get_right_neighbour(group, ref):
             group_len = len(group)
             # limit the search for a neighbour for non-closed groups
-            if self.waterlines[group[0]].p1 == self.waterlines[group[-1]].p2:
+            if self._is_closed(group):
                 index_range = range(ref + 1, ref + group_len)
             else:
                 index_range = range(ref + 1, group_len)
@@ -193,15 +270,15 @@ class ContourFollow:
     def __init__(self, path_processor):
         self.pa = path_processor
         self._up_vector = (0, 0, 1, 'v')
-        self._processed_triangles = []
+        self._processed_triangles = set()
 
     def _get_free_paths(self, cutter, models, p1, p2):
         return get_free_paths_triangles(models, cutter, p1, p2)
 
     def generate_toolpath(self, cutter, models, minx, maxx, miny, maxy, minz, maxz, dz,
                           draw_callback=None):
-        # reset the list of processed triangles
-        self._processed_triangles = []
+        # reset the set of processed triangles
+        self._processed_triangles = set()
         # calculate the number of steps
         # Sometimes there is a floating point accuracy issue: make sure
         # that only one layer is drawn, if maxz and minz are almost the same.
@@ -214,8 +291,15 @@ class ContourFollow:
 
         # only the first model is used for the contour-follow algorithm
         # TODO: should we combine all models?
-        num_of_triangles = len(models[0].triangles(minx=minx, miny=miny, maxx=maxx, maxy=maxy))
+        triangles = models[0].triangles(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+        num_of_triangles = len(triangles)
         progress_counter = ProgressCounter(2 * num_of_layers * num_of_triangles, draw_callback)
+        # Triangles pointing upwards or downwards are never relevant (case 1b).  The layers are
+        # processed from top to bottom.  Thus the triangles reaching down to the current layer
+        # (see case 1a) are a growing prefix of the triangles sorted by their highest point.
+        triangles = sorted((t for t in triangles if pnorm(pcross(t.normal, self._up_vector)) != 0),
+                           key=lambda t: -t.maxz)
+        negative_heights = [-t.maxz for t in triangles]
 
         current_layer = 0
 
@@ -230,17 +314,22 @@ class ContourFollow:
                     # cancel immediately
                     break
             self.pa.new_direction(0)
+            active_triangles = triangles[:bisect.bisect_right(negative_heights, -z)]
+            # the skipped triangles count as processed
+            progress_counter.increment(2 * (num_of_triangles - len(active_triangles)))
             self.generate_toolpath_slice(cutter, models[0], minx, maxx, miny, maxy, z,
-                                         draw_callback, progress_counter, num_of_triangles)
+                                         draw_callback, progress_counter, len(active_triangles),
+                                         triangles=active_triangles)
             self.pa.end_direction()
             self.pa.finish()
             current_layer += 1
         return self.pa.paths
 
     def generate_toolpath_slice(self, cutter, model, minx, maxx, miny, maxy, z, draw_callback=None,
-                                progress_counter=None, num_of_triangles=None):
+                                progress_counter=None, num_of_triangles=None, triangles=None):
         shifted_lines = self.get_potential_contour_lines(cutter, model, minx, maxx, miny, maxy, z,
-                                                         progress_counter=progress_counter)
+                                                         progress_counter=progress_counter,
+                                                         triangles=triangles)
         if num_of_triangles is None:
             num_of_triangles = len(shifted_lines)
         last_position = None
@@ -249,7 +338,7 @@ class ContourFollow:
             if _DEBUG_DISABLE_COLLISION_CHECK:
                 points = (line.p1, line.p2)
             else:
-                points = self._get_free_paths(line.p1, line.p2)
+                points = self._get_free_paths(cutter, [model], line.p1, line.p2)
             if points:
                 if (last_position is not None) and (last_position != points[0]):
                     self.pa.end_scanline()
@@ -272,23 +361,41 @@ class ContourFollow:
         return self.pa.paths
 
     def get_potential_contour_lines(self, cutter, model, minx, maxx, miny, maxy, z,
-                                    progress_counter=None):
+                                    progress_counter=None, triangles=None):
+        """ collect the shifted waterlines of all triangles for one layer
+
+        @param triangles: the triangles to be checked (default: all triangles of the model
+            within the bounds)
+        """
         # use only the first model for the contour
         follow_model = model
         waterline_triangles = CollisionPaths()
-        triangles = follow_model.triangles(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
-        args = [(follow_model, cutter, self._up_vector, t, z)
-                for t in triangles if id(t) not in self._processed_triangles]
-        results_iter = run_in_parallel(_process_one_triangle, args, unordered=True,
-                                       callback=progress_counter.update)
-        for result, ignore_triangle_id_list in results_iter:
-            if ignore_triangle_id_list:
-                self._processed_triangles.extend(ignore_triangle_id_list)
-            for edge, shifted_edge in result:
-                waterline_triangles.add(edge, shifted_edge)
-            if (progress_counter is not None) and (progress_counter.increment()):
+        if triangles is None:
+            triangles = follow_model.triangles(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+        positions = [position for position, t in enumerate(triangles)
+                     if id(t) not in self._processed_triangles]
+        # Neighbouring triangles are processed together.  The model and the triangles are
+        # transferred to each worker only once per layer.
+        chunks = _get_triangle_chunks(triangles, positions,
+                                      CHUNKS_PER_PROCESS * get_number_of_processes())
+        callback = None if progress_counter is None else progress_counter.update
+        results_iter = run_in_parallel(_process_triangle_chunk, [(z, chunk) for chunk in chunks],
+                                       unordered=True, callback=callback,
+                                       shared_args=(follow_model, cutter, self._up_vector,
+                                                    triangles))
+        results = []
+        for chunk_results in results_iter:
+            results.extend(chunk_results)
+            if (progress_counter is not None) and progress_counter.increment(len(chunk_results)):
                 # quit requested
                 break
+        # merge the results in the order of the triangles - regardless of the chunks
+        results.sort(key=lambda item: item[0])
+        for position, waterlines, done in results:
+            if done:
+                self._processed_triangles.add(id(triangles[position]))
+            for edge, shifted_edge in waterlines:
+                waterline_triangles.add(edge, shifted_edge)
         if not _DEBUG_DISABLE_EXTEND_LINES:
             waterline_triangles.extend_shifted_lines()
         result = []
@@ -18,11 +18,18 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import numpy
+
+from pycam.Geometry import epsilon
+from pycam.Geometry.ContactCache import ContactCache
+from pycam.Geometry.HeightField import HeightField
+from pycam.Geometry.TopSurface import get_top_surface_model
 import pycam.Geometry.Model
 from pycam.PathGenerators import get_max_height_dynamic
 from pycam.Toolpath.Steps import MoveStraight, MoveSafety
 from pycam.Utils import ProgressCounter
-from pycam.Utils.threading import run_in_parallel
+from pycam.Utils.threading import (are_tasks_sharing_memory, get_number_of_processes,
+                                   run_in_parallel)
 import pycam.Utils.log
 
 log = pycam.Utils.log.get_logger()
@@ -35,57 +42,173 @@ def _process_one_grid_line(extra_args):
     Otherwise the dynamic over-sampling (in get_max_height_dynamic) is
     pointless.
     """
-    positions, minz, maxz, model, cutter = extra_args
-    return get_max_height_dynamic(model, cutter, positions, minz, maxz)
+    positions, minz, maxz, model, cutter, max_depth, tolerance, cache = extra_args
+    return get_max_height_dynamic(model, cutter, positions, minz, maxz, max_depth=max_depth,
+                                  tolerance=tolerance, cache=cache)
+
+
+def _get_line_samples(positions, step_width):
+    """ add equally spaced points between the given x/y positions
+
+    @returns: array of shape (n, 2) containing the original positions and the added points
+    """
+    if len(positions) < 2:
+        return positions
+    deltas = positions[1:] - positions[:-1]
+    counts = numpy.maximum(1, numpy.ceil(numpy.hypot(deltas[:, 0], deltas[:, 1]) / step_width))
+    counts = counts.astype(numpy.int64)
+    segments = numpy.repeat(numpy.arange(len(deltas)), counts)
+    steps = numpy.arange(len(segments)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    samples = (positions[segments]
+               + deltas[segments] * (steps / counts[segments])[:, numpy.newaxis])
+    return numpy.concatenate((samples, positions[-1:]))
+
+
+def _get_height_field_line(samples, heights, minz, maxz):
+    """ turn the heights of the offset surface along a line into tool locations
+
+    The limits are handled like in "get_max_height_triangles".  Points in line with both of their
+    neighbours are removed.
+    @returns: a list of x/y/z tuples (or None if the height limit was exceeded)
+    """
+    heights = numpy.where(heights < minz + epsilon, minz, heights)
+    skipped = heights > maxz + epsilon
+    points = numpy.column_stack((samples, heights))
+    keep = numpy.ones(len(points), dtype=bool)
+    if len(points) > 2:
+        # see "points_in_line"
+        v1 = points[:-2] - points[1:-1]
+        v2 = points[:-2] - points[2:]
+        in_line = ((v1[:, 1] * v2[:, 2] == v1[:, 2] * v2[:, 1])
+                   & (v1[:, 0] * v2[:, 2] == v1[:, 2] * v2[:, 0])
+                   & (v1[:, 0] * v2[:, 1] == v1[:, 1] * v2[:, 0]))
+        in_line &= ~(skipped[:-2] | skipped[1:-1] | skipped[2:])
+        keep[1:-1] = ~in_line
+    return [None if skip else tuple(point)
+            for point, skip in zip(points[keep].tolist(), skipped[keep].tolist())]
 
 
 class DropCutter:
 
-    def generate_toolpath(self, cutter, models, motion_grid, minz=None, maxz=None,
-                          draw_callback=None):
-        path = []
-        quit_requested = False
-        model = pycam.Geometry.Model.get_combined_model(models)
+    def __init__(self, height_field_resolution=None, tolerance=None, max_depth=5,
+                 cull_hidden_facets=False):
+        """
+        @param height_field_resolution: calculate the tool locations from a height field of the
+            model with this grid size instead of exact collisions - this is a lot faster for
+            dense grids, but less accurate (see HeightField.get_offset_heights)
+        @param tolerance: refine the lines of the (possibly coarse) grid only until the
+            toolpath deviates less than this distance from the tool locations (see
+            "get_max_height_dynamic") - otherwise every deviation is refined
+        @param max_depth: the maximum number of recursive refinements between two positions
+        @param cull_hidden_facets: remove the facets below other parts of the model before
+            calculating exact collisions (see TopSurfaceFilter) - the results are identical up
+            to rounding (a refinement point may be added or omitted)
+        """
+        self.height_field_resolution = height_field_resolution
+        self.tolerance = tolerance
+        self.max_depth = max_depth
+        self.cull_hidden_facets = cull_hidden_facets
 
-        # Transfer the grid (a generator) into a list of lists and count the
-        # items.
-        lines = []
-        # usually there is only one layer - but an xy-grid consists of two
-        for layer in motion_grid:
-            for line in layer:
-                lines.append(line)
+    def _get_height_field_lines(self, cutter, model, lines, minz, maxz):
+        """ calculate the tool locations along the lines based on a height field
+
+        @returns: a generator of point lists (see "_process_one_grid_line")
+        """
+        resolution = self.height_field_resolution
+        samples = [_get_line_samples(numpy.array([(pos[0], pos[1]) for pos in line],
+                                                 dtype=numpy.float64).reshape((-1, 2)),
+                                     resolution)
+                   for line in lines]
+        all_samples = numpy.concatenate(samples + [numpy.empty((0, 2))])
+        if (model is None) or (len(all_samples) == 0):
+            heights = numpy.full(len(all_samples), -numpy.inf)
+        else:
+            # the surface is relevant within the reach of the tool
+            margin = cutter.distance_radius + resolution
+            lower = all_samples.min(axis=0) - margin
+            upper = all_samples.max(axis=0) + margin
+            height_field = HeightField.from_model(model, lower[0], lower[1], upper[0], upper[1],
+                                                  resolution)
+            heights = height_field.get_offset_heights(cutter, all_samples[:, 0],
+                                                      all_samples[:, 1], floor=minz)
+            log.info("DropCutter: using a height field of %d x %d nodes - the tool locations "
+                     "are not below the exact ones, but the tool may stay up to %g away from "
+                     "the model horizontally", height_field.shape[1], height_field.shape[0],
+                     height_field.get_horizontal_error())
+        offset = 0
+        for line_samples in samples:
+            yield _get_height_field_line(line_samples,
+                                         heights[offset:offset + len(line_samples)], minz, maxz)
+            offset += len(line_samples)
+
+    def get_toolpath_lines(self, cutter, models, motion_grid, minz=None, maxz=None,
+                           draw_callback=None, max_pending=None):
+        """ generate the moves of the toolpath line by line
 
+        The lines are returned in order as soon as they are finished.  Thus the consumer (e.g.
+        an exporter) can process them, while the following lines are still being calculated.
+        @param draw_callback: receives progress information - it may return True for cancelling
+        @param max_pending: the maximum number of lines being calculated or waiting for their
+            predecessors at the same time (default: four times the number of workers)
+        @returns: a generator of move lists - each list ends with a move to safety height
+        """
+        model = pycam.Geometry.Model.get_model_view(models)
+        # usually there is only one layer - but an xy-grid consists of two
+        lines = [line for layer in motion_grid for line in layer]
         num_of_lines = len(lines)
-        progress_counter = ProgressCounter(len(lines), draw_callback)
-        current_line = 0
-
-        args = []
-        for one_grid_line in lines:
-            # simplify the data (useful for remote processing)
-            xy_coords = [(pos[0], pos[1]) for pos in one_grid_line]
-            args.append((xy_coords, minz, maxz, model, cutter))
-        for points in run_in_parallel(_process_one_grid_line, args,
-                                      callback=progress_counter.update):
+        progress_counter = ProgressCounter(num_of_lines, draw_callback)
+        if max_pending is None:
+            max_pending = 4 * get_number_of_processes()
+        cache = None
+        if self.height_field_resolution:
+            line_results = self._get_height_field_lines(cutter, model, lines, minz, maxz)
+        else:
+            triangle_types = (pycam.Geometry.Model.Model, pycam.Geometry.Model.CompositeModel)
+            if self.cull_hidden_facets and isinstance(model, triangle_types):
+                model = get_top_surface_model(model)
+            # Neighbouring lines share candidate triangles and the layers of an xy-grid share
+            # the heights of their crossings.  This works only if the lines are calculated
+            # within this process (serially or by threads).
+            if are_tasks_sharing_memory():
+                cache = ContactCache()
+            # the arguments are assembled only when a line is submitted
+            # (simplify the data - useful for remote processing)
+            args = (([(pos[0], pos[1]) for pos in one_grid_line], minz, maxz, model, cutter,
+                     self.max_depth, self.tolerance, cache)
+                    for one_grid_line in lines)
+            line_results = run_in_parallel(_process_one_grid_line, args,
+                                           callback=progress_counter.update,
+                                           max_pending=max_pending)
+        for current_line, points in enumerate(line_results):
             if draw_callback and draw_callback(
                     text="DropCutter: processing line %d/%d" % (current_line + 1, num_of_lines)):
                 # cancel requested
-                quit_requested = True
                 break
+            moves = []
             for point in points:
                 if point is None:
                     # exceeded maxz - the cutter has to skip this point
-                    path.append(MoveSafety())
+                    moves.append(MoveSafety())
                 else:
-                    path.append(MoveStraight(point))
-                # The progress counter may return True, if cancel was requested.
-                if draw_callback and draw_callback(tool_position=point, toolpath=path):
-                    quit_requested = True
-                    break
+                    moves.append(MoveStraight(point))
             # add a move to safety height after each line of moves
-            path.append(MoveSafety())
+            moves.append(MoveSafety())
             progress_counter.increment()
-            # update progress
-            current_line += 1
-            if quit_requested:
-                break
+            yield moves
+        if (cache is not None) and (cache.height_hits + cache.height_misses > 0):
+            log.info("DropCutter: contact cache statistics - %s", cache)
+
+    def generate_toolpath(self, cutter, models, motion_grid, minz=None, maxz=None,
+                          draw_callback=None):
+        path = []
+        for moves in self.get_toolpath_lines(cutter, models, motion_grid, minz=minz, maxz=maxz,
+                                             draw_callback=draw_callback):
+            # the last move of each line is its move to safety height
+            for move in moves[:-1]:
+                path.append(move)
+                # The progress counter may return True, if cancel was requested.
+                if draw_callback and draw_callback(tool_position=move.position, toolpath=path):
+                    path.append(moves[-1])
+                    return path
+            path.append(moves[-1])
         return path
@@ -29,7 +29,7 @@ class EngraveCutter:
                           draw_callback=None):
         quit_requested = False
 
-        model = pycam.Geometry.Model.get_combined_model(models)
+        model = pycam.Geometry.Model.get_model_view(models)
 
         if draw_callback:
             draw_callback(text="Engrave: optimizing polygon order")
@@ -20,7 +20,7 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 from pycam.PathGenerators import get_free_paths_triangles
 import pycam.PathProcessors.ContourCutter
-from pycam.Utils.threading import run_in_parallel
+from pycam.Utils.threading import get_number_of_processes, run_in_parallel
 from pycam.Utils import ProgressCounter
 import pycam.Utils.log
 from pycam.Toolpath.Steps import MoveStraight, MoveSafety
@@ -32,16 +32,87 @@ log = pycam.Utils.log.get_logger()
 # We need to use a global function here - otherwise it does not work with
 # the multiprocessing Pool.
 def _process_one_line(extra_args):
-    p1, p2, models, cutter = extra_args
+    models, cutter, p1, p2 = extra_args
     points = get_free_paths_triangles(models, cutter, p1, p2)
     return points
 
 
+def _process_one_layer(extra_args):
+    """ calculate the complete toolpath of one layer
+
+    The results consist of tuples of points (instead of moves) for the sake of a simple
+    transfer from the worker processes.
+    @returns: a list of cutting segments (slicing) or a list of (height, cutting segments) tuples
+        for every waterline
+    """
+    models, cutter, waterlines, layer_grid = extra_args
+    if waterlines:
+        path_processor = pycam.PathProcessors.ContourCutter.ContourCutter()
+        path_processor.new_direction(0)
+        for p1, p2 in layer_grid:
+            # the ContourCutter pathprocessor does not work with combined models
+            points = get_free_paths_triangles(models[:1], cutter, p1, p2)
+            if points:
+                path_processor.new_scanline()
+                for point in points:
+                    path_processor.append(point)
+                path_processor.end_scanline()
+        path_processor.end_direction()
+        path_processor.finish()
+        # the points of the paths are named tuples - they cannot be pickled
+        return [(path.points[0][2], [(tuple(p1), tuple(p2)) for p1, p2
+                                     in _get_waterline_segments(path, models, cutter)])
+                for path in path_processor.paths]
+    else:
+        segments = []
+        for p1, p2 in layer_grid:
+            points = get_free_paths_triangles(models, cutter, p1, p2)
+            for index in range(len(points) // 2):
+                segments.append((points[2 * index], points[2 * index + 1]))
+        return segments
+
+
+def _get_waterline_segments(path, models, cutter):
+    """ turn the points of a waterline into cutting segments """
+    pairs = []
+    for index in range(len(path.points) - 1):
+        pairs.append((path.points[index], path.points[index + 1]))
+    if len(models) > 1:
+        # We assume that the first model is used for the waterline and all
+        # other models are obstacles (e.g. a support grid).
+        other_models = models[1:]
+        result = []
+        for p1, p2 in pairs:
+            free_points = get_free_paths_triangles(other_models, cutter, p1, p2)
+            for index in range(len(free_points) // 2):
+                result.append((free_points[2 * index], free_points[2 * index + 1]))
+        return result
+    else:
+        return pairs
+
+
+def _get_segment_moves(segments):
+    result = []
+    for p1, p2 in segments:
+        result.append(MoveStraight(p1))
+        result.append(MoveStraight(p2))
+        result.append(MoveSafety())
+    return result
+
+
 class PushCutter:
 
-    def __init__(self, waterlines=False):
+    def __init__(self, waterlines=False, parallel_layers=False):
+        """
+        @param parallel_layers: process whole layers (including the waterline processing) as
+            parallel tasks instead of the lines of one layer after the other - this keeps more
+            workers busy for toolpaths with many layers.  It is used only if there are at least
+            as many layers as workers.  Otherwise the lines are distributed among the workers
+            (and cancel requests are handled after every line).
+        """
         log.debug("Starting PushCutter")
         self.waterlines = waterlines
+        self.parallel_layers = parallel_layers
 
     def generate_toolpath(self, cutter, models, motion_grid, minz=None, maxz=None,
                           draw_callback=None):
@@ -58,6 +129,9 @@ class PushCutter:
 
         num_of_layers = len(grid)
 
+        if self.parallel_layers and (num_of_layers >= get_number_of_processes() > 1):
+            return self._generate_toolpath_by_layers(cutter, models, grid, draw_callback)
+
         progress_counter = ProgressCounter(num_of_grid_positions, draw_callback)
 
         current_layer = 0
@@ -90,28 +164,44 @@ class PushCutter:
             result = []
             # turn the waterline points into cutting segments
             for path in self.pa.paths:
-                pairs = []
-                for index in range(len(path.points) - 1):
-                    pairs.append((path.points[index], path.points[index + 1]))
-                if len(models) > 1:
-                    # We assume that the first model is used for the waterline and all
-                    # other models are obstacles (e.g. a support grid).
-                    other_models = models[1:]
-                    for p1, p2 in pairs:
-                        free_points = get_free_paths_triangles(other_models, cutter, p1, p2)
-                        for index in range(len(free_points) // 2):
-                            result.append(MoveStraight(free_points[2 * index]))
-                            result.append(MoveStraight(free_points[2 * index + 1]))
-                            result.append(MoveSafety())
-                else:
-                    for p1, p2 in pairs:
-                        result.append(MoveStraight(p1))
-                        result.append(MoveStraight(p2))
-                        result.append(MoveSafety())
+                result.extend(_get_segment_moves(_get_waterline_segments(path, models, cutter)))
             return result
         else:
             return path
 
+    def _generate_toolpath_by_layers(self, cutter, models, grid, draw_callback=None):
+        """ process every layer as a separate task
+
+        The models and the cutter are transferred to each worker only once.
+        """
+        num_of_layers = len(grid)
+        progress_counter = ProgressCounter(num_of_layers, draw_callback)
+        args = [(self.waterlines, layer_grid) for layer_grid in grid]
+        path = []
+        waterlines = []
+        for current_layer, result in enumerate(run_in_parallel(
+                _process_one_layer, args, callback=progress_counter.update,
+                shared_args=(models, cutter))):
+            if draw_callback and draw_callback(text=("PushCutter: processing layer %d/%d"
+                                                     % (current_layer + 1, num_of_layers))):
+                # cancel immediately
+                break
+            if self.waterlines:
+                waterlines.extend(result)
+            else:
+                path.extend(_get_segment_moves(result))
+                if draw_callback and path:
+                    draw_callback(tool_position=path[-2].position, toolpath=path)
+            if progress_counter.increment():
+                # quit requested
+                break
+        if self.waterlines:
+            # upper layers first (see "BasePathProcessor.sort_layered")
+            waterlines.sort(key=lambda item: -item[0])
+            for height, segments in waterlines:
+                path.extend(_get_segment_moves(segments))
+        return path
+
     def generate_toolpath_slice(self, cutter, models, layer_grid, draw_callback=None,
                                 progress_counter=None):
         path = []
@@ -123,8 +213,9 @@ class PushCutter:
         args = []
         for line in layer_grid:
             p1, p2 = line
-            args.append((p1, p2, models, cutter))
-        for points in run_in_parallel(_process_one_line, args, callback=progress_counter.update):
+            args.append((p1, p2))
+        for points in run_in_parallel(_process_one_line, args, callback=progress_counter.update,
+                                      shared_args=(models, cutter)):
             if points:
                 if self.waterlines:
                     self.pa.new_scanline()
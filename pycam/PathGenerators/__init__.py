@@ -20,114 +20,97 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import time
 
+import numpy
+
 from pycam.Geometry import epsilon, INFINITE
-from pycam.Geometry.PointUtils import pdist, pnormalized, points_in_line, psub
+from pycam.Geometry.PointUtils import (padd, pcross, pdist, pmul, pnorm, pnormalized,
+                                       points_in_line, psub)
 from pycam.Utils.events import get_event_handler
 
 
-class Hit:
-    def __init__(self, cl, cp, t, d, direction):
-        self.cl = cl
-        self.cp = cp
-        self.t = t
-        self.d = d
-        self.dir = direction
-        self.z = -INFINITE
-
-    def __repr__(self):
-        return "%s - %s - %s - %s" % (self.d, self.cl, self.dir, self.cp)
+def _get_triangle_models(models):
+    """ collect the triangle models - the members of composite models are used directly """
+    result = []
+    for model in models:
+        if model is None:
+            continue
+        if hasattr(model, "get_models"):
+            result.extend(_get_triangle_models(model.get_models()))
+        else:
+            result.append(model)
+    return result
 
 
 def get_free_paths_triangles(models, cutter, p1, p2, return_triangles=False):
-    if (len(models) == 0) or ((len(models) == 1) and (models[0] is None)):
-        return (p1, p2)
-    elif len(models) == 1:
-        # only one model is left - just continue
-        model = models[0]
-    else:
-        # multiple models were given - process them in layers
-        result = get_free_paths_triangles(models[:1], cutter, p1, p2, return_triangles)
-        # group the result into pairs of two points (start/end)
-        point_pairs = []
-        while result:
-            pair1 = result.pop(0)
-            pair2 = result.pop(0)
-            point_pairs.append((pair1, pair2))
-        all_results = []
-        for pair in point_pairs:
-            one_result = get_free_paths_triangles(models[1:], cutter, pair[0], pair[1],
-                                                  return_triangles)
-            all_results.extend(one_result)
-        return all_results
+    """ calculate the parts of the line from p1 to p2 without collisions between tool and models
 
-    backward = pnormalized(psub(p1, p2))
+    Each colliding triangle blocks a single range of the line (see "Model.get_push_intervals").
+    The ranges of all models are merged in one sweep along the line.
+    @returns: a list of points (the start and the end of every free part) - or tuples of the
+        point, the triangle limiting the free part and the contact point (or None) if
+        "return_triangles" is set
+    """
+    models = _get_triangle_models(models)
+    if not models:
+        return (p1, p2)
     forward = pnormalized(psub(p2, p1))
-    xyz_dist = pdist(p2, p1)
-
-    minx = min(p1[0], p2[0])
-    maxx = max(p1[0], p2[0])
-    miny = min(p1[1], p2[1])
-    maxy = max(p1[1], p2[1])
-    minz = min(p1[2], p2[2])
-
-    # find all hits along scan line
-    hits = []
-
-    triangles = model.triangles(minx - cutter.distance_radius, miny - cutter.distance_radius, minz,
-                                maxx + cutter.distance_radius, maxy + cutter.distance_radius,
-                                INFINITE)
+    backward = pnormalized(psub(p1, p2))
+    length = pdist(p2, p1)
+    starts, ends, facets, owners = [], [], [], []
+    for index, model in enumerate(models):
+        model_starts, model_ends, model_facets = model.get_push_intervals(cutter, p1, p2)
+        starts.append(model_starts)
+        ends.append(model_ends)
+        facets.append(model_facets)
+        owners.append(numpy.full(len(model_facets), index))
+    starts = numpy.concatenate(starts)
+    ends = numpy.concatenate(ends)
+    order = numpy.argsort(starts, kind="stable")
+    starts = starts[order]
+    ends = ends[order]
+    # the end of the blocked part containing each range and the range defining this end
+    reach = numpy.maximum.accumulate(ends)
+    reach_sources = numpy.maximum.accumulate(numpy.where(ends == reach,
+                                                         numpy.arange(len(ends)), 0))
+    # the free parts are located between the end of all previous ranges and the next start
+    free_starts = numpy.maximum(numpy.concatenate(([0.0], reach)), 0.0)
+    free_ends = numpy.minimum(numpy.concatenate((starts, [length])), length)
+    free_parts = numpy.flatnonzero(free_ends - free_starts >= epsilon).tolist()
+    free_starts = free_starts.tolist()
+    free_ends = free_ends.tolist()
+
+    def get_point(distance):
+        if distance <= 0:
+            return p1
+        elif distance >= length:
+            return p2
+        else:
+            return padd(p1, pmul(forward, distance))
 
-    for t in triangles:
-        (cl1, d1, cp1) = cutter.intersect(backward, t, start=p1)
-        if cl1:
-            hits.append(Hit(cl1, cp1, t, -d1, backward))
-        (cl2, d2, cp2) = cutter.intersect(forward, t, start=p1)
-        if cl2:
-            hits.append(Hit(cl2, cp2, t, d2, forward))
+    if not return_triangles:
+        points = []
+        for part in free_parts:
+            points.append(get_point(free_starts[part]))
+            points.append(get_point(free_ends[part]))
+        return points
+    facets = numpy.concatenate(facets)[order]
+    owners = numpy.concatenate(owners)[order]
 
-    # sort along the scan direction
-    hits.sort(key=lambda h: h.d)
+    def get_limit(distance, row, direction, origin):
+        location = get_point(distance)
+        if row is None:
+            return (location, None, None)
+        triangle = models[owners[row]].get_mesh().get_triangle(int(facets[row]))
+        contact_point = cutter.push_at(direction, triangle, origin)[2]
+        return (location, triangle, contact_point)
 
-    count = 0
     points = []
-    for h in hits:
-        if h.dir == forward:
-            if count == 0:
-                if -epsilon <= h.d <= xyz_dist + epsilon:
-                    if len(points) == 0:
-                        points.append((p1, None, None))
-                    points.append((h.cl, h.t, h.cp))
-            count += 1
-        else:
-            if count == 1:
-                if -epsilon <= h.d <= xyz_dist + epsilon:
-                    points.append((h.cl, h.t, h.cp))
-            count -= 1
-
-    if len(points) % 2 == 1:
-        points.append((p2, None, None))
-
-    if len(points) == 0:
-        # check if the path is completely free or if we are inside of the model
-        inside_counter = 0
-        for h in hits:
-            if -epsilon <= h.d:
-                # we reached the outer limit of the model
-                break
-            if h.dir == forward:
-                inside_counter += 1
-            else:
-                inside_counter -= 1
-        if inside_counter <= 0:
-            # we are not inside of the model
-            points.append((p1, None, None))
-            points.append((p2, None, None))
-
-    if return_triangles:
-        return points
-    else:
-        # return only the cutter locations (without triangles)
-        return [cut_info[0] for cut_info in points]
+    for part in free_parts:
+        start_row = reach_sources[part - 1] if part > 0 and reach[part - 1] > 0 else None
+        end_row = part if part < len(starts) and starts[part] < length else None
+        points.append(get_limit(free_starts[part], start_row, backward, p2))
+        points.append(get_limit(free_ends[part], end_row, forward, p1))
+    return points
 
 
 def get_max_height_triangles(model, cutter, x, y, minz, maxz):
@@ -144,36 +127,69 @@ def get_max_height_triangles(model, cutter, x, y, minz, maxz):
     """
     if model is None:
         return (x, y, minz)
+    if hasattr(model, "get_max_height"):
+        height_max = model.get_max_height(cutter, x, y, minz, maxz)
+    else:
+        height_max = _get_max_height_of_triangles(model, cutter, x, y, minz, maxz)
+    return _get_tool_location(x, y, height_max, minz, maxz)
+
+
+def _get_tool_location(x, y, height_max, minz, maxz):
+    """ turn the height of the highest collision into a tool location (see above) """
+    if (height_max is None) or (height_max < minz + epsilon):
+        # no collision occurred or the collision height is lower than the minimum
+        return (x, y, minz)
+    elif height_max > maxz + epsilon:
+        # there was a collision above the upper allowed z level -> no suitable tool location found
+        return None
+    else:
+        # a suitable tool location was found within the bounding box
+        return (x, y, height_max)
+
+
+def _get_max_height_of_triangles(model, cutter, x, y, minz, maxz):
+    """ check all triangles of a model below the tool - see "get_max_height_triangles" """
     p = (x, y, maxz)
     height_max = None
     box_x_min = cutter.get_minx(p)
     box_x_max = cutter.get_maxx(p)
     box_y_min = cutter.get_miny(p)
     box_y_max = cutter.get_maxy(p)
+    # Triangles below "minz" can only cause lower tool positions.  Triangles above "maxz" are
+    # relevant: they prevent the tool from reaching this location.
     box_z_min = minz
-    box_z_max = maxz
+    box_z_max = INFINITE
     # reduce the set of triangles to be checked for collisions
     triangles = model.triangles(box_x_min, box_y_min, box_z_min, box_x_max, box_y_max, box_z_max)
     for t in triangles:
-        cut = cutter.drop(t, start=p)
+        cut = cutter.drop_at(t, p)
         if cut and ((height_max is None) or (cut[2] > height_max)):
             height_max = cut[2]
-    if (height_max is None) or (height_max < minz + epsilon):
-        # no collision occurred or the collision height is lower than the minimum
-        return (x, y, minz)
-    elif height_max > maxz + epsilon:
-        # there was a collision above the upper allowed z level -> no suitable tool location found
-        return None
-    else:
-        # a suitable tool location was found within the bounding box
-        return (x, y, height_max)
+    return height_max
+
 
+def _is_refinement_wanted(start, middle, end, tolerance):
+    """ decide if the point in the middle of a segment needs to be added
+
+    Without a tolerance every deviation from the straight line counts.  Otherwise the distance
+    between the middle point and the chord (the line between start and end) needs to exceed the
+    tolerance.
+    """
+    if tolerance is None:
+        return not points_in_line(start, middle, end)
+    chord = psub(end, start)
+    length = pnorm(chord)
+    if length == 0:
+        return False
+    return pnorm(pcross(psub(middle, start), chord)) / length > tolerance
 
-def _get_dynamic_fill_points(start, end, max_height_point_func, remaining_levels):
+
+def _get_dynamic_fill_points(start, end, max_height_point_func, remaining_levels,
+                             tolerance=None):
     """ generator for adding points between two given points
 
     Points are only added, if the point in their middle (especially its height) is not in line with
-    the outer points.
+    the outer points (see "_is_refinement_wanted").
     More points are added recursively (limited via "remaining_levels") between start/middle and
     middle/end.
     The start and end points are never emitted.  This should be done by the caller.
@@ -183,23 +199,28 @@ def _get_dynamic_fill_points(start, end, max_height_point_func, remaining_levels
     middle = max_height_point_func((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
     if middle is None:
         return
-    if points_in_line(start, middle, end):
+    if not _is_refinement_wanted(start, middle, end, tolerance):
         return
     # the three points are not in line - thus we should add some interval points
-    for p in _get_dynamic_fill_points(start, middle, max_height_point_func, remaining_levels - 1):
+    for p in _get_dynamic_fill_points(start, middle, max_height_point_func, remaining_levels - 1,
+                                      tolerance):
         yield p
     yield middle
-    for p in _get_dynamic_fill_points(middle, end, max_height_point_func, remaining_levels - 1):
+    for p in _get_dynamic_fill_points(middle, end, max_height_point_func, remaining_levels - 1,
+                                      tolerance):
         yield p
 
 
-def _dynamic_point_fill_generator(positions, max_height_point_func, max_level_count):
+def _dynamic_point_fill_generator(positions, max_height_point_func, max_level_count,
+                                  tolerance=None):
     """ add more points between the given positions in order to detect minor bumps in the model
 
     If the calculated height between two given positions (points) is not in line with its
     neighbours, then additional points are added until the recursion limit ("max_level_count") is
     reached or until the interpolated points are in line with their neighbours.
     The input positions are returned unchanged, if less than three points are given.
+    With a tolerance the positions are expected to be a coarse grid: every segment is checked and
+    refined until its middle point is closer to the chord than the tolerance.
     """
     # handle incoming lists/tuples as well as generators
     positions = iter(positions)
@@ -222,20 +243,82 @@ def _dynamic_point_fill_generator(positions, max_height_point_func, max_level_co
     last_segment_wants_more_points = False
     for p3 in positions:
         yield p1
-        if (None not in (p1, p2, p3)) and not points_in_line(p1, p2, p3):
-            for p in _get_dynamic_fill_points(p1, p2, max_height_point_func, max_level_count - 1):
-                yield p
-            last_segment_wants_more_points = True
+        if tolerance is None:
+            last_segment_wants_more_points = ((None not in (p1, p2, p3))
+                                              and not points_in_line(p1, p2, p3))
         else:
-            last_segment_wants_more_points = False
+            last_segment_wants_more_points = None not in (p1, p2)
+        if last_segment_wants_more_points:
+            for p in _get_dynamic_fill_points(p1, p2, max_height_point_func, max_level_count - 1,
+                                              tolerance):
+                yield p
         p1, p2 = p2, p3
     yield p1
+    if tolerance is not None:
+        last_segment_wants_more_points = None not in (p1, p2)
     if last_segment_wants_more_points:
-        for p in _get_dynamic_fill_points(p1, p2, max_height_point_func, max_level_count - 1):
+        for p in _get_dynamic_fill_points(p1, p2, max_height_point_func, max_level_count - 1,
+                                          tolerance):
             yield p
     yield p2
 
 
+def _get_dynamic_fill_points_batched(segments, max_height_points_func, remaining_levels,
+                                     tolerance=None):
+    """ calculate "_get_dynamic_fill_points" for many segments at once
+
+    The middle points of all segments of one recursion level are calculated in one call of
+    "max_height_points_func" (a function turning a list of x/y tuples into a list of points).
+    @returns: a list of the fill points (a list) for each segment
+    """
+    results = [[] for _ in segments]
+    if (remaining_levels <= 0) or not segments:
+        return results
+    middles = max_height_points_func([((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+                                      for start, end in segments])
+    refined = []
+    sub_segments = []
+    for index, ((start, end), middle) in enumerate(zip(segments, middles)):
+        if (middle is not None) and _is_refinement_wanted(start, middle, end, tolerance):
+            refined.append((index, middle))
+            sub_segments.extend(((start, middle), (middle, end)))
+    sub_results = _get_dynamic_fill_points_batched(sub_segments, max_height_points_func,
+                                                   remaining_levels - 1, tolerance)
+    for sub_index, (index, middle) in enumerate(refined):
+        results[index] = (sub_results[2 * sub_index] + [middle]
+                          + sub_results[2 * sub_index + 1])
+    return results
+
+
+def _dynamic_point_fill_batched(points, max_height_points_func, max_level_count, tolerance=None):
+    """ calculate the result of "_dynamic_point_fill_generator" for a list of points at once
+
+    See "_get_dynamic_fill_points_batched" for "max_height_points_func".
+    """
+    if (max_level_count <= 0) or (len(points) < (3 if tolerance is None else 2)):
+        return list(points)
+    if tolerance is None:
+        # the segments following the first point of each triple of points which is not in line
+        wanted = [index for index, triple in enumerate(zip(points, points[1:], points[2:]))
+                  if (None not in triple) and not points_in_line(*triple)]
+        if wanted and (wanted[-1] == len(points) - 3):
+            # the last segment is handled like the previous one
+            wanted.append(len(points) - 2)
+    else:
+        # every segment of the coarse grid is checked
+        wanted = [index for index, pair in enumerate(zip(points, points[1:]))
+                  if None not in pair]
+    fill_points = _get_dynamic_fill_points_batched(
+        [(points[index], points[index + 1]) for index in wanted], max_height_points_func,
+        max_level_count - 1, tolerance)
+    fill_points = dict(zip(wanted, fill_points))
+    result = []
+    for index, point in enumerate(points):
+        result.append(point)
+        result.extend(fill_points.get(index, ()))
+    return result
+
+
 def _filter_linear_points(positions):
     """ reduce the input positions by removing all points which are in line with their neighbours
 
@@ -267,21 +350,39 @@ def _filter_linear_points(positions):
     yield p2
 
 
-def get_max_height_dynamic(model, cutter, positions, minz, maxz, max_depth=5):
+def get_max_height_dynamic(model, cutter, positions, minz, maxz, max_depth=5, tolerance=None,
+                           cache=None):
     """ calculate the tool positions based on a given set of x/y locations
 
     The given input locations should be suitable for the tool size in order to find all relevant
     major features of the model.  Additional locations are recursively added, if the calculated
     height between every set of two points is not in line with its neighbours.
     The result is a list of points to be traveled by the tool.
+    @param tolerance: optional maximum distance between the toolpath and the calculated tool
+        locations in its middle.  Every segment of the (possibly coarse) input positions is
+        refined only until this deviation is reached.  Thus flat areas require only few points.
+    @param cache: optional ContactCache shared by the calls of one job (e.g. the lines of a
+        grid) - neighbouring lines reuse the candidate triangles of each other and repeated
+        positions reuse their heights
     """
     # for now there is only a triangle-mesh based calculation
     get_max_height = lambda x, y: get_max_height_triangles(model, cutter, x, y, minz, maxz)
+    if hasattr(model, "get_max_heights"):
+        # process all positions (and later all additional positions of each level) at once
+        def get_max_heights(positions):
+            heights = model.get_max_heights(cutter, positions, minz, maxz, cache=cache)
+            return [_get_tool_location(x, y, height, minz, maxz)
+                    for (x, y), height in zip(positions, heights)]
+
+        dynamically_filled_points = _dynamic_point_fill_batched(get_max_heights(list(positions)),
+                                                                get_max_heights, max_depth,
+                                                                tolerance)
+        return list(_filter_linear_points(dynamically_filled_points))
     # calculate suitable tool locations (without collisions) for each given position
     points_with_height = (get_max_height(x, y) for x, y in positions)
     # Spread more positions between the existing ones.
     dynamically_filled_points = _dynamic_point_fill_generator(points_with_height, get_max_height,
-                                                              max_depth)
+                                                              max_depth, tolerance)
     # Remove all points that are in line between their neighbours.
     return list(_filter_linear_points(dynamically_filled_points))
 
@@ -0,0 +1,67 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import pycam.Plugins
+
+
+class ModelSimplification(pycam.Plugins.PluginBase):
+
+    UI_FILE = "model_simplification.ui"
+    DEPENDS = ["Models"]
+    CATEGORIES = ["Model"]
+
+    def setup(self):
+        if self.gui:
+            simplification_frame = self.gui.get_object("ModelSimplificationFrame")
+            simplification_frame.unparent()
+            self.core.register_ui("model_handling", "Simplify", simplification_frame, 15)
+            self._gtk_handlers = ((self.gui.get_object("SimplificationButton"), "clicked",
+                                   self._simplify), )
+            self._event_handlers = (
+                ("model-change-after", self._update_controls),
+                ("model-selection-changed", self._update_controls))
+            self.register_gtk_handlers(self._gtk_handlers)
+            self.register_event_handlers(self._event_handlers)
+            self._update_controls()
+        return True
+
+    def teardown(self):
+        if self.gui:
+            self.unregister_event_handlers(self._event_handlers)
+            self.unregister_gtk_handlers(self._gtk_handlers)
+            self.core.unregister_ui("model_handling",
+                                    self.gui.get_object("ModelSimplificationFrame"))
+
+    def _get_simplifiable_models(self):
+        return [model for model in self.core.get("models").get_selected()
+                if (model is not None) and hasattr(model.get_model(), "get_simplified_model")]
+
+    def _update_controls(self):
+        control = self.gui.get_object("ModelSimplificationFrame")
+        if self._get_simplifiable_models():
+            control.show()
+        else:
+            control.hide()
+
+    def _simplify(self, widget=None):
+        tolerance = self.gui.get_object("SimplificationTolerance").get_value()
+        for model in self._get_simplifiable_models():
+            model.extend_value("transformations",
+                               [{"action": "simplify", "tolerance": tolerance}])
@@ -47,8 +47,8 @@ class OpenGLViewModel(pycam.Plugins.PluginBase):
         self.core.emit_event("visual-item-updated")
 
     def _get_cache_key(self, model, *args, **kwargs):
-        if hasattr(model, "uuid"):
-            return "%s - %s - %s" % (model.uuid, repr(args), repr(kwargs))
+        if hasattr(model, "fingerprint"):
+            return "%s - %s - %s" % (model.fingerprint, repr(args), repr(kwargs))
         else:
             return None
 
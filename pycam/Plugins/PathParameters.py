@@ -84,6 +84,62 @@ class PathParamMaterialAllowance(pycam.Plugins.PluginBase):
         self.core.get("unregister_parameter")("process", "material_allowance")
 
 
+class PathParamHeightFieldResolution(pycam.Plugins.PluginBase):
+
+    DEPENDS = ["Processes"]
+    CATEGORIES = ["Process", "Parameter"]
+
+    def setup(self):
+        self.control = pycam.Gui.ControlsGTK.InputNumber(
+            start=0, lower=0, digits=3, increment=0.05,
+            change_handler=lambda widget=None: self.core.emit_event("process-control-changed"))
+        self.core.get("register_parameter")("process", "height_field_resolution", self.control)
+        self.core.register_ui("process_path_parameters", "Height field resolution",
+                              self.control.get_widget(), weight=40)
+        return True
+
+    def teardown(self):
+        self.core.unregister_ui("process_path_parameters", self.control.get_widget())
+        self.core.get("unregister_parameter")("process", "height_field_resolution")
+
+
+class PathParamSamplingTolerance(pycam.Plugins.PluginBase):
+
+    DEPENDS = ["Processes"]
+    CATEGORIES = ["Process", "Parameter"]
+
+    def setup(self):
+        self.control = pycam.Gui.ControlsGTK.InputNumber(
+            start=0, lower=0, digits=3, increment=0.01,
+            change_handler=lambda widget=None: self.core.emit_event("process-control-changed"))
+        self.core.get("register_parameter")("process", "sampling_tolerance", self.control)
+        self.core.register_ui("process_path_parameters", "Sampling tolerance",
+                              self.control.get_widget(), weight=45)
+        return True
+
+    def teardown(self):
+        self.core.unregister_ui("process_path_parameters", self.control.get_widget())
+        self.core.get("unregister_parameter")("process", "sampling_tolerance")
+
+
+class PathParamCullHiddenFacets(pycam.Plugins.PluginBase):
+
+    DEPENDS = ["Processes"]
+    CATEGORIES = ["Process", "Parameter"]
+
+    def setup(self):
+        self.control = pycam.Gui.ControlsGTK.InputCheckBox(
+            change_handler=lambda widget=None: self.core.emit_event("process-control-changed"))
+        self.core.get("register_parameter")("process", "cull_hidden_facets", self.control)
+        self.core.register_ui("process_path_parameters", "Ignore hidden facets",
+                              self.control.get_widget(), weight=47)
+        return True
+
+    def teardown(self):
+        self.core.unregister_ui("process_path_parameters", self.control.get_widget())
+        self.core.get("unregister_parameter")("process", "cull_hidden_facets")
+
+
 class PathParamMillingStyle(pycam.Plugins.PluginBase):
 
     DEPENDS = ["Processes", "PathParamPattern"]
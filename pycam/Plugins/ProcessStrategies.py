@@ -63,12 +63,16 @@ class ProcessStrategyContour(pycam.Plugins.PluginBase):
 class ProcessStrategySurfacing(pycam.Plugins.PluginBase):
 
     DEPENDS = ["ParameterGroupManager", "PathParamOverlap", "PathParamMaterialAllowance",
-               "PathParamPattern"]
+               "PathParamPattern", "PathParamHeightFieldResolution",
+               "PathParamSamplingTolerance", "PathParamCullHiddenFacets"]
     CATEGORIES = ["Process"]
 
     def setup(self):
         parameters = {"overlap": 0.6,
                       "material_allowance": 0,
+                      "height_field_resolution": 0,
+                      "sampling_tolerance": 0,
+                      "cull_hidden_facets": False,
                       "path_pattern": None}
         self.core.get("register_parameter_set")("process", "surface", "Surfacing", None,
                                                 parameters=parameters, weight=50)
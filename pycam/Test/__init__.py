@@ -21,6 +21,28 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 import unittest
 
 
+# the corners of each side of a unit cube (clockwise viewed from outside - see Triangle)
+CUBE_SIDES = (((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)),
+              ((0, 0, 1), (0, 1, 1), (1, 1, 1), (1, 0, 1)),
+              ((0, 0, 0), (0, 0, 1), (1, 0, 1), (1, 0, 0)),
+              ((0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1)),
+              ((0, 0, 0), (0, 1, 0), (0, 1, 1), (0, 0, 1)),
+              ((1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0)))
+
+
+def add_box(model, lower, upper, reverse=False):
+    """ add the facets of an axis-aligned box to a model
+
+    @param reverse: let the normals point inwards (e.g. for a cavity)
+    """
+    def get_point(corner):
+        return tuple(low + c * (high - low) for c, low, high in zip(corner, lower, upper))
+    for side in CUBE_SIDES:
+        p1, p2, p3, p4 = [get_point(corner) for corner in side]
+        for triangle in ((p1, p2, p3), (p1, p3, p4)):
+            model.add_triangle(*(reversed(triangle) if reverse else triangle))
+
+
 class PycamTestCase(unittest.TestCase):
 
     def _compare_vectors(self, v1, v2, max_deviance=0.000001):
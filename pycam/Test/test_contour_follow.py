@@ -0,0 +1,65 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from pycam.Geometry.Line import Line
+from pycam.Geometry.Triangle import Triangle
+from pycam.PathGenerators.ContourFollow import CollisionPaths, _get_triangle_chunks
+import pycam.Test
+
+
+class TestCollisionPaths(pycam.Test.PycamTestCase):
+
+    def test_groups(self):
+        square = ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0))
+        lines = [Line(square[index], square[(index + 1) % 4]) for index in range(4)]
+        # an open path
+        lines.append(Line((5, 0, 0), (6, 0, 0)))
+        lines.append(Line((6, 0, 0), (7, 0, 0)))
+        paths = CollisionPaths()
+        for index in (2, 4, 0, 5, 3, 1):
+            paths.add(lines[index], lines[index])
+        # adding the same line again is ignored
+        paths.add(lines[0], lines[0])
+        self.assertEqual(len(paths.waterlines), 6)
+        # each group is extended at its start (preferred) or at its end
+        self.assertEqual(paths._get_groups(), [[5, 0, 4, 2], [1, 3]])
+        self.assertEqual(paths.get_shifted_lines(),
+                         [lines[1], lines[2], lines[3], lines[0], lines[4], lines[5]])
+
+    def test_exact_points(self):
+        # end points are connected only if they are equal
+        paths = CollisionPaths()
+        paths.add(Line((0, 0, 0), (1, 0, 0)), None)
+        paths.add(Line((2, 0, 0), (3, 0, 0)), None)
+        paths.add(Line((1.000000001, 0, 0), (2, 0, 0)), None)
+        paths.add(Line((1, 0, 0), (2, 0, 0)), None)
+        self.assertEqual(paths._get_groups(), [[0, 3, 1], [2]])
+
+
+class TestTriangleChunks(pycam.Test.PycamTestCase):
+
+    def test_chunks(self):
+        # a row of small triangles along the x axis - in reverse order
+        triangles = [Triangle((x, 0, 0), (x + 1, 0, 0), (x, 1, 0)) for x in range(11, -1, -1)]
+        positions = [position for position in range(len(triangles)) if position != 5]
+        chunks = _get_triangle_chunks(triangles, positions, 3)
+        self.assertEqual(chunks, [[8, 9, 10, 11], [3, 4, 6, 7], [0, 1, 2]])
+        self.assertEqual(_get_triangle_chunks(triangles, positions, 100),
+                         [[position] for position in reversed(positions)])
+        self.assertEqual(_get_triangle_chunks(triangles, [], 3), [])
@@ -0,0 +1,159 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Cutters.ToroidalCutter import ToroidalCutter
+from pycam.Geometry import Box3D, Point3D
+from pycam.Geometry.ContactCache import ContactCache
+from pycam.Geometry.Model import Model
+from pycam.Geometry.PointUtils import pcross, pnorm, psub
+from pycam.PathGenerators import get_max_height_dynamic, get_max_height_triangles
+from pycam.PathGenerators.DropCutter import DropCutter
+import pycam.Test
+from pycam.Toolpath import MOVE_SAFETY
+from pycam.Toolpath.MotionGrid import get_fixed_grid, GridDirection
+
+
+class TestDropCutter(pycam.Test.PycamTestCase):
+
+    def _get_model(self):
+        # a plateau with a ridge in its middle
+        model = Model()
+        for x1, x2, z1, z2 in ((0, 4, 0, 0), (4, 5, 0, 1), (5, 6, 1, 0), (6, 10, 0, 0)):
+            model.add_triangle((x1, -1, z1), (x1, 1, z1), (x2, -1, z2))
+            model.add_triangle((x2, -1, z2), (x1, 1, z1), (x2, 1, z2))
+        return model
+
+    def test_adaptive_sampling(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        tolerance = 0.01
+        dense = get_max_height_dynamic(model, cutter, [(x / 8.0, 0) for x in range(81)], -1, 5)
+        coarse = get_max_height_dynamic(model, cutter, [(x / 2.0, 0) for x in range(21)], -1, 5,
+                                        max_depth=7, tolerance=tolerance)
+        self.assertLess(len(coarse), len(dense))
+        # the flat parts do not contain additional points
+        self.assertEqual(len([p for p in coarse if p[0] < 3]), 1)
+        for start, end in zip(coarse, coarse[1:]):
+            middle = get_max_height_triangles(model, cutter, (start[0] + end[0]) / 2, 0, -1, 5)
+            chord = psub(end, start)
+            deviation = pnorm(pcross(psub(middle, start), chord)) / pnorm(chord)
+            self.assertLessEqual(deviation, tolerance)
+
+    def test_contact_cache(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        cache = ContactCache()
+        lines = [[(x / 4.0, y / 4.0) for x in range(41)] for y in range(-2, 3)]
+        for line in lines:
+            expected = get_max_height_dynamic(model, cutter, line, -1, 5)
+            self.assertEqual(get_max_height_dynamic(model, cutter, line, -1, 5, cache=cache),
+                             expected)
+        # neighbouring lines reuse the candidates of each other
+        self.assertGreater(cache.cell_hits, 0)
+        # repeated lines are taken from the cache completely
+        misses = cache.height_misses
+        get_max_height_dynamic(model, cutter, lines[0], -1, 5, cache=cache)
+        self.assertEqual(cache.height_misses, misses)
+        height_rate, cell_rate = cache.get_hit_rates()
+        self.assertGreater(height_rate, 0)
+        self.assertGreater(cell_rate, 0)
+
+    def test_contact_cache_keys(self):
+        model = self._get_model()
+        cache = ContactCache()
+        line = [(x / 4.0, 0) for x in range(41)]
+        get_max_height_dynamic(model, SphericalCutter(0.5), line, -1, 5, cache=cache)
+        # the heights of another tool or another model are not reused
+        misses = cache.height_misses
+        expected = get_max_height_dynamic(model, SphericalCutter(1), line, -1, 5)
+        self.assertEqual(get_max_height_dynamic(model, SphericalCutter(1), line, -1, 5,
+                                                cache=cache), expected)
+        self.assertGreater(cache.height_misses, misses)
+        misses = cache.height_misses
+        model.shift(0, 0, 1)
+        expected = get_max_height_dynamic(model, SphericalCutter(1), line, -1, 5)
+        self.assertEqual(get_max_height_dynamic(model, SphericalCutter(1), line, -1, 5,
+                                                cache=cache), expected)
+        self.assertGreater(cache.height_misses, misses)
+
+    def test_contact_cache_xy_grid(self):
+        model = self._get_model()
+        cutter = ToroidalCutter(0.5, 0.2)
+        box = Box3D(Point3D(0, -1, 0), Point3D(10, 1, 1))
+        grid = list(get_fixed_grid(box, None, 0.3, step_width=0.3,
+                                   grid_direction=GridDirection.XY))
+        # the crossings of both layers are calculated only once (by the first layer)
+        lines = list(DropCutter().get_toolpath_lines(cutter, [model], grid, minz=-1, maxz=5))
+        expected = [get_max_height_dynamic(model, cutter, [(p[0], p[1]) for p in line], -1, 5)
+                    for layer in grid for line in layer]
+        self.assertEqual([[move.position for move in moves[:-1]] for moves in lines], expected)
+
+    def test_contact_cache_sweep(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        bvh = model.get_bvh()
+        sweeps = []
+        query_sweep = bvh.query_sweep
+
+        def counting_query_sweep(lowers, uppers):
+            sweeps.append(len(lowers))
+            return query_sweep(lowers, uppers)
+
+        bvh.query_sweep = counting_query_sweep
+        line = [(x / 4.0, 0.3) for x in range(41)]
+        expected = model.get_max_heights(cutter, line, -1, 5)
+        sweeps.clear()
+        cache = ContactCache()
+        self.assertEqual(model.get_max_heights(cutter, line, -1, 5, cache=cache), expected)
+        # the new cells of the line are collected in one sweep
+        self.assertEqual(sweeps, [cache.cell_misses])
+
+    def test_toolpath_lines(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        grid = [[[(x / 2.0, y / 4.0, 0) for x in range(21)] for y in range(-3, 4)]]
+        lines = list(DropCutter().get_toolpath_lines(cutter, [model], grid, minz=-1, maxz=5,
+                                                     max_pending=2))
+        self.assertEqual(len(lines), 7)
+        for moves in lines:
+            self.assertEqual(moves[-1].action, MOVE_SAFETY)
+        path = DropCutter().generate_toolpath(cutter, [model], grid, minz=-1, maxz=5)
+        self.assertEqual([move for moves in lines for move in moves], path)
+
+    def test_toolpath_callback(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        grid = [[[(x / 2.0, y / 4.0, 0) for x in range(21)] for y in range(-3, 4)]]
+        lines = list(DropCutter().get_toolpath_lines(cutter, [model], grid, minz=-1, maxz=5))
+        # cancel at the second point of the second line
+        cancel_count = len(lines[0]) - 1 + 2
+        positions = []
+
+        def draw_callback(text=None, percent=None, tool_position=None, toolpath=None):
+            if toolpath is not None:
+                positions.append(tool_position)
+                return len(positions) == cancel_count
+
+        path = DropCutter().generate_toolpath(cutter, [model], grid, minz=-1, maxz=5,
+                                              draw_callback=draw_callback)
+        # the callback is called for the points of the lines - not for their moves to safety
+        self.assertEqual(positions, [move.position for move in lines[0][:-1] + lines[1][:2]])
+        # the cancelled line is finished with a move to safety height
+        self.assertEqual(path, lines[0] + lines[1][:2] + [lines[1][-1]])
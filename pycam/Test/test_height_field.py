@@ -0,0 +1,105 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+import numpy
+
+from pycam.Cutters.CylindricalCutter import CylindricalCutter
+from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Cutters.ToroidalCutter import ToroidalCutter
+from pycam.Geometry.HeightField import HeightField
+from pycam.Geometry.Model import Model
+from pycam.PathGenerators import get_max_height_triangles
+from pycam.PathGenerators.DropCutter import DropCutter
+from pycam.Toolpath import MOVE_STRAIGHT
+import pycam.Test
+
+
+class TestHeightField(pycam.Test.PycamTestCase):
+
+    def _get_model(self):
+        # a ridge along the x axis
+        model = Model()
+        model.add_triangle((0, -2, 0), (0, 0, 2), (4, -2, 0))
+        model.add_triangle((4, -2, 0), (0, 0, 2), (4, 0, 2))
+        model.add_triangle((0, 0, 2), (0, 2, 0), (4, 0, 2))
+        model.add_triangle((4, 0, 2), (0, 2, 0), (4, 2, 0))
+        return model
+
+    def test_rasterize(self):
+        field = HeightField.from_model(self._get_model(), -1, -3, 5, 3, 0.5)
+        self.assertEqual(field.shape, (14, 14))
+        # each node contains the highest point of the surface within its cell
+        self.assertEqual(field.get_heights([2, 2, 2, 2], [0, 1, 2.25, 3]).tolist(),
+                         [2, 1.25, 0.25, -numpy.inf])
+        # the highest of the surrounding nodes is used
+        self.assertEqual(field.get_heights([2], [0.25]).tolist(), [2])
+
+    def test_offset_surface(self):
+        model = self._get_model()
+        resolution = 0.05
+        field = HeightField.from_model(model, -3, -5, 7, 5, resolution)
+        for cutter in (SphericalCutter(1), CylindricalCutter(1), ToroidalCutter(1, 0.25)):
+            surface = field.get_offset_surface(cutter)
+            horizontal = field.get_horizontal_error()
+            self.assertAlmostEqual(horizontal, resolution * math.sqrt(2))
+            positions = ((2, 0), (2, 0.7), (2, -1.3), (-0.5, 0.3), (3.2, 2.6))
+            heights = field.get_offset_heights(cutter, *zip(*positions))
+            for (x, y), height in zip(positions, heights):
+                # only the nodes surrounding the position are calculated
+                self.assertEqual(height, surface.get_heights([x], [y])[0])
+                exact = get_max_height_triangles(model, cutter, x, y, -10, 10)[2]
+                # the slope of the ridge is 1
+                self.assertGreaterEqual(height, exact - 1e-9)
+                self.assertLessEqual(height, exact + 2 * horizontal + resolution / 2)
+
+    def test_walls(self):
+        # a rotated block with vertical walls - the tool may not sink into it next to its edges
+        model = Model()
+        corners = [(2 + 1.3 * math.cos(angle), 0.01 + 1.3 * math.sin(angle))
+                   for angle in (0.4, 0.4 + math.pi / 2, 0.4 + math.pi, 0.4 - math.pi / 2)]
+        for (x1, y1), (x2, y2) in zip(corners, corners[1:] + corners[:1]):
+            model.add_triangle((x1, y1, 0), (x2, y2, 1), (x2, y2, 0))
+            model.add_triangle((x1, y1, 0), (x1, y1, 1), (x2, y2, 1))
+        (x1, y1), (x2, y2), (x3, y3), (x4, y4) = corners
+        model.add_triangle((x1, y1, 1), (x2, y2, 1), (x3, y3, 1))
+        model.add_triangle((x1, y1, 1), (x3, y3, 1), (x4, y4, 1))
+        random = numpy.random.RandomState(7)
+        x = random.uniform(-0.5, 4.5, 200)
+        y = random.uniform(-2.5, 2.5, 200)
+        field = HeightField.from_model(model, -2, -4, 6, 4, 0.05)
+        for cutter in (CylindricalCutter(1), SphericalCutter(1), ToroidalCutter(1, 0.25)):
+            heights = field.get_offset_heights(cutter, x, y, floor=-1)
+            for one_x, one_y, height in zip(x.tolist(), y.tolist(), heights.tolist()):
+                exact = get_max_height_triangles(model, cutter, one_x, one_y, -1, 10)[2]
+                self.assertGreaterEqual(height, exact - 1e-9)
+
+    def test_drop_cutter(self):
+        cutter = SphericalCutter(1)
+        lines = [[[(1, y, 0), (3, y, 0)] for y in (-0.5, 0.5)]]
+        path = DropCutter(height_field_resolution=0.1).generate_toolpath(
+            cutter, [self._get_model()], lines, minz=-0.5, maxz=10)
+        points = [step.position for step in path if step.action == MOVE_STRAIGHT]
+        # the height along the ridge is constant - intermediate points are removed
+        self.assertEqual(len(points), 4)
+        for point in points:
+            exact = get_max_height_triangles(self._get_model(), cutter, point[0], point[1],
+                                             -0.5, 10)
+            self.assertAlmostEqual(point[2], exact[2], delta=0.2)
@@ -0,0 +1,110 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+import numpy
+
+from pycam.Geometry.Model import Model
+import pycam.Cutters.SphericalCutter
+import pycam.errors
+import pycam.Test
+from pycam.workspace.data_models import ModelTransformation
+
+
+def _get_surface_model(func, size, count):
+    """ return a height field surface with 2 * count * count facets """
+    model = Model()
+    coordinates = [size * index / count for index in range(count + 1)]
+    vertices = [(x, y, func(x, y)) for x in coordinates for y in coordinates]
+    indices = []
+    for x in range(count):
+        for y in range(count):
+            p1 = x * (count + 1) + y
+            p2, p3, p4 = p1 + 1, p1 + count + 1, p1 + count + 2
+            indices.extend(((p1, p2, p3), (p3, p2, p4)))
+    model.add_triangles(vertices, indices)
+    return model
+
+
+def _get_samples(mesh, count):
+    """ return points distributed evenly across all facets """
+    weights = [(i / count, j / count) for i in range(count + 1) for j in range(count + 1 - i)]
+    points = mesh.vertices[mesh.indices]
+    return numpy.unique(numpy.concatenate([points[:, 0] + u * (points[:, 1] - points[:, 0])
+                                           + v * (points[:, 2] - points[:, 0])
+                                           for u, v in weights]), axis=0)
+
+
+def _get_distances(samples, mesh, chunk_size=64):
+    """ return the distance of each sample to the nearest facet of the mesh """
+    p1, p2, p3 = [mesh.vertices[mesh.indices[:, index]] for index in range(3)]
+    normals = numpy.cross(p2 - p1, p3 - p1)
+    normals /= numpy.linalg.norm(normals, axis=1)[:, numpy.newaxis]
+    result = []
+    for start in range(0, len(samples), chunk_size):
+        # shape of the arrays: (samples, facets, axes)
+        points = samples[start:start + chunk_size, numpy.newaxis]
+        heights = ((points - p1) * normals).sum(axis=2)
+        projected = points - heights[:, :, numpy.newaxis] * normals
+        inside = numpy.ones(heights.shape, dtype=bool)
+        distances = numpy.full(heights.shape, numpy.inf)
+        for edge_start, edge_end in ((p1, p2), (p2, p3), (p3, p1)):
+            edge = edge_end - edge_start
+            inside &= (numpy.cross(edge, projected - edge_start) * normals).sum(axis=2) >= 0
+            factors = ((points - edge_start) * edge).sum(axis=2) / (edge * edge).sum(axis=1)
+            nearest = edge_start + numpy.clip(factors, 0, 1)[:, :, numpy.newaxis] * edge
+            distances = numpy.minimum(distances, numpy.linalg.norm(points - nearest, axis=2))
+        distances[inside] = numpy.abs(heights[inside])
+        result.append(distances.min(axis=1))
+    return numpy.concatenate(result)
+
+
+class TestMeshDecimation(pycam.Test.PycamTestCase):
+
+    def test_flat_areas(self):
+        model = _get_surface_model(lambda x, y: 1.0 if x < 5 else 0.5 * x - 1.5, 10, 20)
+        simplified = model.get_simplified_model(1e-6)
+        self.assertLess(len(simplified), len(model) / 10)
+        self.assertEqual(simplified.get_mesh().get_bounds(), model.get_mesh().get_bounds())
+        cutter = pycam.Cutters.SphericalCutter.SphericalCutter(1)
+        positions = [(x / 7, y / 7) for x in range(71) for y in range(71)]
+        for height, other in zip(model.get_max_heights(cutter, positions),
+                                 simplified.get_max_heights(cutter, positions)):
+            self.assertAlmostEqual(height, other)
+
+    def test_tolerance(self):
+        model = _get_surface_model(lambda x, y: math.sin(x) * math.cos(y), 3, 30)
+        tolerance = 0.02
+        simplified = model.get_simplified_model(tolerance)
+        self.assertLess(len(simplified), len(model) / 3)
+        # both surfaces are within the tolerance of each other (Hausdorff distance)
+        mesh, other = model.get_mesh(), simplified.get_mesh()
+        self.assertLessEqual(_get_distances(_get_samples(mesh, 2), other).max(), tolerance)
+        self.assertLessEqual(_get_distances(_get_samples(other, 3), mesh).max(), tolerance)
+        # the border of the surface is kept
+        self.assertEqual(other.get_bounds(), mesh.get_bounds())
+
+    def test_transformation(self):
+        model = _get_surface_model(lambda x, y: 0, 4, 8)
+        transformation = ModelTransformation({"action": "simplify", "tolerance": 0.1})
+        self.assertLess(len(transformation.get_transformed_model(model)), len(model))
+        with self.assertRaises(pycam.errors.InvalidDataError):
+            ModelTransformation({"action": "simplify", "tolerance": 0}).get_transformed_model(
+                model)
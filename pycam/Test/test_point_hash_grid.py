@@ -0,0 +1,63 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+from pycam.Geometry.PointHashGrid import merge_points, PointHashGrid
+import pycam.Test
+
+
+class TestPointHashGrid(pycam.Test.PycamTestCase):
+
+    def test_exact_duplicates(self):
+        grid = PointHashGrid(0.01)
+        first = grid.point(1.0, 2.0, 3.0)
+        self.assertIs(grid.point(1.0, 2.0, 3.0), first)
+        self.assertEqual(len(grid), 1)
+
+    def test_merge_within_tolerance(self):
+        grid = PointHashGrid(0.01)
+        first = grid.point(1.0, 2.0, 3.0)
+        # the neighbour is located in an adjacent cell
+        self.assertEqual(grid.point(0.995, 2.004, 3.0), first)
+        self.assertNotEqual(grid.point(1.02, 2.0, 3.0), first)
+
+    def test_closest_point(self):
+        grid = PointHashGrid(0.01)
+        grid.point(0.0, 0.0, 0.0)
+        grid.point(0.015, 0.0, 0.0)
+        self.assertEqual(grid.point(0.009, 0.0, 0.0), (0.015, 0.0, 0.0))
+        self.assertEqual(grid.point(-0.005, 0.0, 0.0), (0.0, 0.0, 0.0))
+
+    def test_merge_points(self):
+        random = numpy.random.RandomState(3)
+        points = random.uniform(0, 0.1, (400, 3))
+        # add exact duplicates and points in the neighbourhood of others
+        points = numpy.concatenate((points, points[:50], points[50:100] + 0.002))
+        random.shuffle(points)
+        grid = PointHashGrid(0.01)
+        expected = [grid.point(*point) for point in points.tolist()]
+        unique_points, indices = merge_points(points, 0.01)
+        self.assertEqual(len(unique_points), len(grid))
+        self.assertEqual([tuple(point) for point in unique_points[indices].tolist()], expected)
+
+    def test_merge_exact_points(self):
+        unique_points, indices = merge_points([(1, 0, 0), (0, 0, 0), (1, 0, 0), (0, 0, -0.0)])
+        self.assertEqual(unique_points.tolist(), [[1, 0, 0], [0, 0, 0]])
+        self.assertEqual(indices.tolist(), [0, 1, 0, 1])
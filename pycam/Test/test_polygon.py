@@ -1,5 +1,6 @@
 from pycam.Geometry.Polygon import Polygon
 from pycam.Geometry.Line import Line
+from pycam.Geometry.Model import ContourModel
 
 
 def assert_polygons_are_identical(polygon0, polygon1):
@@ -106,3 +107,15 @@ def test_get_offset_polygons_truncated_square_inside_small_offset():
         print(str(p))
     assert(len(output_p) == 1)
     assert_polygons_are_identical(output_p[0], expected_inside_p)
+
+
+def test_transform_shared_plane():
+    model = ContourModel()
+    model.append(Line((0, 0, 0), (1, 0, 0)))
+    model.append(Line((0, 5, 0), (1, 5, 0)))
+    # both polygons share the plane of the model - it is shifted only once
+    model.shift(0, 0, 2)
+    assert len(model.get_polygons()) == 2
+    for polygon in model.get_polygons():
+        assert polygon.get_points()[0][2] == 2
+        assert polygon.plane.p == (0, 0, 2)
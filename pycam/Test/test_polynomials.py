@@ -0,0 +1,55 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+
+import numpy
+
+from pycam.Utils.polynomials import (poly2_roots, poly2_roots_many, poly3_roots,
+                                     poly3_roots_many, poly4_roots, poly4_roots_many)
+import pycam.Test
+
+
+class TestPolynomials(pycam.Test.PycamTestCase):
+
+    def _assert_roots_equal(self, many_roots, expected):
+        self.assertEqual(len(many_roots), len(expected))
+        for row, roots in zip(many_roots, expected):
+            found = [value for value in row.tolist() if not numpy.isnan(value)]
+            self.assertEqual(len(found), len(roots or ()))
+            for value, root in zip(found, roots or ()):
+                self.assertAlmostEqual(value, root, places=9)
+
+    def test_known_roots(self):
+        coefficients = [(1, 0, 0, 0, -1), (1, 0, -2, 0, 1), (1, -10, 35, -50, 24),
+                        (1, 0, 6, -60, 36), (1, -25, 235.895, -995.565, 1585.25),
+                        (1, 0, 0, 0, 1), (0, 1, 0, -2, 0), (0, 0, 1, 2, 1), (0, 0, 0, 0, 1)]
+        many_roots = poly4_roots_many(*numpy.array(coefficients).T)
+        self._assert_roots_equal(many_roots, [poly4_roots(*row) for row in coefficients])
+        self.assert_vector_equal(sorted(many_roots[2].tolist()), (1, 2, 3, 4))
+
+    def test_random_polynomials(self):
+        rand = random.Random(7)
+        for solve, solve_many, count in ((poly2_roots, poly2_roots_many, 3),
+                                         (poly3_roots, poly3_roots_many, 4),
+                                         (poly4_roots, poly4_roots_many, 5)):
+            coefficients = [[rand.uniform(-10, 10) for _ in range(count)] for _ in range(200)]
+            many_roots = solve_many(*numpy.array(coefficients).T)
+            self.assertEqual(many_roots.shape, (200, count - 1))
+            self._assert_roots_equal(many_roots, [solve(*row) for row in coefficients])
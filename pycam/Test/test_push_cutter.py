@@ -0,0 +1,99 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from pycam.Cutters.CylindricalCutter import CylindricalCutter
+from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Cutters.ToroidalCutter import ToroidalCutter
+from pycam.Geometry.Model import CompositeModel, Model
+from pycam.PathGenerators import get_free_paths_triangles
+from pycam.PathGenerators.PushCutter import PushCutter
+import pycam.Test
+from pycam.Toolpath import MOVE_SAFETY
+
+
+class TestPushCutter(pycam.Test.PycamTestCase):
+
+    def _get_model(self, shift=0):
+        # a pyramid with a square base
+        model = Model()
+        corners = ((shift, 0, 0), (shift + 6, 0, 0), (shift + 6, 6, 0), (shift, 6, 0))
+        top = (shift + 3, 3, 4)
+        for index, corner in enumerate(corners):
+            model.add_triangle(corner, top, corners[(index + 1) % 4])
+        model.add_triangle(corners[0], corners[1], corners[2])
+        model.add_triangle(corners[0], corners[2], corners[3])
+        return model
+
+    def _get_grid(self, heights):
+        return [[((-2, y / 2.0, z), (8, y / 2.0, z)) for y in range(-3, 16)] for z in heights]
+
+    def test_parallel_layers(self):
+        model = self._get_model()
+        cutter = CylindricalCutter(0.5)
+        heights = (3, 2, 1)
+        for waterlines in (False, True):
+            # the layers are processed as tasks only with multiple workers
+            paths = [PushCutter(waterlines=waterlines).generate_toolpath(
+                         cutter, [model], self._get_grid(heights)),
+                     PushCutter(waterlines=waterlines)._generate_toolpath_by_layers(
+                         cutter, [model], self._get_grid(heights))]
+            self.assertEqual([move.position for move in paths[0]],
+                             [move.position for move in paths[1]])
+        # every waterline surrounds the pyramid
+        waterline_heights = [move.position[2] for move in paths[1]
+                             if move.action != MOVE_SAFETY]
+        self.assertEqual(sorted(set(waterline_heights), reverse=True), list(heights))
+
+    def _assert_free_paths(self, points, expected_x, z=2):
+        self.assertEqual(len(points), len(expected_x))
+        for point, x in zip(points, expected_x):
+            self.assertAlmostEqual(point[0], x, places=4)
+            self.assertEqual(point[1:], (3, z))
+
+    def test_free_paths(self):
+        model = self._get_model()
+        p1, p2 = (-2, 3, 2), (8, 3, 2)
+        # the pyramid is 3 units wide at this height
+        self._assert_free_paths(get_free_paths_triangles([model], CylindricalCutter(0.5), p1, p2),
+                                (-2, 1, 5, 8))
+        # the sphere touches the sloped faces
+        self._assert_free_paths(get_free_paths_triangles([model], SphericalCutter(0.5), p1, p2),
+                                (-2, 1.25, 4.75, 8))
+        # the flat bottom of the tool collides first
+        torus_paths = get_free_paths_triangles([model], ToroidalCutter(0.5, 0.25), p1, p2)
+        self.assertGreater(torus_paths[1][0], 1.0)
+        self.assertLess(torus_paths[1][0], 1.25)
+        # below the pyramid the tool collides with its base
+        self._assert_free_paths(get_free_paths_triangles([model], CylindricalCutter(0.5),
+                                                         (-2, 3, -1), (8, 3, -1)),
+                                (-2, -0.5, 6.5, 8), z=-1)
+
+    def test_free_paths_of_multiple_models(self):
+        models = [self._get_model(), self._get_model(shift=10)]
+        cutter = CylindricalCutter(0.5)
+        p1, p2 = (-2, 3, 2), (18, 3, 2)
+        expected = (-2, 1, 5, 11, 15, 18)
+        self._assert_free_paths(get_free_paths_triangles(models, cutter, p1, p2), expected)
+        self._assert_free_paths(get_free_paths_triangles([CompositeModel(models)], cutter, p1,
+                                                         p2), expected)
+        # the triangles limiting the free parts belong to the models
+        points = get_free_paths_triangles(models, cutter, p1, p2, return_triangles=True)
+        self.assertEqual([triangle is None for point, triangle, contact in points],
+                         [True, False, False, False, False, True])
+        self.assertIn(points[3][1], models[1].triangles())
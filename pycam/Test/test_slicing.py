@@ -0,0 +1,85 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from pycam.Geometry.Model import Model
+from pycam.Geometry.Plane import Plane
+from pycam.Geometry.Slicing import get_slice_segments
+import pycam.Test
+
+
+def _add_pyramid(model, lower, upper, height):
+    corners = ((lower[0], lower[1], 0), (upper[0], lower[1], 0), (upper[0], upper[1], 0),
+               (lower[0], upper[1], 0))
+    top = ((lower[0] + upper[0]) / 2, (lower[1] + upper[1]) / 2, height)
+    for index, corner in enumerate(corners):
+        model.add_triangle(corner, top, corners[(index + 1) % 4])
+    model.add_triangle(corners[0], corners[1], corners[2])
+    model.add_triangle(corners[0], corners[2], corners[3])
+
+
+class TestSlicing(pycam.Test.PycamTestCase):
+
+    def _get_areas(self, contour):
+        return sorted(round(polygon.get_area(), 6) for polygon in contour.get_polygons())
+
+    def test_box_with_cavity(self):
+        model = Model()
+        pycam.Test.add_box(model, (0, 0, 0), (10, 8, 4))
+        pycam.Test.add_box(model, (2, 2, 1), (8, 6, 3), reverse=True)
+        contours = model.get_waterline_contours([3.5, 0.5, 2])
+        self.assertEqual(len(contours), 3)
+        for contour in contours:
+            self.assertTrue(all(polygon.is_closed for polygon in contour.get_polygons()))
+        self.assertEqual(self._get_areas(contours[0]), [80])
+        self.assertEqual(self._get_areas(contours[1]), [80])
+        # the cavity is a hole with a negative area
+        self.assertEqual(self._get_areas(contours[2]), [-24, 80])
+
+    def test_levels_at_vertices(self):
+        model = Model()
+        _add_pyramid(model, (0, 0), (4, 4), 4)
+        # the tip of the pyramid does not result in a contour
+        level_indices = get_slice_segments(model.get_mesh(), [0, 4, 2])[0]
+        self.assertEqual(set(level_indices.tolist()), {0, 2})
+        contours = model.get_waterline_contours([0, 2, 4])
+        self.assertEqual([len(contour.get_polygons()) for contour in contours], [1, 1, 0])
+        self.assertEqual(self._get_areas(contours[0]), [16])
+        self.assertEqual(self._get_areas(contours[1]), [4])
+
+    def test_box_bottom_and_top(self):
+        model = Model()
+        pycam.Test.add_box(model, (0, 0, -10), (10, 8, 4))
+        for level in (model.minz, model.maxz):
+            contour = model.get_waterline_contour(Plane((0, 0, level), (0, 0, 1, 'v')))
+            polygons = contour.get_polygons()
+            self.assertEqual(len(polygons), 1)
+            self.assertTrue(polygons[0].is_closed)
+            self.assertEqual(self._get_areas(contour), [80])
+
+    def test_single_levels(self):
+        model = Model()
+        _add_pyramid(model, (0, 0), (4, 4), 4)
+        pycam.Test.add_box(model, (5, 0, 0), (7, 3, 2))
+        levels = [0.5, 1, 1.5, 2.5, 3.75]
+        contours = model.get_waterline_contours(levels)
+        for level, contour in zip(levels, contours):
+            single = model.get_waterline_contour(Plane((0, 0, level), (0, 0, 1, 'v')))
+            self.assertEqual(self._get_areas(single), self._get_areas(contour))
+            for polygon in contour.get_polygons():
+                self.assertTrue(polygon.is_closed)
@@ -17,10 +17,16 @@ You should have received a copy of the GNU General Public License
 along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import io
 import os
+import struct
 
+import numpy
+
+from pycam.errors import LoadFileError
 import pycam.Test
-from pycam.Importers.STLImporter import import_model
+from pycam.Importers import STLImporter
+from pycam.Importers.STLImporter import BINARY_FACET_TYPE, import_model
 
 cwd = os.path.dirname(os.path.abspath(__file__))
 
@@ -48,3 +54,72 @@ class TestSTLLoader(pycam.Test.PycamTestCase):
     def test_load_binary_file(self):
         model = import_model(path_to_asset('cube_binary.stl'))
         self.assertEqual(len(model), 12)
+
+    def test_load_binary_stream(self):
+        facets = numpy.zeros(3, dtype=BINARY_FACET_TYPE)
+        # counter-clockwise vertices matching the normal
+        facets[0] = ((0, 0, 1), ((0, 0, 0), (1, 0, 0), (0, 1, 0)), 0)
+        # no normal given
+        facets[1] = ((0, 0, 0), ((1, 0, 0), (1, 1, 0), (0, 1, 0)), 0)
+        # degenerate facet
+        facets[2] = ((0, 0, 1), ((0, 0, 0), (1, 1, 0), (2, 2, 0)), 0)
+        data = b" " * 80 + struct.pack("<I", len(facets)) + facets.tobytes()
+        model = import_model(io.BytesIO(data))
+        self.assertEqual(len(model), 2)
+        self.assertEqual(len(model.get_mesh().vertices), 4)
+        for triangle in model.triangles():
+            self.assertEqual(triangle.normal[:3], (0, 0, 1))
+
+    def test_load_truncated_binary_file(self):
+        data = b" " * 80 + struct.pack("<I", 2) + b"\0" * 50
+        self.assertRaises(LoadFileError, import_model, io.BytesIO(data))
+
+    def test_parse_ascii_blocks(self):
+        data = b"""solid part_1 exported
+  facet normal 0 0 1
+    outer loop
+      vertex 0 0 0
+      vertex 1 0 0
+      vertex 0 1 0
+    endloop
+  endfacet
+  facet normal 0,0 0,0 1,0
+    outer loop
+      vertex 1 0 0
+      vertex 1.5e0 1 0
+      vertex 0 1 0
+    endloop
+  endfacet
+  facet normal 0 0 1
+    outer loop
+      vertex 1 0 0
+      vertex 0 1 0
+    endloop
+  endfacet
+  facet
+    outer loop
+      vertex 0 0 1
+      vertex 1 0 1
+      vertex 0 1 1
+    endloop
+  endfacet
+endsolid part_1
+"""
+        for block_size in (5, 64, 4096):
+            name, normals, points, missing_normals = STLImporter._read_ascii_facets(
+                io.BytesIO(data), "test", block_size=block_size)
+            self.assertEqual(name, "part_1")
+            # the facet with two vertices is skipped
+            self.assertEqual(len(points), 3)
+            self.assertEqual(points[1].tolist(), [[1, 0, 0], [1.5, 1, 0], [0, 1, 0]])
+            self.assertEqual(normals[0].tolist(), [0, 0, 1])
+            # invalid numbers (decimal comma) and missing normals are ignored
+            self.assertEqual(missing_normals.tolist(), [False, True, True])
+
+    def test_load_ascii_stream(self):
+        data = (b"solid test\nfacet normal 0 0 -1\nouter loop\nvertex 0 0 0\nvertex 1 0 0\n"
+                b"vertex 0 1 0\nendloop\nendfacet\nendsolid test\n")
+        model = import_model(io.BytesIO(data))
+        self.assertEqual(model.name, "test")
+        self.assertEqual(len(model), 1)
+        self.assertEqual(model.triangles()[0].normal[:3], (0, 0, -1))
@@ -19,10 +19,16 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
 
+import numpy
+
 import pycam.Test
+from pycam.Geometry import INFINITE
+from pycam.Geometry.batch_intersection import TriangleArrays
+from pycam.Geometry.Line import Line
 from pycam.Geometry.Triangle import Triangle
 from pycam.Cutters.CylindricalCutter import CylindricalCutter
 from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Cutters.ToroidalCutter import ToroidalCutter
 
 
 class CylindricalCutterCollisions(pycam.Test.PycamTestCase):
@@ -45,6 +51,17 @@ class CylindricalCutterCollisions(pycam.Test.PycamTestCase):
 #       self.assert_vector_equal(self._drop(2.1, skewed_triangle), (0, 0, 3))
 #       self.assert_vector_equal(self._drop(3, skewed_triangle), (0, 0, 3))
 
+    def test_fingerprint(self):
+        "Fingerprint"
+        cutter = CylindricalCutter(2, location=(0, 0, 0))
+        moved = CylindricalCutter(2.0, location=(1, 2, 3))
+        self.assertEqual(cutter.fingerprint, moved.fingerprint)
+        self.assertNotEqual(cutter.fingerprint, SphericalCutter(2).fingerprint)
+        self.assertNotEqual(cutter.fingerprint, CylindricalCutter(2, height=5).fingerprint)
+        other = CylindricalCutter(2)
+        other.set_required_distance(0.5)
+        self.assertNotEqual(cutter.fingerprint, other.fingerprint)
+
 
 class SphericalCutterCollisions(pycam.Test.PycamTestCase):
     """Spherical cutter collisions"""
@@ -96,5 +113,74 @@ class SphericalCutterCollisions(pycam.Test.PycamTestCase):
 #       test_skew(3, 60)
 
 
+class ToroidalCutterCollisions(pycam.Test.PycamTestCase):
+    """Toroidal cutter collisions"""
+
+    def test_push_edge(self):
+        "Push against an edge"
+        # the tool is located far above the start of the push
+        cutter = ToroidalCutter(2, 0.5, location=(0, 0, 5))
+        edge = Line((0, -2, 1), (0, 2, 1))
+        self.assertEqual(cutter.intersect_cylinder_edge((1, 0, 0), edge, start=(-5, 0, 0)),
+                         ((-2, 0, 0), 3, (0, 0, 1)))
+        triangle = Triangle((0, -2, 1), (0, 2, 1), (2, 0, 1))
+        self.assertEqual(cutter.push_at((1, 0, 0), triangle, (-5, 0, 0)),
+                         ((-2, 0, 0), 3, (0, 0, 1)))
+        # the edge is below the center of the torus: the torus hits it instead of the cylinder
+        start = (-5, 0, 0.6)
+        self.assertEqual(cutter.intersect_cylinder_edge((1, 0, 0), edge, start=start),
+                         (None, INFINITE, None))
+        self.assertAlmostEqual(cutter.push_at((1, 0, 0), triangle, start)[1],
+                               5 - 1.5 - math.sqrt(0.5 ** 2 - 0.1 ** 2))
+
+
+class BatchDropCollisions(pycam.Test.PycamTestCase):
+    """Array based drop of many triangles"""
+
+    def setUp(self):
+        random = numpy.random.RandomState(3)
+        p1 = random.uniform(-3, 3, (300, 3))
+        p2 = p1 + random.uniform(-2, 2, (300, 3))
+        p3 = p1 + random.uniform(-2, 2, (300, 3))
+        # horizontal triangles and triangles with a horizontal edge
+        p2[:50, 2] = p3[:50, 2] = p1[:50, 2]
+        p2[50:100, 2] = p1[50:100, 2]
+        self.triangles = [Triangle(*(tuple(p) for p in points)) for points in zip(p1, p2, p3)]
+        self.arrays = TriangleArrays(p1, p2, p3, [t.normal[:3] for t in self.triangles])
+        self.starts = numpy.column_stack((random.uniform(-3, 3, (300, 2)), numpy.full(300, 10)))
+
+    def test_drop_heights(self):
+        "Drop heights"
+        for cutter in (CylindricalCutter(1), SphericalCutter(1.5, location=(1, 2, 3)),
+                       ToroidalCutter(2, 0.5)):
+            for required_distance in (0, 0.3):
+                cutter.set_required_distance(required_distance)
+                heights = cutter.get_drop_heights(self.arrays, self.starts)
+                for triangle, start, height in zip(self.triangles, self.starts.tolist(),
+                                                   heights.tolist()):
+                    cut = cutter.drop(triangle, start=tuple(start))
+                    if cut is None:
+                        self.assertTrue(math.isnan(height))
+                    else:
+                        # the results are identical (not only close)
+                        self.assertEqual(height, cut[2])
+
+    def test_stateless_queries(self):
+        "Stateless queries"
+        for cutter in (CylindricalCutter(1), SphericalCutter(1.5), ToroidalCutter(2, 0.5)):
+            reference = [cutter.drop_at(triangle, tuple(start))
+                         for triangle, start in zip(self.triangles, self.starts.tolist())]
+            pushes = [cutter.push_at((1, 0, 0), triangle, (-5, start[1], start[0]))
+                      for triangle, start in zip(self.triangles, self.starts.tolist())]
+            # the location of the tool does not influence the results
+            cutter.moveto((7, -3, 2))
+            for triangle, start, cut, push in zip(self.triangles, self.starts.tolist(),
+                                                  reference, pushes):
+                self.assertEqual(cutter.drop_at(triangle, tuple(start)), cut)
+                self.assertEqual(cutter.push_at((1, 0, 0), triangle, (-5, start[1], start[0])),
+                                 push)
+            self.assertEqual(cutter.location, (7, -3, 2))
+
+
 if __name__ == "__main__":
     pycam.Test.main()
@@ -0,0 +1,68 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+
+from pycam.Cutters.CylindricalCutter import CylindricalCutter
+from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Cutters.ToroidalCutter import ToroidalCutter
+from pycam.Geometry.Model import Model
+from pycam.Geometry.TopSurface import TopSurfaceFilter, get_top_surface_model
+from pycam.PathGenerators.DropCutter import DropCutter
+import pycam.Test
+
+
+class TestTopSurface(pycam.Test.PycamTestCase):
+
+    def _get_model(self):
+        # a block with a closed cavity
+        model = Model()
+        pycam.Test.add_box(model, (0, 0, 0), (10, 8, 4))
+        pycam.Test.add_box(model, (2, 2, 1), (8, 6, 3), reverse=True)
+        return model
+
+    def test_visible_facets(self):
+        model = self._get_model()
+        visible = TopSurfaceFilter(model.get_mesh()).get_visible_mask()
+        # only the top and the outer sides remain (their normals point outwards)
+        self.assertEqual(visible.sum(), 10)
+        self.assertTrue((model.get_mesh().normals[visible, 2] >= 0).all())
+        self.assertEqual(len(get_top_surface_model(model)), 10)
+        # open surfaces are kept
+        surface = Model()
+        surface.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        self.assertEqual(TopSurfaceFilter(surface.get_mesh()).get_visible_mask().sum(), 1)
+
+    def test_drop_heights(self):
+        model = self._get_model()
+        culled = get_top_surface_model(model)
+        rand = random.Random(19)
+        positions = [(rand.uniform(-1, 11), rand.uniform(-1, 9)) for _ in range(200)]
+        for cutter in (CylindricalCutter(0.5), SphericalCutter(0.7), ToroidalCutter(1, 0.25)):
+            expected = model.get_max_heights(cutter, positions, -1, 10)
+            self.assertEqual(culled.get_max_heights(cutter, positions, -1, 10), expected)
+
+    def test_drop_cutter(self):
+        model = self._get_model()
+        cutter = SphericalCutter(0.5)
+        grid = [[[(x / 2.0, y, 0) for x in range(-2, 23)] for y in range(-1, 10)]]
+        expected = DropCutter().generate_toolpath(cutter, [model], grid, minz=-1, maxz=10)
+        path = DropCutter(cull_hidden_facets=True).generate_toolpath(cutter, [model], grid,
+                                                                     minz=-1, maxz=10)
+        self.assertEqual(path, expected)
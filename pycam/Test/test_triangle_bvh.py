@@ -0,0 +1,96 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+from pycam.Geometry.TriangleBVH import TriangleBVH
+import pycam.Test
+
+
+class TestTriangleBVH(pycam.Test.PycamTestCase):
+
+    def setUp(self):
+        random = numpy.random.RandomState(42)
+        self.lower = random.uniform(-10, 10, (500, 3))
+        self.upper = self.lower + random.uniform(0, 2, (500, 3))
+        self.tree = TriangleBVH(self.lower, self.upper, leaf_size=4)
+        self.boxes = [((-3, -2, -1), (1, 4, 2)), ((-20, -20, 5), (20, 20, 20)),
+                      ((0, 0, 0), (0, 0, 0)), ((30, 30, 30), (40, 40, 40))]
+
+    def _get_brute_force_result(self, lower, upper):
+        mask = (self.lower <= upper).all(axis=1) & (self.upper >= lower).all(axis=1)
+        return numpy.nonzero(mask)[0].tolist()
+
+    def test_query(self):
+        for lower, upper in self.boxes:
+            self.assertEqual(self.tree.query(lower, upper).tolist(),
+                             self._get_brute_force_result(lower, upper))
+
+    def test_query_many(self):
+        results = self.tree.query_many([box[0] for box in self.boxes],
+                                       [box[1] for box in self.boxes])
+        self.assertEqual(len(results), len(self.boxes))
+        for (lower, upper), result in zip(self.boxes, results):
+            self.assertEqual(result.tolist(), self._get_brute_force_result(lower, upper))
+
+    def _check_sweep(self, lowers, uppers):
+        facets, boxes = self.tree.query_sweep(lowers, uppers)
+        for index, (lower, upper) in enumerate(zip(lowers, uppers)):
+            self.assertEqual(sorted(facets[boxes == index].tolist()),
+                             self._get_brute_force_result(lower, upper))
+
+    def test_query_sweep(self):
+        # tool positions along a line
+        lowers = [(x / 4.0 - 1, 2, -5) for x in range(-50, 50)]
+        uppers = [(x / 4.0 + 1, 4, 20) for x in range(-50, 50)]
+        self._check_sweep(lowers, uppers)
+        # a facet spanning the whole line
+        self.lower = numpy.vstack((self.lower, (-12, 2.5, 0)))
+        self.upper = numpy.vstack((self.upper, (12, 3, 0.5)))
+        self.tree = TriangleBVH(self.lower, self.upper, leaf_size=4)
+        self._check_sweep(lowers, uppers)
+        # boxes of different sizes (handled by "query_many")
+        self._check_sweep(lowers + [box[0] for box in self.boxes],
+                          uppers + [box[1] for box in self.boxes])
+
+    def test_node_bounds(self):
+        self.assertEqual(self.tree.max_z[0], self.upper[:, 2].max())
+        self.assertEqual(sorted(self.tree.get_facets_of_nodes([0]).tolist()), list(range(500)))
+
+    def test_find_highest(self):
+        visited = []
+
+        def get_height(facet):
+            visited.append(facet)
+            # any value not exceeding the top of the facet
+            return self.lower[facet, 2] + 0.5 * (self.upper[facet, 2] - self.lower[facet, 2])
+
+        lower, upper = (-3, -2, -100), (1, 4, 100)
+        candidates = self._get_brute_force_result(lower, upper)
+        expected = max(get_height(facet) for facet in candidates)
+        visited.clear()
+        height, facet = self.tree.find_highest(lower, upper, get_height)
+        self.assertEqual(height, expected)
+        self.assertIn(facet, candidates)
+        # the branch-and-bound search skips most of the candidates
+        self.assertLess(len(visited), len(candidates))
+
+    def test_empty(self):
+        tree = TriangleBVH(numpy.empty((0, 3)), numpy.empty((0, 3)))
+        self.assertEqual(tree.query((-1, -1, -1), (1, 1, 1)).tolist(), [])
@@ -0,0 +1,158 @@
+"""
+Copyright 2026 PyCAM contributors
+
+This file is part of PyCAM.
+
+PyCAM is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyCAM is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pickle
+
+from pycam.Geometry.Matrix import get_rotation_matrix_around_point
+from pycam.Cutters.SphericalCutter import SphericalCutter
+from pycam.Geometry.Model import (CompositeModel, get_combined_model, get_model_view, Model,
+                                  TransformationChain)
+from pycam.Geometry.Triangle import Triangle
+from pycam.Geometry.TriangleMesh import TriangleMesh
+import pycam.Test
+
+
+class TestTriangleMesh(pycam.Test.PycamTestCase):
+
+    def _get_mesh(self):
+        mesh = TriangleMesh()
+        mesh.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        mesh.add_triangle((1, 0, 0), (0, 1, 0), (1, 1, 2))
+        return mesh
+
+    def test_shared_vertices(self):
+        mesh = self._get_mesh()
+        self.assertEqual(len(mesh), 2)
+        self.assertEqual(len(mesh.vertices), 4)
+        self.assertEqual(mesh.indices.tolist(), [[0, 1, 2], [2, 1, 3]])
+
+    def test_facet_bounds(self):
+        mesh = self._get_mesh()
+        self.assertEqual(mesh.lower.tolist(), [[0, 0, 0], [0, 0, 0]])
+        self.assertEqual(mesh.upper.tolist(), [[1, 1, 0], [1, 1, 2]])
+        self.assertEqual(mesh.get_bounds(), ((0, 0, 0), (1, 1, 2)))
+
+    def test_lazy_triangles(self):
+        mesh = self._get_mesh()
+        triangle = mesh.get_triangle(0)
+        reference = Triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        self.assertEqual(triangle.get_points(), reference.get_points())
+        self.assert_vector_equal(triangle.normal, reference.normal)
+        # the identity of a triangle is stable
+        self.assertIs(mesh.get_triangle(0), triangle)
+
+    def test_pickle(self):
+        mesh = pickle.loads(pickle.dumps(self._get_mesh()))
+        self.assertEqual(len(mesh), 2)
+        self.assertEqual(mesh.get_triangle(1).get_points(),
+                         ((1, 0, 0), (0, 1, 0), (1, 1, 2)))
+
+    def test_model_storage(self):
+        model = Model()
+        triangle = Triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        model.append(triangle)
+        model.add_triangle((1, 0, 0), (0, 1, 0), (1, 1, 2))
+        self.assertEqual(len(model), 2)
+        self.assertIs(model.triangles()[0], triangle)
+        self.assertEqual((model.minz, model.maxz), (0, 2))
+        combined = model + model.copy()
+        self.assertEqual(len(combined), 4)
+        self.assertEqual(len(combined.get_mesh().vertices), 8)
+
+    def test_transform(self):
+        model = Model()
+        model.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        model.scale(2, 1, 3)
+        model.shift(1, 0, 0)
+        self.assertEqual(model.triangles()[0].get_points(), ((1, 0, 0), (1, 1, 0), (3, 0, 0)))
+        self.assertEqual((model.minx, model.maxx), (1, 3))
+        # the normal remains normalized after scaling
+        self.assert_vector_equal(model.triangles()[0].normal[:3], (0, 0, 1))
+        # mirroring keeps the vertices in clockwise order
+        model.transform_by_template("xy_mirror")
+        triangle = model.triangles()[0]
+        reference = Triangle(triangle.p1, triangle.p2, triangle.p3)
+        self.assert_vector_equal(triangle.normal[:3], (0, 0, -1))
+        self.assert_vector_equal(reference.normal[:3], (0, 0, -1))
+
+    def test_rotate(self):
+        model = Model()
+        model.add_triangle((2, 1, 0), (2, 2, 0), (3, 1, 0))
+        model.rotate((2, 1, 0), (0, 0, 1), 90)
+        self.assert_vector_equal(model.triangles()[0].p3, (2, 2, 0))
+        self.assert_vector_equal(model.triangles()[0].normal[:3], (0, 0, 1))
+
+    def test_transformation_chain(self):
+        model = Model()
+        model.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        model.add_triangle((1, 0, 0), (0, 1, 0), (1, 1, 2))
+        chain = TransformationChain(model)
+        chain.append(((2, 0, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0)))
+        chain.append(((1, 0, 0, 1), (0, 1, 0, -1), (0, 0, 1, 0)))
+        self.assertEqual((chain.minx, chain.maxx, chain.miny, chain.maxy), (1, 3, -1, 0))
+        chain.append(get_rotation_matrix_around_point((0, 0, 0), (1, 0, 0), 45,
+                                                      use_radians=False))
+        # the bounds of the rotated model are calculated without transforming it
+        expected = model.copy()
+        expected.scale(2, 1, 1)
+        expected.shift(1, -1, 0)
+        expected.rotate((0, 0, 0), (1, 0, 0), 45)
+        self.assert_vector_equal((chain.miny, chain.maxy, chain.minz, chain.maxz),
+                                 (expected.miny, expected.maxy, expected.minz, expected.maxz))
+        transformed = chain.get_model()
+        self.assertEqual(len(chain), 0)
+        self.assertEqual(model.get_mesh().get_bounds(), ((0, 0, 0), (1, 1, 2)))
+        for triangle, other in zip(transformed.triangles(), expected.triangles()):
+            for point, other_point in zip(triangle.get_points(), other.get_points()):
+                self.assert_vector_equal(point, other_point)
+
+    def test_fingerprint(self):
+        model = Model()
+        model.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        fingerprint = model.fingerprint
+        model.add_triangle((1, 0, 0), (0, 1, 0), (1, 1, 2))
+        # the hash is updated incrementally
+        self.assertNotEqual(model.fingerprint, fingerprint)
+        copied = pickle.loads(pickle.dumps(model.copy()))
+        self.assertEqual(copied.fingerprint, model.fingerprint)
+        copied.shift(0, 0, 1)
+        self.assertNotEqual(copied.fingerprint, model.fingerprint)
+        copied.shift(0, 0, -1)
+        self.assertEqual(copied.fingerprint, model.fingerprint)
+
+    def test_composite_model(self):
+        first = Model()
+        first.add_triangle((0, 0, 0), (0, 1, 0), (1, 0, 0))
+        second = Model()
+        second.add_triangle((1, 0, 0), (0, 1, 0), (1, 1, 2))
+        view = get_model_view([first, None, second])
+        self.assertIsInstance(view, CompositeModel)
+        combined = get_combined_model([first, second])
+        self.assertEqual(len(view), 2)
+        self.assertEqual((view.minx, view.miny, view.minz, view.maxx, view.maxy, view.maxz),
+                         (combined.minx, combined.miny, combined.minz, combined.maxx,
+                          combined.maxy, combined.maxz))
+        self.assertEqual([t.get_points() for t in view.triangles(0.9, 0.9, -1, 2, 2, 3)],
+                         [t.get_points() for t in combined.triangles(0.9, 0.9, -1, 2, 2, 3)])
+        cutter = SphericalCutter(0.5)
+        for x, y in ((0.2, 0.2), (0.8, 0.8), (5, 5)):
+            self.assertEqual(view.get_max_height(cutter, x, y, -1, 10),
+                             combined.get_max_height(cutter, x, y, -1, 10))
+        # the members are not copied
+        self.assertIs(view.get_models()[0], first)
@@ -19,6 +19,8 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
 
+import numpy
+
 from pycam.Geometry import sqrt
 
 
@@ -175,6 +177,140 @@ def poly4_roots(a, b, c, d, e):
         return None
 
 
+# The functions below solve many polynomials at once.  The coefficients are given as arrays (or
+# scalars) of the same length.  The result is an array with one row for each polynomial.  Each row
+# contains the roots in the same order as the functions above - unused columns are filled with nan.
+# Rows without roots contain only nan.
+
+def _get_coefficients(*coefficients):
+    return numpy.broadcast_arrays(*[numpy.asarray(value, dtype=numpy.float64)
+                                    for value in coefficients])
+
+
+def _cuberoot_many(x):
+    return numpy.where(x >= 0, numpy.float_power(numpy.abs(x), INV_3),
+                       -numpy.float_power(numpy.abs(x), INV_3))
+
+
+def _sqrt_many(x):
+    # like pycam.Geometry.sqrt: values below zero result in zero
+    return numpy.sqrt(numpy.where(x > 0, x, 0.0))
+
+
+def _compact_roots(roots):
+    """ move all nan values of each row to the end (keeping the order of the roots) """
+    order = numpy.argsort(numpy.isnan(roots), axis=1, kind="stable")
+    return numpy.take_along_axis(roots, order, axis=1)
+
+
+def poly2_roots_many(a, b, c):
+    """ see "poly2_roots" - the result has two columns """
+    a, b, c = _get_coefficients(a, b, c)
+    result = numpy.full(a.shape + (2, ), numpy.nan)
+    with numpy.errstate(all="ignore"):
+        d = b * b - 4 * a * c
+        solvable = ~(d < 0)
+        # the linear equation
+        linear = solvable & near_zero(a) & ~near_zero(b)
+        result[linear, 0] = -c[linear] / b[linear]
+        quadratic = solvable & ~near_zero(a)
+        single = quadratic & (d == 0)
+        result[single, 0] = -b[single] / (2 * a[single])
+        double = quadratic & (d != 0)
+        q = _sqrt_many(d)
+        low = (-b - q) / (2 * a)
+        high = (-b + q) / (2 * a)
+        negative = a < 0
+        result[double, 0] = numpy.where(negative, high, low)[double]
+        result[double, 1] = numpy.where(negative, low, high)[double]
+    return result
+
+
+def poly3_roots_many(a, b, c, d):
+    """ see "poly3_roots" - the result has three columns """
+    a, b, c, d = _get_coefficients(a, b, c, d)
+    result = numpy.full(a.shape + (3, ), numpy.nan)
+    quadratic = near_zero(a)
+    result[quadratic, :2] = poly2_roots_many(b[quadratic], c[quadratic], d[quadratic])
+    cubic = ~quadratic
+    a, b, c, d = a[cubic], b[cubic], c[cubic], d[cubic]
+    roots = numpy.full(a.shape + (3, ), numpy.nan)
+    with numpy.errstate(all="ignore"):
+        c1 = b / a
+        c2 = c / a
+        c3 = d / a
+        c1_3 = c1 * INV_3
+        a = c2 - c1 * c1_3
+        b = (2 * c1 * c1 * c1 - 9 * c1 * c2 + 27 * c3) * INV_27
+        delta = a * a
+        delta = b * b * INV_4 + delta * a * INV_27
+        # one real root
+        single = delta > 0
+        r_delta = _sqrt_many(delta)
+        v_major = _cuberoot_many(-INV_2 * b + r_delta)
+        v_minor = _cuberoot_many(-INV_2 * b - r_delta)
+        roots[single, 0] = (v_major + v_minor - c1_3)[single]
+        # a double root
+        double = delta == 0
+        s = _cuberoot_many(-b * INV_2)
+        roots[double, 0] = (2 * s - c1_3)[double]
+        roots[double, 1] = roots[double, 2] = (-s - c1_3)[double]
+        # three real roots
+        triple = ~single & ~double & ~numpy.isnan(delta)
+        flat = a > 0
+        a = a * -INV_3
+        fact = numpy.where(flat, 0.0, _sqrt_many(a))
+        f = -b * INV_2 / (a * fact)
+        phi = numpy.where(f <= -1.0, PI_DIV_3, numpy.arccos(numpy.clip(f, -1.0, 1.0)) * INV_3)
+        upper_limit = flat | (f >= 1.0)
+        cs_phi = numpy.where(upper_limit, 1.0, numpy.cos(phi))
+        sn_phi_s3 = numpy.where(upper_limit, 0.0, numpy.sin(phi) * SQRT3)
+        roots[triple, 0] = (2 * fact * cs_phi - c1_3)[triple]
+        roots[triple, 1] = (fact * (sn_phi_s3 - cs_phi) - c1_3)[triple]
+        roots[triple, 2] = (fact * (-sn_phi_s3 - cs_phi) - c1_3)[triple]
+    result[cubic] = roots
+    return result
+
+
+def poly4_roots_many(a, b, c, d, e):
+    """ see "poly4_roots" - the result has four columns """
+    a, b, c, d, e = _get_coefficients(a, b, c, d, e)
+    result = numpy.full(a.shape + (4, ), numpy.nan)
+    cubic = a == 0
+    result[cubic, :3] = poly3_roots_many(b[cubic], c[cubic], d[cubic], e[cubic])
+    quartic = ~cubic
+    a, b, c, d, e = a[quartic], b[quartic], c[quartic], d[quartic], e[quartic]
+    with numpy.errstate(all="ignore"):
+        c1 = b / a
+        c2 = c / a
+        c3 = d / a
+        c4 = e / a
+        roots3 = poly3_roots_many(1.0, -c2, c3 * c1 - 4 * c4,
+                                  -c3 * c3 - c4 * c1 * c1 + 4 * c4 * c2)
+        valid = ~numpy.isnan(roots3[:, 0])
+        # the largest root of the resolvent cubic (there is either one root or three roots)
+        u = numpy.where(numpy.isnan(roots3[:, 1]), roots3[:, 0], numpy.max(roots3, axis=1))
+        p = c1 * c1 * INV_4 + u - c2
+        u = u * INV_2
+        q = u * u - c4
+        valid &= ~(p < -SMALL) & ~(q < -SMALL)
+        p = _sqrt_many(p)
+        q = _sqrt_many(q)
+        quad1 = c1 * INV_2 - p
+        quad2 = c1 * INV_2 + p
+        q1 = u - q
+        q2 = u + q
+        first_order = near_zero(quad1 * q2 + quad2 * q1 - c3)
+        second_order = ~first_order & near_zero(quad1 * q1 + quad2 * q2 - c3)
+        valid &= first_order | second_order
+        roots = numpy.concatenate(
+            (poly2_roots_many(1.0, quad1, numpy.where(first_order, q1, q2)),
+             poly2_roots_many(1.0, quad2, numpy.where(first_order, q2, q1))), axis=1)
+        roots[~valid] = numpy.nan
+    result[quartic] = roots
+    return _compact_roots(result)
+
+
 def test_poly1(a, b):
     roots = poly1_roots(a, b)
     print(a, "*x+", b, "=0 ", roots)
@@ -19,6 +19,8 @@ along with PyCAM.  If not, see <http://www.gnu.org/licenses/>.
 
 # multiprocessing is imported later
 # import multiprocessing
+import collections
+import functools
 import os
 import platform
 import queue
@@ -66,12 +68,18 @@ __multiprocessing = None
 # needs to be initialized, if multiprocessing is enabled
 __num_of_processes = None
 
+# local jobs are processed by a pool of threads instead of processes
+__use_threads = False
+
 __manager = None
 __closing = None
 __task_source_uuid = None
 __finished_jobs = []
 __issued_warnings = []
 
+# the "shared_args" of the current job (within a local worker process)
+__worker_shared_args = ()
+
 
 def run_in_parallel(*args, **kwargs):
     global __manager
@@ -115,6 +123,25 @@ def is_multiprocessing_enabled():
     return bool(__multiprocessing)
 
 
+def is_thread_pool_enabled():
+    """ return True if local jobs are processed by threads instead of processes """
+    return __use_threads
+
+
+def are_tasks_sharing_memory():
+    """ return True if the tasks of "run_in_parallel" run within the current process
+
+    This applies to serial processing and to the thread pool.  Only then objects passed to the
+    tasks (e.g. caches) collect data across tasks.  Worker processes receive their own copy.
+    """
+    if __manager is not None:
+        return False
+    if __multiprocessing is None:
+        # threading was not configured before
+        init_threading()
+    return pycam.Utils.log.is_debug() or (not __multiprocessing) or __use_threads
+
+
 def is_server_mode_available():
     # the following definition should be kept in sync with the documentation in
     # docs/parallel-processing.md
@@ -187,11 +214,22 @@ class ManagerInfo:
 
 
 def init_threading(number_of_processes=None, enable_server=False, remote=None, run_server=False,
-                   server_credentials="", local_port=DEFAULT_PORT):
-    global __multiprocessing, __num_of_processes, __manager, __closing, __task_source_uuid
+                   server_credentials="", local_port=DEFAULT_PORT, use_threads=False):
+    """ configure the parallel processing
+
+    @param use_threads: process local jobs with a pool of threads instead of processes.  This
+        avoids the transfer (pickling) of the models and tools to every worker, but it is only
+        useful as long as the calculations release the GIL (e.g. numpy operations on large
+        arrays).  Server mode always uses processes.
+    """
+    global __multiprocessing, __num_of_processes, __manager, __closing, __task_source_uuid, \
+        __use_threads
     if __multiprocessing:
         # kill the manager and clean everything up for a re-initialization
         cleanup()
+    if use_threads and (enable_server or run_server):
+        log.warn("Threads are not available in server mode - using processes instead")
+        use_threads = False
     if (not is_server_mode_available()) and (enable_server or run_server):
         # server mode is disabled for the Windows pyinstaller standalone
         # due to "pickle errors". How to reproduce: run the standalone binary
@@ -248,12 +286,16 @@ def init_threading(number_of_processes=None, enable_server=False, remote=None, r
             __multiprocessing = multiprocessing
             __num_of_processes = number_of_processes
     # initialize the manager
+    __use_threads = use_threads
     if not __multiprocessing:
         __manager = None
         log.info("Disabled parallel processing")
     elif not enable_server and not run_server:
         __manager = None
-        log.info("Enabled %d parallel local processes", __num_of_processes)
+        if __use_threads:
+            log.info("Enabled %d parallel local threads", __num_of_processes)
+        else:
+            log.info("Enabled %d parallel local processes", __num_of_processes)
     else:
         # with multiprocessing
         log.info("Enabled %d parallel local processes", __num_of_processes)
@@ -473,12 +515,20 @@ def _handle_tasks(tasks, results, stats, cache, pending_tasks, closing):
 
 
 def run_in_parallel_remote(func, args_list, unordered=False, disable_multiprocessing=False,
-                           callback=None):
+                           callback=None, max_pending=None, shared_args=None):
+    """ "max_pending" is ignored - all tasks are queued at once (see "run_in_parallel_local")
+
+    The "shared_args" are added to every task.  Cacheable items (e.g. models) among them are
+    transferred to the remote cache only once anyway.
+    """
     global __multiprocessing, __num_of_processes, __manager, __task_source_uuid, __finished_jobs
+    if shared_args:
+        args_list = (tuple(shared_args) + tuple(args) for args in args_list)
     if __multiprocessing is None:
         # threading was not configured before
         init_threading()
     if __multiprocessing and not disable_multiprocessing:
+        args_list = list(args_list)
         job_id = str(uuid.uuid1())
         log.debug("Starting parallel tasks: %s", job_id)
         tasks_queue = __manager.tasks()
@@ -494,28 +544,28 @@ def run_in_parallel_remote(func, args_list, unordered=False, disable_multiproces
             result_args = []
             for arg in args:
                 # add the argument to the cache if possible
-                if hasattr(arg, "uuid"):
-                    data_uuid = ProcessDataCacheItemID(arg.uuid)
-                    if not remote_cache.contains(data_uuid):
+                if hasattr(arg, "fingerprint"):
+                    data_id = ProcessDataCacheItemID(arg.fingerprint)
+                    if not remote_cache.contains(data_id):
                         log.debug("Adding cache item for job %s: %s - %s",
-                                  job_id, arg.uuid, arg.__class__)
-                        remote_cache.add(data_uuid, arg)
-                    result_args.append(data_uuid)
+                                  job_id, data_id.value, arg.__class__)
+                        remote_cache.add(data_id, arg)
+                    result_args.append(data_id)
                 elif isinstance(arg, (list, set, tuple)):
                     # a list with - maybe containing cacheable items
                     new_arg_list = []
                     for item in arg:
                         try:
-                            data_uuid = ProcessDataCacheItemID(item.uuid)
+                            data_id = ProcessDataCacheItemID(item.fingerprint)
                         except AttributeError:
                             # non-cacheable item
                             new_arg_list.append(item)
                             continue
-                        if not remote_cache.contains(data_uuid):
+                        if not remote_cache.contains(data_id):
                             log.debug("Adding cache item from list for job %s: %s - %s",
-                                      job_id, item.uuid, item.__class__)
-                            remote_cache.add(data_uuid, item)
-                        new_arg_list.append(data_uuid)
+                                      job_id, data_id.value, item.__class__)
+                            remote_cache.add(data_id, item)
+                        new_arg_list.append(data_id)
                     result_args.append(new_arg_list)
                 else:
                     result_args.append(arg)
@@ -596,6 +646,16 @@ def run_in_parallel_remote(func, args_list, unordered=False, disable_multiproces
             yield func(args)
 
 
+def _set_worker_shared_args(shared_args):
+    """ store the shared arguments of a job (called once by each new worker process) """
+    global __worker_shared_args
+    __worker_shared_args = shared_args
+
+
+def _call_with_shared_args(func, args):
+    return func(tuple(__worker_shared_args) + tuple(args))
+
+
 def _cleanup_job(job_id, tasks_queue, pending_tasks, finished_jobs):
     # flush the task queue
     try:
@@ -625,26 +685,62 @@ def _cleanup_job(job_id, tasks_queue, pending_tasks, finished_jobs):
         finished_jobs.pop(0)
 
 
+def _get_bounded_results(pool, func, args, max_pending):
+    """ return the results of the tasks in order
+
+    At most "max_pending" tasks are submitted, but not yet returned.  Tasks finishing before
+    their predecessors are kept until it is their turn.  Thus the memory usage of the results
+    and the arguments does not depend on the number of tasks.
+    """
+    pending = collections.deque()
+    for arg in args:
+        pending.append(pool.apply_async(func, (arg, )))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
 def run_in_parallel_local(func, args, unordered=False, disable_multiprocessing=False,
-                          callback=None):
+                          callback=None, max_pending=None, shared_args=None):
+    """ apply a function to all items of "args" with a pool of local workers
+
+    @param max_pending: limit the number of tasks being processed or waiting for their
+        predecessors (only for ordered results) - "args" is then consumed step by step
+    @param shared_args: a tuple of values (e.g. models and tools) preceding the items of every
+        task - they are transferred to each worker process only once instead of with every task
+    """
     global __multiprocessing, __num_of_processes
     if __multiprocessing is None:
         # threading was not configured before
         init_threading()
     if __multiprocessing and not disable_multiprocessing:
         # use the number of CPUs as the default number of worker threads
-        pool = __multiprocessing.Pool(__num_of_processes)
+        if __use_threads:
+            # the workers share the arguments (e.g. models and tools) instead of copying them
+            import multiprocessing.pool
+            pool = multiprocessing.pool.ThreadPool(__num_of_processes)
+            if shared_args:
+                args = (tuple(shared_args) + tuple(arg) for arg in args)
+        elif shared_args:
+            pool = __multiprocessing.Pool(__num_of_processes, initializer=_set_worker_shared_args,
+                                          initargs=(tuple(shared_args), ))
+            func = functools.partial(_call_with_shared_args, func)
+        else:
+            pool = __multiprocessing.Pool(__num_of_processes)
         if unordered:
-            imap_func = pool.imap_unordered
+            results = pool.imap_unordered(func, args)
+        elif max_pending:
+            results = _get_bounded_results(pool, func, args, max_pending)
         else:
-            imap_func = pool.imap
+            results = pool.imap(func, args)
         # We need to use try/finally here to ensure the garbage collection
         # of "pool". Otherwise a memory overflow is caused for Python 2.7.
         try:
             # Beware: we may not return "pool.imap" or "pool.imap_unordered"
             # directly. It would somehow loose the focus and just hang infinitely.
             # Thus we wrap our own generator around it.
-            for result in imap_func(func, args):
+            for result in results:
                 if callback and callback():
                     # cancel requested
                     break
@@ -656,6 +752,8 @@ def run_in_parallel_local(func, args, unordered=False, disable_multiprocessing=F
             if callback and callback():
                 # cancel requested
                 break
+            if shared_args:
+                arg = tuple(shared_args) + tuple(arg)
             yield func(arg)
 
 
@@ -240,7 +240,8 @@ def execute(parser, args, pycam):
         else:
             pycam.Utils.threading.init_threading(
                 args.parallel_processes, enable_server=args.enable_server,
-                remote=args.remote_server, server_credentials=server_auth_key)
+                remote=args.remote_server, server_credentials=server_auth_key,
+                use_threads=args.use_threads)
     except socket.error as err_msg:
         log.error("Failed to connect to remote server: %s", err_msg)
         return EXIT_CODES["connection_error"]
@@ -268,6 +269,10 @@ def get_args_parser():
     group_processing.add_argument(
         "--enable-server", dest="enable_server", default=False, action="store_true",
         help="enable a local server and (optionally) remote worker servers.")
+    group_processing.add_argument(
+        "--use-threads", dest="use_threads", default=False, action="store_true",
+        help=("process local jobs with threads instead of processes. This avoids the transfer of "
+              "models and tools to every process."))
     group_processing.add_argument(
         "--remote-server", dest="remote_server", default=None, action="store",
         help=("Connect to a remote task server to distribute the processing load. "
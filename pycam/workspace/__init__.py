@@ -58,6 +58,7 @@ class ModelTransformationAction(Enum):
     PROJECTION = "projection"
     TOGGLE_POLYGON_DIRECTIONS = "toggle_polygon_directions"
     REVISE_POLYGON_DIRECTIONS = "revise_polygon_directions"
+    SIMPLIFY = "simplify"
 
 
 class ToolpathTransformationAction(Enum):
@@ -30,6 +30,7 @@ from pycam.Cutters.CylindricalCutter import CylindricalCutter
 from pycam.Cutters.SphericalCutter import SphericalCutter
 from pycam.Cutters.ToroidalCutter import ToroidalCutter
 from pycam.Geometry import Box3D, Point3D
+from pycam.Geometry.Matrix import get_rotation_matrix_around_point
 import pycam.Geometry.Model
 from pycam.Geometry.Plane import Plane
 from pycam.PathGenerators import UpdateToolView
@@ -64,6 +65,9 @@ _cache = {}
 
 APPLICATION_ATTRIBUTES_KEY = "X-Application"
 
+# the grid of adaptive surfacing is coarser by this power of two
+_ADAPTIVE_GRID_LEVELS = 2
+
 
 def _get_enum_value(enum_class, value):
     try:
@@ -887,35 +891,53 @@ class ModelTransformation(BaseDataContainer):
                             "center": _axes_values_converter,
                             "vector": _axes_values_converter,
                             "angle": float,
+                            "tolerance": float,
                             "axes": functools.partial(_axes_values_converter, allow_none=True)}
 
     def get_transformed_model(self, model):
+        matrix = self.get_transformation_matrix(model)
+        if matrix is not None:
+            new_model = model.copy()
+            with ProgressContext("Transform model") as progress:
+                new_model.transform_by_matrix(matrix, callback=progress.update)
+            return new_model
         action = self.get_value("action")
-        if action == ModelTransformationAction.SCALE:
-            return self._get_scaled_model(model)
-        elif action == ModelTransformationAction.SHIFT:
-            return self._get_shifted_model(model)
-        elif action == ModelTransformationAction.ROTATE:
-            return self._get_rotated_model(model)
-        elif action == ModelTransformationAction.MULTIPLY_MATRIX:
-            return self._get_matrix_multiplied_model(model)
-        elif action == ModelTransformationAction.PROJECTION:
+        if action == ModelTransformationAction.PROJECTION:
             return self._get_projected_model(model)
         elif action in (ModelTransformationAction.TOGGLE_POLYGON_DIRECTIONS,
                         ModelTransformationAction.REVISE_POLYGON_DIRECTIONS):
             return self._get_polygon_transformed(model)
+        elif action == ModelTransformationAction.SIMPLIFY:
+            return self._get_simplified_model(model)
         else:
             raise InvalidKeyError(action, ModelTransformationAction)
 
+    def get_transformation_matrix(self, model):
+        """ return the 3x4 matrix of an affine transformation or None for other actions
+
+        @param model: the model (or TransformationChain) providing the current bounding box
+        """
+        action = self.get_value("action")
+        if action == ModelTransformationAction.SCALE:
+            return self._get_scale_matrix(model)
+        elif action == ModelTransformationAction.SHIFT:
+            return self._get_shift_matrix(model)
+        elif action == ModelTransformationAction.ROTATE:
+            return self._get_rotation_matrix()
+        elif action == ModelTransformationAction.MULTIPLY_MATRIX:
+            return self._get_multiplication_matrix()
+        else:
+            return None
+
     @_set_parser_context("Model transformation 'scale'")
     @_set_allowed_attributes({"action", "scale_target", "axes"})
-    def _get_scaled_model(self, model):
+    def _get_scale_matrix(self, model):
         target = self.get_value("scale_target")
         axes = self.get_value("axes")
-        kwargs = {}
+        factors = []
         if target == ModelScaleTarget.FACTOR:
-            for key, value in zip(("scale_x", "scale_y", "scale_z"), axes):
-                kwargs[key] = 1.0 if value is None else value
+            for value in axes:
+                factors.append(1.0 if value is None else value)
         elif target == ModelScaleTarget.SIZE:
             for key, current_size, target_size in zip(
                     ("scale_x", "scale_y", "scale_z"), model.get_dimensions(), axes):
@@ -923,56 +945,42 @@ class ModelTransformation(BaseDataContainer):
                     raise InvalidDataError("Model transformation 'scale' does not accept "
                                            "zero as a target size ({}).".format(key))
                 elif target_size is None:
-                    kwargs[key] = 1.0
+                    factors.append(1.0)
                 elif current_size == 0:
-                    kwargs[key] = 1.0
+                    factors.append(1.0)
                     # don't scale axis if it's flat
                 else:
-                    kwargs[key] = target_size / current_size
+                    factors.append(target_size / current_size)
         else:
             assert False
-        new_model = model.copy()
-        with ProgressContext("Scaling model") as progress:
-            new_model.scale(callback=progress.update, **kwargs)
-        return new_model
+        return ((factors[0], 0, 0, 0), (0, factors[1], 0, 0), (0, 0, factors[2], 0))
 
     @_set_parser_context("Model transformation 'shift'")
     @_set_allowed_attributes({"action", "shift_target", "axes"})
-    def _get_shifted_model(self, model):
+    def _get_shift_matrix(self, model):
         target = self.get_value("shift_target")
         axes = self.get_value("axes")
         offset = target._get_shift_offset(target, axes, model)
-        new_model = model.copy()
-        with ProgressContext("Shifting Model") as progress:
-            new_model.shift(*offset, callback=progress.update)
-        return new_model
+        return ((1, 0, 0, offset[0]), (0, 1, 0, offset[1]), (0, 0, 1, offset[2]))
 
     @_set_parser_context("Model transformation 'rotate'")
     @_set_allowed_attributes({"action", "center", "vector", "angle"})
-    def _get_rotated_model(self, model):
+    def _get_rotation_matrix(self):
         center = self.get_value("center")
         vector = self.get_value("vector")
         angle = self.get_value("angle")
-        new_model = model.copy()
-        with ProgressContext("Rotating Model") as progress:
-            new_model.rotate(center, vector, angle, callback=progress.update)
-        return new_model
+        return get_rotation_matrix_around_point(center, vector, angle, use_radians=False)
 
     @_set_parser_context("Model transformation 'matrix multiplication'")
     @_set_allowed_attributes({"action", "matrix"})
-    def _get_matrix_multiplied_model(self, model):
+    def _get_multiplication_matrix(self):
         matrix = self.get_value("matrix")
         lengths = [len(row) for row in matrix]
         if not lengths == [3, 3, 3]:
             raise InvalidDataError("Invalid Matrix row lengths ({}) - expected [3, 3, 3] instead."
                                    .format(lengths))
         # add zero shift offsets (the fourth column)
-        for row in matrix:
-            row.append(0)
-        new_model = model.copy()
-        with ProgressContext("Transform Model") as progress:
-            new_model.transform_by_matrix(matrix, callback=progress.update)
-        return new_model
+        return tuple(tuple(row) + (0, ) for row in matrix)
 
     @_set_parser_context("Model transformation 'projection'")
     @_set_allowed_attributes({"action", "center", "vector"})
@@ -984,6 +992,17 @@ class ModelTransformation(BaseDataContainer):
         with ProgressContext("Calculate waterline of model") as progress:
             return model.get_waterline_contour(plane, callback=progress.update)
 
+    @_set_parser_context("Model transformation 'simplify'")
+    @_set_allowed_attributes({"action", "tolerance"})
+    @_require_model_type(ModelType.TRIMESH)
+    def _get_simplified_model(self, model):
+        tolerance = self.get_value("tolerance")
+        if tolerance <= 0:
+            raise InvalidDataError("Model transformation 'simplify' requires a positive "
+                                   "tolerance ({}).".format(tolerance))
+        with ProgressContext("Simplify model") as progress:
+            return model.get_simplified_model(tolerance, callback=progress.update)
+
     @_set_parser_context("Model transformation 'polygon directions'")
     @_set_allowed_attributes({"action"})
     @_require_model_type(ModelType.POLYGON)
@@ -1019,9 +1038,24 @@ class Model(BaseCollectionItemDataContainer):
     def get_model(self):
         _log.debug("Generating model {}".format(self.get_id()))
         model = self.get_value("source").get(CollectionName.MODELS)
+        # consecutive affine transformations are combined and applied in one step
+        chain = pycam.Geometry.Model.TransformationChain(model)
         for transformation in self.get_value("transformations"):
-            model = transformation.get_transformed_model(model)
-        return model
+            matrix = transformation.get_transformation_matrix(chain)
+            if matrix is None:
+                # other transformations need the transformed geometry
+                model = transformation.get_transformed_model(self._get_chain_result(chain))
+                chain = pycam.Geometry.Model.TransformationChain(model)
+            else:
+                chain.append(matrix)
+        return self._get_chain_result(chain)
+
+    @staticmethod
+    def _get_chain_result(chain):
+        if len(chain) == 0:
+            return chain.get_model()
+        with ProgressContext("Transform model") as progress:
+            return chain.get_model(callback=progress.update)
 
     def validate(self):
         self.get_model()
@@ -1110,25 +1144,41 @@ class Process(BaseCollectionItemDataContainer):
                                                                      many=True),
                             "rounded_corners": _bool_converter,
                             "radius_compensation": _bool_converter,
+                            "cull_hidden_facets": _bool_converter,
                             "overlap": float,
-                            "step_down": float}
+                            "step_down": float,
+                            "height_field_resolution": float,
+                            "sampling_tolerance": float}
     attribute_defaults = {"overlap": 0,
+                          "height_field_resolution": 0,
+                          "sampling_tolerance": 0,
                           "path_pattern": PathPattern.GRID,
                           "grid_direction": MotionGrid.GridDirection.X,
                           "spiral_direction": MotionGrid.SpiralDirection.OUT,
                           "rounded_corners": True,
-                          "radius_compensation": False}
+                          "radius_compensation": False,
+                          "cull_hidden_facets": False}
 
     @_set_parser_context("Process")
     def get_path_generator(self):
         _log.debug("Retrieving path generator for process {}".format(self.get_id()))
         strategy = _get_enum_value(ProcessStrategy, self.get_value("strategy"))
         if strategy == ProcessStrategy.SLICE:
-            return pycam.PathGenerators.PushCutter.PushCutter(waterlines=False)
+            return pycam.PathGenerators.PushCutter.PushCutter(waterlines=False,
+                                                              parallel_layers=True)
         elif strategy == ProcessStrategy.CONTOUR:
-            return pycam.PathGenerators.PushCutter.PushCutter(waterlines=True)
+            return pycam.PathGenerators.PushCutter.PushCutter(waterlines=True,
+                                                              parallel_layers=True)
         elif strategy == ProcessStrategy.SURFACE:
-            return pycam.PathGenerators.DropCutter.DropCutter()
+            # zero: calculate exact collisions instead of using a height field
+            resolution = self.get_value("height_field_resolution")
+            tolerance = self.get_value("sampling_tolerance") or None
+            # the grid is coarser with a tolerance (see "get_motion_grid") - thus more levels of
+            # refinement are allowed
+            max_depth = 5 + (_ADAPTIVE_GRID_LEVELS if tolerance else 0)
+            return pycam.PathGenerators.DropCutter.DropCutter(
+                height_field_resolution=(resolution or None), tolerance=tolerance,
+                max_depth=max_depth, cull_hidden_facets=self.get_value("cull_hidden_facets"))
         elif strategy == ProcessStrategy.ENGRAVE:
             return pycam.PathGenerators.EngraveCutter.EngraveCutter()
         else:
@@ -1181,6 +1231,10 @@ class Process(BaseCollectionItemDataContainer):
                     raise InvalidKeyError(path_pattern, PathPattern)
                 # surfacing requires a finer grid (arbitrary factor)
                 step_width = tool_radius / 4.0
+                if self.get_value("sampling_tolerance") and not self.get_value(
+                        "height_field_resolution"):
+                    # the adaptive sampling adds the missing points where necessary
+                    step_width *= 2 ** _ADAPTIVE_GRID_LEVELS
                 motion_grid = func(box, None, step_width=step_width, line_distance=line_distance,
                                    milling_style=milling_style)
             elif strategy == ProcessStrategy.ENGRAVE: